@@ -8,6 +8,7 @@ from typing import Union, Literal
 from agent.memory_structures.long_term_memory import LongTermMemory
 from agent.memory_structures.short_term_memory import ShortTermMemory
 from agent.memory_structures.spatial_memory import SpatialMemory
+from game_environment.scene_descriptor.observation import Observation, render_observations
 from agent.cognitive_modules.perceive import should_react, update_known_agents, create_memory, update_known_objects
 from agent.cognitive_modules.plan import plan
 from agent.cognitive_modules.reflect import reflect_questions
@@ -16,6 +17,7 @@ from agent.cognitive_modules.act import actions_sequence
 from agent.cognitive_modules.retrieve import retrieve_relevant_memories
 from agent.cooperative_modules.understanding import update_understanding, update_understanding_2, update_understanding_4
 from utils.queue_utils import list_from_queue
+from utils.background_tasks import BackgroundTasks
 from utils.logging import CustomAdapter
 from utils.time import str_to_timestamp
 
@@ -26,7 +28,7 @@ class Agent:
     """Agent class.
     """
 
-    def __init__(self, name: str, data_folder: str, agent_context_file: str, world_context_file: str, scenario_info:dict, att_bandwidth: int = 10, reflection_umbral: int = 30, mode: Mode = 'normal', understanding_umbral = 30, observations_poignancy = 10, prompts_folder = "base_prompts_v0", substrate_name = "commons_harvest_open", start_from_scene = None ) -> None:
+    def __init__(self, name: str, data_folder: str, agent_context_file: str, world_context_file: str, scenario_info:dict, att_bandwidth: int = 10, reflection_umbral: int = 30, mode: Mode = 'normal', understanding_umbral = 30, observations_poignancy = 10, prompts_folder = "base_prompts_v0", substrate_name = "commons_harvest_open", start_from_scene = None, cognition_barrier: bool = False) -> None:
         """Initializes the agent.
 
         Args:
@@ -42,6 +44,9 @@ class Agent:
             observations_poignancy (int, optional): Poignancy of the observations. Defaults to 10.
             prompts_folder (str, optional): Folder where the prompts are stored. Defaults to "base_prompts_v0".
             substrate_name (str, optional): Name of the substrate. Defaults to "commons_harvest_open".
+            start_from_scene (str, optional): Path of the scene to load the memories from. Defaults to None.
+            cognition_barrier (bool, optional): Whether the reflection finishes before the agent moves. Otherwise it runs on the background
+                after the steps are returned and finishes before the next turn of the agent. Defaults to False.
         """
         self.logger = logging.getLogger(__name__)
         self.logger = CustomAdapter(self.logger)
@@ -60,7 +65,9 @@ class Agent:
         self.prompts_folder = prompts_folder
         self.stm.add_memory(memory = self.name, key = 'name')
         self.substrate_name = substrate_name
-        
+        # The reflection only affects the next plans, so it runs while the agent executes its steps
+        self.background_tasks = BackgroundTasks(self.name, barrier=cognition_barrier)
+
         # Initialize steps sequence in empty queue
         self.stm.add_memory(memory=Queue(), key='current_steps_sequence')
         self.stm.add_memory(memory=scenario_info['valid_actions'], key='valid_actions')
@@ -71,11 +78,11 @@ class Agent:
             self.ltm.load_memories_from_scene(scene_path = start_from_scene, agent_name=name)
             self.stm.load_memories_from_scene(scene_path = start_from_scene, agent_name=name)
 
-    def move(self, observations: list[str], agent_current_scene:dict, changes_in_state: list[tuple[str, str]], game_time: str, agent_reward: float = 0, agent_is_out:bool = False) -> Queue:
+    def move(self, observations: list[Observation], agent_current_scene:dict, changes_in_state: list[tuple[str, str]], game_time: str, agent_reward: float = 0, agent_is_out:bool = False) -> Queue:
         """Use all the congnitive sequence of the agent to decide an action to take
 
         Args:
-            observations (list[str]): List of observations of the environment.
+            observations (list[Observation]): List of observations of the environment.
             agent_current_scene (dict): Dictionary with the current scene of the agent. It contains the agent position, orientation and the scene description.
                 -> global_position (tuple): Current position of the agent in the global map.
                 -> orientation (int): Current orientation of the agent. 0: North, 1: East, 2: South, 3: West.
@@ -88,6 +95,8 @@ class Agent:
         Returns:
             Queue: Steps sequence for the current action.
         """
+        # The memories of the previous turn are complete before the agent perceives again
+        self.wait_background_tasks()
         if self.mode == 'cooperative':
             return self.move_cooperative(observations, agent_current_scene, changes_in_state, game_time, agent_reward, agent_is_out)
         
@@ -107,17 +116,16 @@ class Agent:
             self.plan()
             self.generate_new_actions()
         
-        self.reflect(filtered_observations)
-        
         step_actions = self.get_actions_to_execute()
+        self.background_tasks.submit(self.reflect, filtered_observations)
             
         return step_actions
     
-    def move_cooperative(self, observations: list[str], agent_current_scene:dict, changes_in_state: list[tuple[str, str]], game_time: str, reward: float, agent_is_out:bool = False) -> Queue:
+    def move_cooperative(self, observations: list[Observation], agent_current_scene:dict, changes_in_state: list[tuple[str, str]], game_time: str, reward: float, agent_is_out:bool = False) -> Queue:
         """Use all the congnitive sequence (including the cooperative modules) of the agent to decide an action to take
 
         Args:
-            observations (list[str]): List of observations of the environment.
+            observations (list[Observation]): List of observations of the environment.
             agent_current_scene (dict): Dictionary with the current scene of the agent. It contains the agent position, orientation and the scene description.
                 -> global_position (tuple): Current position of the agent in the global map.
                 -> orientation (int): Current orientation of the agent. 0: North, 1: East, 2: South, 3: West.
@@ -142,24 +150,25 @@ class Agent:
                                                     agent_current_scene['observation'])
         react, filtered_observations, state_changes = self.perceive(observations, changes_in_state, game_time, reward)
 
+        # The plan is made with the understanding of the current observations
         self.understand(filtered_observations, state_changes)
 
         if react:
             self.plan()
             self.generate_new_actions()
-        
-        self.reflect(filtered_observations)
 
         step_actions = self.get_actions_to_execute()
+        self.background_tasks.submit(self.reflect, filtered_observations)
             
         return step_actions
 
-    def perceive(self, observations: list[str], changes_in_state: list[tuple[str, str]], game_time: str, reward: float, is_agent_out: bool = False) -> tuple[bool, list[str], list[str]]:
+    def perceive(self, observations: list[Observation], changes_in_state: list[tuple[str, str]], game_time: str, reward: float, is_agent_out: bool = False) -> tuple[bool, list[str], list[str]]:
         """Perceives the environment and stores the observation in the long term memory. Decide if the agent should react to the observation.
         It also filters the observations to only store the closest ones, and asign a poignancy to the observations.
         Game time is also stored in the short term memory.
+        Observations are rendered as text once they are filtered.
         Args:
-            observations (list[str]): List of observations of the environment.
+            observations (list[Observation]): List of observations of the environment.
             game_time (str): Current game time.
             reward (float): Current reward of the agent.
             is_agent_out (bool, optional): True if the agent is out of the scenario (was taken), False otherwise. Defaults to False.
@@ -169,6 +178,7 @@ class Agent:
         """
         action_executed = self.stm.get_memory('current_action')
         if is_agent_out:
+            observations = render_observations(observations)
             memory = create_memory(self.name, game_time, action_executed, [], reward, observations, self.spatial_memory.position, self.spatial_memory.get_orientation_name(), True)
             self.ltm.add_memory(memory, game_time, self.observations_poignancy, {'type': 'perception'})
             current_observation = '\n'.join(observations)
@@ -185,6 +195,7 @@ class Agent:
         update_known_agents(observations, self.stm)
         # Update the agent known objects
         update_known_objects(observations, self.stm, self.substrate_name)
+        observations = render_observations(observations)
         
         # Parse the changes in the state of the environment observed by the agent
         changes = []
@@ -380,16 +391,58 @@ class Agent:
 
         return agent_steps
     
+    def avoid_blocked_steps(self, agent_current_scene: dict) -> None:
+        """
+        Updates the positions of the other agents with the latest scene and repairs the current steps sequence
+        if its next move is blocked by one of them.
+
+        Args:
+            agent_current_scene (dict): Latest scene description of the agent.
+        """
+        if agent_current_scene['observation'].startswith('There are no observations'):
+            return
+        self.spatial_memory.update_occupancy(agent_current_scene['global_position'], agent_current_scene['orientation'],
+                                             agent_current_scene['observation'])
+        self.spatial_memory.repair_steps_sequence(self.stm.get_memory('current_steps_sequence'))
+
     def understand(self, observations: list[str], state_changes: list[str]):
         """
         Improves the agent's understanding of the world and of other agents.
 
         Args:
             observations (list[str]): List of observations of the environment.
+            state_changes (list[str]): List of changes in the state of the environment.
         
         Returns:
             None
         """
         last_reward = self.stm.get_memory('last_reward')
         current_reward = self.stm.get_memory('current_reward')
-        update_understanding_4(observations, self, self.stm.get_memory('game_time'), last_reward, current_reward, state_changes, understanding_umbral = self.understanding_umbral)
\ No newline at end of file
+        update_understanding_4(observations, self, self.stm.get_memory('game_time'), last_reward, current_reward, state_changes, understanding_umbral = self.understanding_umbral)
+
+    def wait_background_tasks(self) -> None:
+        """
+        Waits for the reflection of the last turn, so its results are in the memories.
+        """
+        self.background_tasks.wait()
+
+    def get_checkpoint(self) -> dict:
+        """
+        Gets the memories of the agent to save on a checkpoint of the simulation, once the reflection of the last turn finished.
+
+        Returns:
+            dict: Short term, long term and spatial memories of the agent.
+        """
+        self.wait_background_tasks()
+        return {'stm': self.stm.get_checkpoint(), 'ltm': self.ltm.get_checkpoint(), 'spatial_memory': self.spatial_memory.get_checkpoint()}
+
+    def load_checkpoint(self, checkpoint: dict) -> None:
+        """
+        Replaces the memories of the agent with the ones of a checkpoint.
+
+        Args:
+            checkpoint (dict): Memories saved by get_checkpoint.
+        """
+        self.stm.load_checkpoint(checkpoint['stm'])
+        self.ltm.load_checkpoint(checkpoint['ltm'])
+        self.spatial_memory.load_checkpoint(checkpoint['spatial_memory'])
@@ -2,6 +2,7 @@ import os
 from llm import LLMModels
 from utils.llm import extract_answers
 from agent.memory_structures.short_term_memory import ShortTermMemory
+from game_environment.scene_descriptor.observation import Observation
 
 def should_react(name: str, world_context: str, observations: list[str], current_plan: str, actions_queue: list[str], changes_in_state: list[str], game_time: str, agent_bio: str = "", prompts_folder = "base_prompts_v0" ) -> tuple[bool, str]:
     """Decides if the agent should react to the observation.
@@ -37,33 +38,26 @@ def should_react(name: str, world_context: str, observations: list[str], current
     reasoning = answers.get('Reasoning', '')
     return answer, reasoning
 
-def update_known_agents(observations: list[str], stm: ShortTermMemory):
+def update_known_agents(observations: list[Observation], stm: ShortTermMemory):
     """Updates the known agents in the short term memory.
 
     Args:
-        observations (list[str]): List of observations of the environment.
+        observations (list[Observation]): List of observations of the environment.
         stm (ShortTermMemory): Short term memory of the agent.
 
     Returns:
         None
     """
-    known_agents = list(stm.get_known_agents())
-
-    for observation in observations:
-        if 'agent' in observation:
-            agent_name = observation.split(' ')[2] # agent name is the third word of the observation
-            if agent_name not in known_agents:
-                known_agents.append(agent_name)
-    
-    known_agents = set(known_agents)
+    known_agents = set(stm.get_known_agents())
+    known_agents.update(observation.entity_id for observation in observations if observation.kind == 'agent')
     stm.set_known_agents(known_agents)
 
 
-def update_known_objects(observations: list[str], stm: ShortTermMemory, substrate_name: str):
+def update_known_objects(observations: list[Observation], stm: ShortTermMemory, substrate_name: str):
     """Updates the known agents in the short term memory.
 
     Args:
-        observations (list[str]): List of observations of the environment.
+        observations (list[Observation]): List of observations of the environment.
         stm (ShortTermMemory): Short term memory of the agent.
 
     Returns:
@@ -71,17 +65,14 @@ def update_known_objects(observations: list[str], stm: ShortTermMemory, substrat
     """
     
     if substrate_name == 'commons_harvest_open':
-        known_trees = list(stm.get_known_objects_by_key(object_key='known_trees'))
+        known_trees = set(stm.get_known_objects_by_key(object_key='known_trees'))
 
         for observation in observations:
-            # Trees observations are like "Observed tree 2" we stract the number of the tree
-            if 'Observed tree' in observation:
-                tree_number = observation.split(' ')[2]
-                tree_position = ''.join(observation.split(' ')[5:7])[:-1]
-                if tree_number not in known_trees:
-                    known_trees.append((tree_number,tree_position))
+            # Known trees are stored as the tree number and its center, e.g. ('2', '[8,20]')
+            if observation.kind == 'tree':
+                tree_position = '[{},{}]'.format(*observation.position)
+                known_trees.add((str(observation.tree_id), tree_position))
         
-        known_trees = set(known_trees)
         stm.set_known_objects_by_key(known_trees, 'known_trees')
 
 
@@ -169,3 +169,26 @@ class LongTermMemory:
         source_collection = chroma_scene_client.get_collection(agent_name)
         source_data = source_collection.get()
         self.collection.add(documents=source_data['documents'], metadatas=source_data['metadatas'], ids=source_data['ids'])
+
+    def get_checkpoint(self) -> dict:
+        """Gets the memories to save on a checkpoint of the simulation, with their embeddings so they are not embedded again.
+
+        Returns:
+            dict: Ids, documents, metadatas and embeddings of all the memories.
+        """
+        memories = self.collection.get(include=['documents', 'metadatas', 'embeddings'])
+        return {'ids': memories['ids'], 'documents': memories['documents'], 'metadatas': memories['metadatas'],
+                'embeddings': [list(embedding) for embedding in memories['embeddings']]}
+
+    def load_checkpoint(self, checkpoint: dict) -> None:
+        """Replaces the memories with the ones of a checkpoint.
+
+        Args:
+            checkpoint (dict): Memories saved by get_checkpoint.
+        """
+        current_ids = self.collection.get(include=[])['ids']
+        if current_ids:
+            self.collection.delete(ids=current_ids)
+        if checkpoint['ids']:
+            self.collection.add(ids=checkpoint['ids'], documents=checkpoint['documents'], metadatas=checkpoint['metadatas'],
+                                embeddings=checkpoint['embeddings'])
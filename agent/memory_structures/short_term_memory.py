@@ -1,13 +1,25 @@
 import logging
 import os
+from queue import Queue
 
 from utils.files import load_agent_context, load_world_context
-from utils.logging import CustomAdapter
+from utils.logging import CustomAdapter, LazyRepr
+from utils.queue_utils import queue_from_list
+
+# Keys that are written on every turn of the agent, they are stored in dedicated slots instead of the generic dictionary
+HOT_MEMORY_KEYS = ('game_time', 'current_observation', 'current_plan', 'actions_sequence',
+                   'current_position', 'last_position', 'current_reward', 'last_reward')
+
+# Keys whose values are queues, they cannot be persisted so they are rendered as empty strings
+NON_PERSISTENT_KEYS = ('current_steps_sequence', 'actions_sequence')
 
 class ShortTermMemory:
-    """Class for yhe short term memory. Memories are stored in a dictionary.
+    """Class for yhe short term memory. The most used memories are stored in slots, the rest of them in a dictionary.
+    Every write stamps the key with a generation number, so render_memories only renders again the memories that changed since its last call.
     """
 
+    __slots__ = ('logger', 'memory', 'generation', 'modified_at', '_rendered') + HOT_MEMORY_KEYS
+
     def __init__(self, agent_context_file: str = None, world_context_file: str = None) ->  None:
         """Initializes the short term memory.
 
@@ -18,12 +30,32 @@ class ShortTermMemory:
         self.logger = logging.getLogger(__name__)
         self.logger = CustomAdapter(self.logger)
         self.memory = {}
+        self.generation = 0 # Incremented on every write
+        self.modified_at = {} # Generation of the last write of each key
+        self._rendered = {} # Cache of the rendered memories: key -> (generation, repr)
+        for key in HOT_MEMORY_KEYS:
+            setattr(self, key, None)
 
         if agent_context_file is not None:
-            self.memory = load_agent_context(agent_context_file)
+            for key, memory in load_agent_context(agent_context_file).items():
+                self._set(key, memory)
 
         if world_context_file is not None:
-            self.memory['world_context'] = load_world_context(world_context_file)
+            self._set('world_context', load_world_context(world_context_file))
+
+    def _set(self, key: str, memory) -> None:
+        """Stores a memory and marks the key as changed.
+
+        Args:
+            key (str): Key to access the memory.
+            memory: Memory to store.
+        """
+        if key in HOT_MEMORY_KEYS:
+            setattr(self, key, memory)
+        else:
+            self.memory[key] = memory
+        self.generation += 1
+        self.modified_at[key] = self.generation
 
     def add_memory(self, memory: str, key: str) -> None:
         """Adds a memory to the short term memory.
@@ -32,8 +64,8 @@ class ShortTermMemory:
             memory (str): Memory to add.
             key (str): Key to access the memory.
         """
-        self.logger.info(f"Adding memory to short term memory, Key: {key}. Memory: {memory}")
-        self.memory[key] = memory
+        self.logger.info("Adding memory to short term memory, Key: %s. Memory: %s", key, LazyRepr(memory))
+        self._set(key, memory)
 
     def get_memory(self, key: str) -> str:
         """Gets a memory from the short term memory.
@@ -44,15 +76,37 @@ class ShortTermMemory:
         Returns:
             str or None: Memory if it exists, None otherwise.
         """
+        if key in HOT_MEMORY_KEYS:
+            return getattr(self, key)
         return self.memory.get(key, None)
-    
+
     def get_memories(self) -> dict:
         """Gets all the memories from the short term memory.
 
         Returns:
             dict: All the memories.
         """
-        return self.memory
+        memories = {key: getattr(self, key) for key in HOT_MEMORY_KEYS if key in self.modified_at}
+        memories.update(self.memory)
+        return memories
+
+    def render_memories(self) -> str:
+        """Renders all the memories as a python dict literal. Only the memories that changed since the last call are rendered again.
+        Queues can not be rendered, so the keys on NON_PERSISTENT_KEYS are rendered as empty strings.
+
+        Returns:
+            str: Memories in the same format as str(dict).
+        """
+        items = []
+        # The keys are copied, a turn running on another thread can write memories meanwhile
+        for key, generation in list(self.modified_at.items()):
+            cached = self._rendered.get(key)
+            if cached is None or cached[0] != generation:
+                value = '' if key in NON_PERSISTENT_KEYS else self.get_memory(key)
+                cached = (generation, f'{key!r}: {value!r}')
+                self._rendered[key] = cached
+            items.append(cached[1])
+        return '{' + ', '.join(items) + '}'
 
     def get_known_agents(self) -> set[str]:
         """Gets the known agents from the short term memory.
@@ -74,12 +128,12 @@ class ShortTermMemory:
     def get_known_objects_by_key(self, object_key:str) -> set[str]:
         """Gets the known objects from the short term memory.
         Allows to get objects like known trees, known sectors, etc.
-        
+
         Returns:
             set[str]: Set of known objects.
         """
         return self.memory.get(object_key, set())
-    
+
     def set_known_objects_by_key(self, known_objects: set[str], object_key:str) -> None:
         """Sets the known objects in the short term memory.
         It lets set objects like known trees, known sectors, etc.
@@ -87,10 +141,35 @@ class ShortTermMemory:
             known_objects (set[str]): Set of known objects.
         """
         self.add_memory(known_objects, object_key)
-        
-        
-      
-    
+
+
+
+
+    def get_checkpoint(self) -> dict:
+        """Gets the memories to save on a checkpoint of the simulation. Queues can not be saved, so their steps are saved as lists.
+
+        Returns:
+            dict: Memories and the keys of the memories that are queues.
+        """
+        memories = self.get_memories()
+        queue_keys = [key for key, memory in memories.items() if isinstance(memory, Queue)]
+        return {'memories': {key: list(memory.queue) if key in queue_keys else memory for key, memory in memories.items()},
+                'queue_keys': queue_keys}
+
+    def load_checkpoint(self, checkpoint: dict) -> None:
+        """Replaces the memories with the ones of a checkpoint.
+
+        Args:
+            checkpoint (dict): Memories saved by get_checkpoint.
+        """
+        self.memory = {}
+        self.modified_at = {}
+        self._rendered = {}
+        for key in HOT_MEMORY_KEYS:
+            setattr(self, key, None)
+        for key, memory in checkpoint['memories'].items():
+            self._set(key, queue_from_list(memory) if key in checkpoint['queue_keys'] else memory)
+
     def load_memories_from_scene(self, scene_path: str, agent_name:str) -> None:
         """Loads memories from a scene file.
 
@@ -99,9 +178,16 @@ class ShortTermMemory:
             agent_name (str): Name of the agent.
         """
         source_stm_path = os.path.join(scene_path, "short_term_memories.txt")
-        
+
         #Read the file and load the memories
         scene_memories = eval(open(source_stm_path).read())
-        agent_memory = scene_memories.get(agent_name, self.memory)
-        self.memory = agent_memory
-        logging.info(f"Loaded memories from scene for agent {agent_name}. Memories: {agent_memory}")
\ No newline at end of file
+        agent_memory = scene_memories.get(agent_name)
+        if agent_memory is not None:
+            self.memory = {}
+            self.modified_at = {}
+            self._rendered = {}
+            for key in HOT_MEMORY_KEYS:
+                setattr(self, key, None)
+            for key, memory in agent_memory.items():
+                self._set(key, memory)
+        logging.info("Loaded memories from scene for agent %s. Memories: %s", agent_name, LazyRepr(self.get_memories()))
@@ -1,24 +1,30 @@
 import logging
 from queue import Queue
 import random
-from utils.route_plan import get_shortest_valid_route
+import numpy as np
+from utils.route_plan import RoutingIndex, get_next_state
 import re
-from utils.queue_utils import queue_from_list, new_empty_queue
+from utils.queue_utils import queue_from_list, new_empty_queue, list_from_queue
 from utils.math import manhattan_distance
 from utils.logging import CustomAdapter
+from game_environment.scene_descriptor.observation import Observation
 
 class SpatialMemory:
     """
     Class for the spacial memory. Memories are stored in a dictionary.
     """
 
-    def __init__ (self, scenario_map: str, scenario_obstacles: list[str] = ['W']  ) -> None:
+    def __init__ (self, scenario_map: str, scenario_obstacles: list[str] = ['W'], occupancy_ttl: int = 0,
+                  exploration_radius: int = 5, max_blocked_waits: int = 3) -> None:
         """
         Initializes the spacial memory.
 
         Args:
             scenario_map (str): Real map of the environment, in ascci format, rows separated by '\n'. 
             scenario_obstacles (list[str], optional): Obstacles of the scenario. Defaults to ['W'] for Walls.
+            occupancy_ttl (int, optional): Number of observed scenes that a position occupied by another agent is kept as an obstacle. Defaults to 0, only the last observed scene.
+            exploration_radius (int, optional): Radius of the square around a frontier position used to estimate its information gain. Defaults to 5, half the observation window.
+            max_blocked_waits (int, optional): Number of steps the agent waits for a position blocked by another agent before planning its route again. Defaults to 3.
         """
         self.logger = logging.getLogger(__name__)
         self.logger = CustomAdapter(self.logger)
@@ -28,7 +34,22 @@ class SpatialMemory:
         self.current_observed_map = None
         self.mapSize = (len(self.scenario_map), len(self.scenario_map[0]))
         self.scenario_obstacles = scenario_obstacles 
-        self.explored_map = ["?"*self.mapSize[1] for _ in range(self.mapSize[0])]
+        # Explored map as ascii codes, unseen cells keep the '?' code
+        self.explored_codes = np.full(self.mapSize, ord('?'), dtype=np.uint8)
+        self.seen_mask = np.zeros(self.mapSize, dtype=bool)
+        self.n_explored = 0
+        self._explored_map_view = None # Cache of the string view: (n_explored, rows)
+        # The obstacles are static, so the routing index is built once per map and shared by all the agents
+        self.routing_index = RoutingIndex.for_map(self.scenario_map, self.scenario_obstacles)
+        self.valid_mask = np.array(self.routing_index.valid, dtype=bool).reshape(self.mapSize)
+        self.exploration_radius = exploration_radius
+        # Positions occupied by other agents, with the number of the observed scene where they were seen
+        self.occupied_positions = {}
+        self.occupancy_ttl = occupancy_ttl
+        self.observed_scenes = 0
+        self.blocked_moves_avoided = 0
+        self.max_blocked_waits = max_blocked_waits
+        self.blocked_waits = {} # Steps waited for each blocked position, since the next move was last free
         
     def update_current_scene(self, new_position: tuple, orientation:int, current_observed_map:str) -> None:
         """
@@ -41,30 +62,160 @@ class SpatialMemory:
 
         """
         
-        self.position = new_position
-        self.orientation = orientation
+        self.update_occupancy(new_position, orientation, current_observed_map)
         self.current_observed_map = current_observed_map
         
         # By using the current observed map, we can update the explored map
         self.update_explored_map()
 
+    def update_occupancy(self, new_position: tuple, orientation: int, current_observed_map: str) -> None:
+        """
+        Updates the position of the agent and the positions occupied by the other agents, without updating the explored map.
+        It is cheap enough to be called on every step of the steps sequence.
+
+        Args:
+            new_position (tuple): New position of the agent.
+            orientation (int): New orientation of the agent.
+            current_observed_map (str): Current observed map.
+        """
+        self.position = new_position
+        self.orientation = orientation
+        self.observed_scenes += 1
+
+        agent_local_pos = self.get_local_self_position()
+        for i, row in enumerate(current_observed_map.split('\n')):
+            for j, element in enumerate(row):
+                if element.isdigit():
+                    self.occupied_positions[self.get_global_position((i, j), agent_local_pos)] = self.observed_scenes
+
+        self.occupied_positions = {position: seen_on for position, seen_on in self.occupied_positions.items()
+                                   if self.observed_scenes - seen_on <= self.occupancy_ttl}
+
+    def repair_steps_sequence(self, steps_sequence: Queue[str]) -> bool:
+        """
+        Repairs the steps sequence in place when its next move is blocked by another agent.
+        Instead of planning the whole route again, a detour is planned to the first state of the route after the blocked positions,
+        and the rest of the sequence is kept. If there is no detour the agent waits one step, up to max_blocked_waits steps
+        for the same blocked position. Then the route to the destination of the sequence is planned again around the occupied
+        positions, and the sequence is dropped if the destination can not be reached.
+
+        Args:
+            steps_sequence (Queue[str]): Remaining steps of the current action.
+
+        Returns:
+            bool: True if the sequence was repaired, False otherwise.
+        """
+        steps = list(steps_sequence.queue)
+        next_position = get_next_state(self.position, self.orientation, steps[0])[0] if steps else self.position
+        if next_position == self.position or next_position not in self.occupied_positions:
+            self.blocked_waits = {}
+            return False
+
+        # The block is counted once, not once per step waited
+        waits = self.blocked_waits.get(next_position, 0)
+        if waits == 0:
+            self.blocked_moves_avoided += 1
+
+        # Find the first state of the route that leaves the occupied positions
+        position, orientation = self.position, self.orientation
+        rejoin_index = None
+        for index, step in enumerate(steps):
+            position, orientation = get_next_state(position, orientation, step)
+            if index > 0 and position not in self.occupied_positions:
+                rejoin_index = index
+                break
+
+        detour = []
+        if rejoin_index is not None:
+            detour = self.routing_index.get_steps_route(self.position, position, self.orientation, end_orientation=orientation,
+                                                        blocked_positions=set(self.occupied_positions))
+        if detour:
+            new_steps = detour + steps[rejoin_index + 1:]
+        elif waits < self.max_blocked_waits:
+            self.blocked_waits[next_position] = waits + 1
+            new_steps = ['stay put'] + steps
+        else:
+            new_steps = self.replan_steps_sequence(steps)
+
+        list_from_queue(steps_sequence)
+        for step in new_steps:
+            steps_sequence.put(step)
+
+        self.logger.info(f'Next move {steps[0]} from {self.position} is blocked by another agent, new steps sequence: {new_steps}')
+        return True
+
+    def replan_steps_sequence(self, steps: list[str]) -> list[str]:
+        """
+        Plans again the route to the destination of a steps sequence around the positions occupied by other agents.
+        The steps after the last move of the sequence, like grabbing an apple, are kept.
+
+        Args:
+            steps (list[str]): Steps of the sequence.
+
+        Returns:
+            list[str]: New steps of the sequence, empty if the destination can not be reached.
+        """
+        position, orientation = self.position, self.orientation
+        last_move_index = -1
+        for index, step in enumerate(steps):
+            next_state = get_next_state(position, orientation, step)
+            if next_state != (position, orientation):
+                last_move_index = index
+            position, orientation = next_state
+
+        if position in self.occupied_positions:
+            self.logger.info(f'The destination {position} of the steps sequence is occupied by another agent, the sequence is dropped')
+            return []
+        route = self.routing_index.get_steps_route(self.position, position, self.orientation, end_orientation=orientation,
+                                                   blocked_positions=set(self.occupied_positions))
+        if not route:
+            self.logger.info(f'There is no route to {position} around the occupied positions, the sequence is dropped')
+            return []
+        return route + steps[last_move_index + 1:]
+
 
     def update_explored_map(self) -> None:
         """
         Updates the map with a new current map.
+        The observed window is rotated to the global orientation and written on the explored map with a single slice assignment.
         """
-        for i, row in enumerate(self.current_observed_map.split('\n')):
-            for j, element in enumerate(row):
-                if element != '-':
-                    try:
-                        global_position = self.get_global_position((i,j), self.get_local_self_position())
-                        if self.explored_map[global_position[0]][global_position[1]] == '?':
-                            # Replaces the char of the string global_position[0] at that is in the list of strings
-                            self.explored_map[global_position[0]] = self.explored_map[global_position[0]][:global_position[1]] + element + self.explored_map[global_position[0]][global_position[1]+1:]
-
-                    except:
-                        self.logger.error(f'Error updating the explored map with the element {element} {(i,j)} at position {global_position}')
-                        continue
+        rows = self.current_observed_map.split('\n')
+        local_map = np.frombuffer(''.join(rows).encode('ascii', 'replace'), dtype=np.uint8).reshape(len(rows), -1)
+        # Moves are relative to the orientation, rotating the window clockwise by the orientation aligns it with the global map
+        global_window = np.rot90(local_map, -self.orientation)
+
+        # Global position of the top left corner of the rotated window
+        corners = [self.get_global_position(corner, self.get_local_self_position())
+                   for corner in ((0, 0), (local_map.shape[0] - 1, local_map.shape[1] - 1))]
+        top, left = min(corners[0][0], corners[1][0]), min(corners[0][1], corners[1][1])
+
+        # Clips the window to the bounds of the map
+        row_start, col_start = max(top, 0), max(left, 0)
+        row_end = min(top + global_window.shape[0], self.mapSize[0])
+        col_end = min(left + global_window.shape[1], self.mapSize[1])
+        if row_start >= row_end or col_start >= col_end:
+            return
+        window = global_window[row_start - top:row_end - top, col_start - left:col_end - left]
+        map_slice = (slice(row_start, row_end), slice(col_start, col_end))
+
+        new_cells = (window != ord('-')) & ~self.seen_mask[map_slice]
+        self.explored_codes[map_slice][new_cells] = window[new_cells]
+        self.seen_mask[map_slice] |= new_cells
+        self.n_explored += int(new_cells.sum())
+
+    @property
+    def explored_map(self) -> list[str]:
+        """
+        Explored map as a list of rows, unseen cells are represented as '?'.
+
+        Returns:
+            list[str]: Rows of the explored map.
+        """
+        if self._explored_map_view is None or self._explored_map_view[0] != self.n_explored:
+            rows = [row.tobytes().decode('ascii') for row in self.explored_codes]
+            self._explored_map_view = (self.n_explored, rows)
+        return self._explored_map_view[1]
+
     def get_percentage_explored(self) -> float:
         """
         Returns the percentage of the map that has been explored.
@@ -72,43 +223,30 @@ class SpatialMemory:
         Returns:
             float: Percentage of the map that has been explored.
         """
-        n_explored = sum([row.count('?') for row in self.explored_map])
-        percentage = (1 - n_explored / (self.mapSize[0] * self.mapSize[1])) * 100
+        percentage = self.n_explored / (self.mapSize[0] * self.mapSize[1]) * 100
         return float("{:.2f}".format(percentage))
 
     def find_route_to_position(self, position_end: tuple, orientation:int, return_list: bool = False, include_last_pos=True ) -> Queue[str] | list[str]:
         """
-        Finds the shortest route to a position.
+        Finds the route to a position with the minimum number of steps, turns included.
 
         Args:
             position_end (tuple): End position of the route.
             orientation (int): Orientation of the agent. 0: North, 1: East, 2: South, 3: West.
             return_list (bool, optional): If True, returns a list instead of a queue. Defaults to False.
-            include_last_pos (bool, optional): If True, includes the last position of the route. Defaults to True.
+            include_last_pos (bool, optional): If True, the route ends on the position. Otherwise it ends next to the position facing it. Defaults to True.
             
         Returns:
             Queue(str): Steps sequence for the route.
         """
-        self.logger.info(f'Finding route from {self.scenario_map} to {position_end}')
+        self.logger.info(f'Finding route from {self.position} to {position_end}')
         # If the position is the same as the current one, return an empty queue
         if self.position == position_end:
             return queue_from_list(['stay put'])
-        route = get_shortest_valid_route(self.scenario_map, self.position, position_end, invalid_symbols=self.scenario_obstacles, orientation=orientation)
-
-
-        if not include_last_pos and len(route) > 0:
-            route = route[:-2] + route[-1:]
-        
-        # Adds a change on orientation on the last step of the route
-        if len(route) > 0:
-            new_orientation = 'turn '+ route[-1].split(' ')[1]
-            # If the new orientation is the same as the current one, we do not need to change it, if down we need to turn twice
-            if new_orientation == 'turn down':
-                route.append('turn right')
-                route.append('turn right')
-            else: 
-                route.append(new_orientation)
-
+        # Attacks and cleans need to end next to the position and facing it, other actions end on the position
+        blocked_positions = set(self.occupied_positions) - {tuple(position_end)}
+        route = self.routing_index.get_steps_route(self.position, position_end, orientation=orientation, face_end=not include_last_pos,
+                                                   blocked_positions=blocked_positions)
 
         if return_list:
             return route
@@ -201,21 +339,21 @@ class SpatialMemory:
             return (-1,-1)
         
     
-    def sort_observations_by_distance(self, observations: list[str]) -> list[str]:
+    def sort_observations_by_distance(self, observations: list[Observation]) -> list[Observation]:
         """
         Sorts the observations by distance to the agent in ascending order.
 
         Args:
-            observations (list[str]): List of observations.
+            observations (list[Observation]): List of observations.
 
         Returns:
-            list[str]: Sorted list of observations.
+            list[Observation]: Sorted list of observations.
         """
+        def distance(observation: Observation) -> int:
+            position = observation.position if observation.position is not None else (-1, -1)
+            return manhattan_distance(self.position, position)
 
-        observations_positions = [self.get_position_from_action(observation) for observation in observations]
-        observations_distances = [manhattan_distance(self.position, position) for position in observations_positions]
-
-        return sorted(observations, key=lambda x: observations_distances[observations.index(x)])
+        return sorted(observations, key=distance)
     
     def get_global_position(self, local_dest_pos: tuple[int, int], local_self_pos: tuple[int, int]) -> tuple[int, int]:
         """Get the global position of an element given its local position on the observed map.
@@ -262,8 +400,9 @@ class SpatialMemory:
     def generate_explore_sequence(self, position: str = None) -> Queue[str]:
         """
         Generates a sequence of steps to explore the map.
-        Takes a random position from the current_observed map
-        then finds the shortest route to that position and returns the steps sequence.
+        Goes to the frontier position with the best trade-off between information gain and travel cost,
+        if there are no reachable frontiers, takes a random position from the current observed map.
+        Then finds the shortest route to that position and returns the steps sequence.
 
         Args:
             position (str, optional): Position to explore. Defaults to None.
@@ -274,25 +413,12 @@ class SpatialMemory:
         if position is not None:
             destination = position
         else:
-            # Take a random position from the current_observed map
-            current_map_matrix = self.current_observed_map.split('\n')
-
-            # Finds the bounds of the current observed map
-            # TODO change that function to utils module
-            min_row, min_col, max_row, max_col = self.get_bounds_current_map(current_map_matrix)
-            random_row = random.randint(min_row, max_row)
-            random_col = random.randint(min_col, max_col)
-            # Is the destination a valid position? '-' means that the position does not exist on the map
-            while current_map_matrix[random_row][random_col] in ['W', '$', '-', '#']:
-                random_row = random.randint(min_row, max_row)
-                random_col = random.randint(min_col, max_col)
-            
-            # Get the global position of the destination
-            agent_local_pos = self.get_local_self_position()
-            destination = self.get_global_position((random_row, random_col), agent_local_pos)
+            destination = self.get_frontier_explore_destination()
+            if destination is None:
+                destination = self.get_random_explore_destination()
 
         # Finds the shortest route to that position
-        self.logger.info(f"Finding route to {destination} from {self.position} with orientation {self.orientation} using the map {self.scenario_map}")
+        self.logger.info(f"Finding route to {destination} from {self.position} with orientation {self.orientation}")
         sequence_steps = self.find_route_to_position(destination, self.orientation)
         if sequence_steps.qsize() < 1:
             self.logger.error(f'Could not find a route from {position} to the destination {destination}')
@@ -303,6 +429,70 @@ class SpatialMemory:
 
         return sequence_steps
 
+    def get_frontier_mask(self) -> np.ndarray:
+        """
+        Finds the frontier of the explored map: seen valid positions that are next to an unseen position.
+
+        Returns:
+            np.ndarray: Boolean mask of the frontier positions.
+        """
+        unseen = np.pad(~self.seen_mask, 1, constant_values=False)
+        next_to_unseen = unseen[:-2, 1:-1] | unseen[2:, 1:-1] | unseen[1:-1, :-2] | unseen[1:-1, 2:]
+        return self.seen_mask & self.valid_mask & next_to_unseen
+
+    def get_frontier_explore_destination(self) -> tuple[int, int] | None:
+        """
+        Picks the frontier position that maximizes the information gain per env step.
+        The information gain is the number of unseen positions around the frontier position,
+        the travel cost is the distance from the routing index.
+
+        Returns:
+            tuple[int, int] | None: Destination to explore, None if there are no reachable frontier positions.
+        """
+        distance_field = self.routing_index.get_distance_field(self.position)
+        frontier = self.get_frontier_mask()
+        if distance_field is None or not frontier.any():
+            return None
+
+        travel_cost = np.array(distance_field).reshape(self.mapSize)
+        candidates = frontier & (travel_cost > 0)
+        if not candidates.any():
+            return None
+
+        # Unseen positions on the square around each position, using an integral image
+        r = self.exploration_radius
+        unseen = np.pad((~self.seen_mask).astype(np.int32), ((r + 1, r), (r + 1, r)))
+        integral = unseen.cumsum(axis=0).cumsum(axis=1)
+        size = 2 * r + 1
+        information_gain = integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+
+        scores = np.where(candidates, information_gain / (np.maximum(travel_cost, 0) + 1), -1)
+        destination = np.unravel_index(np.argmax(scores), self.mapSize)
+        return int(destination[0]), int(destination[1])
+
+    def get_random_explore_destination(self) -> tuple[int, int]:
+        """
+        Takes a random valid position from the current observed map.
+
+        Returns:
+            tuple[int, int]: Destination to explore.
+        """
+        current_map_matrix = self.current_observed_map.split('\n')
+
+        # Finds the bounds of the current observed map
+        # TODO change that function to utils module
+        min_row, min_col, max_row, max_col = self.get_bounds_current_map(current_map_matrix)
+        random_row = random.randint(min_row, max_row)
+        random_col = random.randint(min_col, max_col)
+        # Is the destination a valid position? '-' means that the position does not exist on the map
+        while current_map_matrix[random_row][random_col] in ['W', '$', '-', '#']:
+            random_row = random.randint(min_row, max_row)
+            random_col = random.randint(min_col, max_col)
+        
+        # Get the global position of the destination
+        agent_local_pos = self.get_local_self_position()
+        return self.get_global_position((random_row, random_col), agent_local_pos)
+
 
     def get_bounds_current_map(self, current_map_matrix : list[str]) -> tuple[int, int, int, int]:
         """
@@ -360,3 +550,19 @@ class SpatialMemory:
             return 'West'
         else:
             raise Exception(f'Orientation {orientation} is not valid')
+
+    def get_checkpoint(self) -> dict:
+        """Gets the state of the spatial memory to save on a checkpoint of the simulation. The routing index only depends on the map, so it is not saved.
+
+        Returns:
+            dict: Attributes of the spatial memory.
+        """
+        return {key: value for key, value in vars(self).items() if key not in ('logger', 'routing_index', 'valid_mask')}
+
+    def load_checkpoint(self, checkpoint: dict) -> None:
+        """Replaces the state of the spatial memory with the one of a checkpoint.
+
+        Args:
+            checkpoint (dict): State saved by get_checkpoint.
+        """
+        vars(self).update(checkpoint)
@@ -0,0 +1,98 @@
+"""
+Measures the latency per step of the bot moves with one policy per bot, each bot stepping its own policy, against the bots
+grouped by policy with one shared policy and one batched inference per group. The meltingpot saved models are replaced
+by a numpy policy with a dense layer over the RGB observation and a recurrent state, so the measure shows the gain of
+reusing the weights of a policy for a whole batch of bots. The meltingpot policies have no step_batch method, so with them
+the bots only share the loaded policy and still step one by one.
+
+Usage: python -m benchmarks.bot_inference_benchmark
+"""
+import time
+
+import dm_env
+import numpy as np
+
+from game_environment import bots as bots_module
+from game_environment.bots import Bot, group_bots_by_policy
+from game_environment.utils import default_agent_actions_map
+
+RGB_SHAPE = (88, 88, 3)
+HIDDEN_SIZE = 256
+N_ACTIONS = 8
+
+class DensePolicy:
+    """Policy with a dense layer over the observation and a recurrent state, it picks the action with the highest logit"""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w_in = rng.standard_normal((int(np.prod(RGB_SHAPE)), HIDDEN_SIZE), dtype=np.float32) * 1e-3
+        self.w_state = rng.standard_normal((HIDDEN_SIZE, HIDDEN_SIZE), dtype=np.float32) * 1e-2
+        self.w_out = rng.standard_normal((HIDDEN_SIZE, N_ACTIONS), dtype=np.float32)
+
+    def initial_state(self):
+        return np.zeros(HIDDEN_SIZE, dtype=np.float32)
+
+    def _forward(self, rgb, state):
+        hidden = np.tanh(rgb.reshape(len(rgb), -1).astype(np.float32) @ self.w_in + state @ self.w_state)
+        return (hidden @ self.w_out).argmax(axis=1), hidden
+
+    def step(self, timestep, prev_state):
+        actions, states = self._forward(timestep.observation['RGB'][None], prev_state[None])
+        return int(actions[0]), states[0]
+
+    def step_batch(self, timestep, prev_states):
+        actions, states = self._forward(timestep.observation['RGB'], np.stack(prev_states))
+        return actions.tolist(), list(states)
+
+def make_timestep(n_bots, seed):
+    rng = np.random.default_rng(seed)
+    observation = {'WORLD.RGB': np.zeros((144, 192, 3), dtype=np.uint8)}
+    for i in range(1, n_bots + 1):
+        observation[f'{i}.RGB'] = rng.integers(0, 256, RGB_SHAPE, dtype=np.uint8)
+        observation[f'{i}.ORIENTATION'] = np.int32(rng.integers(4))
+        observation[f'{i}.READY_TO_SHOOT'] = np.float64(1.0)
+        observation[f'{i}.POSITION'] = rng.integers(0, 20, 2, dtype=np.int32)
+        observation[f'{i}.REWARD'] = np.float64(0.0)
+    return dm_env.transition(0.0, observation)
+
+def make_bots(n_bots, n_policies):
+    action_set = [default_agent_actions_map() | {'move': i} for i in range(N_ACTIONS)]
+    return [Bot(f'policy_{i % n_policies}', f'bot_{i + 1}', i + 1, action_set) for i in range(n_bots)]
+
+def step_latency(move, timesteps):
+    start = time.perf_counter()
+    for timestep in timesteps:
+        move(timestep)
+    return (time.perf_counter() - start) / len(timesteps)
+
+def main(n_policies: int = 2, n_steps: int = 20):
+    # The policies are built once by name, every bot with the same name shares the loaded policy
+    bots_module.build = lambda policy_name: DensePolicy(seed=int(policy_name.split('_')[-1]))
+    print(f'Bot moves per step, {n_policies} policies:')
+    for n_bots in [2, 8, 16]:
+        timesteps = [make_timestep(n_bots, seed) for seed in range(n_steps)]
+        bots_module._policies.clear()
+        grouped_bots = make_bots(n_bots, n_policies)
+        bot_groups = group_bots_by_policy(grouped_bots)
+        assert len(bot_groups) == min(n_bots, n_policies)
+        assert len({id(bot.policy) for bot in grouped_bots}) == len(bot_groups)
+
+        # Previously each bot built its own policy and stepped it alone
+        single_bots = make_bots(n_bots, n_policies)
+        for bot in single_bots:
+            bot.policy = DensePolicy(seed=int(bot.policy_name.split('_')[-1]))
+
+        # Both ways give the same actions for the same observations
+        for timestep in timesteps[:3]:
+            grouped_actions = {}
+            for bot_group in bot_groups:
+                grouped_actions.update(bot_group.move(timestep))
+            assert grouped_actions == {bot.name: bot.move(timestep) for bot in single_bots}
+
+        single_time = step_latency(lambda timestep: [bot.move(timestep) for bot in single_bots], timesteps)
+        grouped_time = step_latency(lambda timestep: [bot_group.move(timestep) for bot_group in bot_groups], timesteps)
+        print(f'{n_bots:4d} bots   one policy per bot: {single_time * 1e3:7.2f} ms   '
+              f'batched by policy: {grouped_time * 1e3:7.2f} ms   speedup: {single_time / grouped_time:5.2f}x')
+
+if __name__ == '__main__':
+    main()
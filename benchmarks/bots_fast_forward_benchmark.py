@@ -0,0 +1,79 @@
+"""
+Measures the env steps per second of headless Game.step on bot heavy scenarios, describing the scenes of all the players
+against the fast forward of the bots, where only the LLM agents are described and tracked. The LLM agents stay put and
+observe, the bots move from a policy that always picks the same action. The environment replays pregenerated timesteps
+of the commons harvest map, as on the headless step benchmark.
+
+Usage: python -m benchmarks.bots_fast_forward_benchmark
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from ml_collections import config_dict
+
+from benchmarks.headless_step_benchmark import ReplayEnv
+from benchmarks.scene_descriptor_benchmark import VIEW
+from game_environment.playing_utils.level_playing_utils import Game, RenderType
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from game_environment.utils import default_agent_actions_map
+
+class FixedActionPolicy:
+    """Policy that always moves forward"""
+
+    def initial_state(self):
+        return None
+
+    def step_batch(self, timestep, prev_states):
+        return [1] * len(prev_states), prev_states
+
+def make_game(n_agents, n_bots, n_steps, fast_forward_bots):
+    n_players = n_agents + n_bots
+    player_names = [f'agent_{i}' for i in range(n_agents)] + [f'bot_{i}' for i in range(n_bots)]
+    policy = FixedActionPolicy()
+    action_set = [default_agent_actions_map() | {'move': i} for i in range(5)]
+    bots = [SimpleNamespace(name=name, policy_name='fixed', policy=policy, player_index=n_agents + i + 1, state=None, ACTION_SET=action_set)
+            for i, name in enumerate(player_names[n_agents:])]
+    game_objects = [{"components": [{"component": "Avatar", "kwargs": {"view": VIEW}}]} for _ in range(n_players)]
+    config = config_dict.ConfigDict({'lab2d_settings': {'numPlayers': n_players, 'levelName': 'commons_harvest_open',
+                                                         'simulation': {'gameObjects': game_objects}},
+                                     'player_names': player_names})
+    game = Game('WORLD.RGB', {}, {}, config, ASCII_MAP, init_timestamp='benchmark', interactive=RenderType.NONE,
+                env_builder=lambda **kwargs: ReplayEnv(n_players, n_steps), player_prefixes=player_names, bots=bots,
+                fast_forward_bots=fast_forward_bots)
+    # The bots policies also get the first person observations of their players
+    for observation in game.env.observations:
+        for bot in bots:
+            observation[f'{bot.player_index}.RGB'] = np.zeros((88, 88, 3), dtype=np.uint8)
+            observation[f'{bot.player_index}.READY_TO_SHOOT'] = 1.0
+    return game
+
+def run_steps(n_agents, n_bots, n_steps, fast_forward_bots):
+    game = make_game(n_agents, n_bots, n_steps, fast_forward_bots)
+    actions = {name: default_agent_actions_map() for name in game.player_prefixes}
+    game.step(None)
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        for bot_group in game.bot_groups:
+            actions.update(bot_group.move(game.timestep))
+        game.step(actions)
+    elapsed = time.perf_counter() - start
+    state_changes = {name: game.observationsGenerator.get_observed_changes_per_agent(name) for name in game.focal_players}
+    descriptions = {name: game.curr_scene_description[name]['observation'] for name in game.focal_players}
+    game.end_game()
+    return n_steps / elapsed, state_changes, descriptions
+
+def main(n_agents: int = 3, n_steps: int = 100, repeat: int = 3):
+    print(f'Headless Game.step with {n_agents} LLM agents:')
+    for n_bots in [0, 4, 13]:
+        full_runs = [run_steps(n_agents, n_bots, n_steps, fast_forward_bots=False) for _ in range(repeat)]
+        fast_runs = [run_steps(n_agents, n_bots, n_steps, fast_forward_bots=True) for _ in range(repeat)]
+        full_rate, fast_rate = max(run[0] for run in full_runs), max(run[0] for run in fast_runs)
+        (_, full_changes, full_descriptions), (_, fast_changes, fast_descriptions) = full_runs[0], fast_runs[0]
+        # The LLM agents observe the same scenes and the same changes
+        assert fast_changes == full_changes and fast_descriptions == full_descriptions
+        print(f'{n_bots:4d} bots   all described: {full_rate:8.1f} steps/s   bots fast forward: {fast_rate:8.1f} steps/s   '
+              f'speedup: {fast_rate / full_rate:5.2f}x')
+
+if __name__ == '__main__':
+    main()
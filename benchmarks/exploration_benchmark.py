@@ -0,0 +1,73 @@
+"""
+Compares the percentage of the map explored versus env steps of the frontier exploration against
+the previous random exploration (random valid position of the current observed window).
+The agent only executes explore actions, with the same 11x11 observation window as the game.
+
+Usage: python -m benchmarks.exploration_benchmark
+"""
+import random
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from agent.memory_structures.spatial_memory import SpatialMemory
+from utils.route_plan import get_next_state
+
+OBSTACLES = ['W', '$']
+CHECKPOINTS = [25, 50, 100, 200, 400]
+
+def observe(memory: SpatialMemory) -> str:
+    """Builds the observed window of the agent from the real map, cells outside of the map are padded with '-'"""
+    local_self_pos = memory.get_local_self_position()
+    rows = []
+    for i in range(11):
+        row = ''
+        for j in range(11):
+            global_i, global_j = memory.get_global_position((i, j), local_self_pos)
+            if (i, j) == local_self_pos:
+                row += '#'
+            elif 0 <= global_i < memory.mapSize[0] and 0 <= global_j < memory.mapSize[1]:
+                row += memory.scenario_map[global_i][global_j]
+            else:
+                row += '-'
+        rows.append(row)
+    return '\n'.join(rows)
+
+def run_episode(strategy: str, start: tuple[int, int], orientation: int) -> list[float]:
+    memory = SpatialMemory(ASCII_MAP, OBSTACLES)
+    position = start
+    steps = []
+    explored = []
+    for step_number in range(1, CHECKPOINTS[-1] + 1):
+        memory.position, memory.orientation = position, orientation
+        memory.update_current_scene(position, orientation, observe(memory))
+        if not steps:
+            if strategy == 'frontier':
+                steps = list(memory.generate_explore_sequence().queue)
+            else:
+                destination = memory.get_random_explore_destination()
+                steps = list(memory.generate_explore_sequence(destination).queue)
+            steps = steps or ['stay put']
+        next_position, orientation = get_next_state(position, orientation, steps.pop(0))
+        if memory.scenario_map[next_position[0]][next_position[1]] not in OBSTACLES:
+            position = next_position
+        if step_number in CHECKPOINTS:
+            explored.append(memory.get_percentage_explored())
+    return explored
+
+def main(n_episodes: int = 20, seed: int = 0):
+    scenario_map = ASCII_MAP.split('\n')[1:-1]
+    valid_cells = [(i, j) for i, row in enumerate(scenario_map) for j, c in enumerate(row) if c not in OBSTACLES]
+    rng = random.Random(seed)
+    starts = [(rng.choice(valid_cells), rng.randrange(4)) for _ in range(n_episodes)]
+
+    print(f'Episodes: {n_episodes}. Percentage explored after N env steps:')
+    print('strategy  ' + ''.join(f'{checkpoint:>8d}' for checkpoint in CHECKPOINTS))
+    for strategy in ['random', 'frontier']:
+        random.seed(seed)
+        totals = [0.0] * len(CHECKPOINTS)
+        for start, orientation in starts:
+            for k, percentage in enumerate(run_episode(strategy, start, orientation)):
+                totals[k] += percentage
+        print(f'{strategy:10s}' + ''.join(f'{total / n_episodes:7.1f}%' for total in totals))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Measures the env steps per second of Game.step with the pygame rendering, throttled to the default 8 fps, against the
+headless RenderType.NONE mode. The environment is replaced by one that replays pregenerated timesteps of the commons
+harvest map, so the measure only includes the work of the Game itself. The pygame display uses the SDL dummy driver.
+
+Usage: python -m benchmarks.headless_step_benchmark
+"""
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import dm_env
+import numpy as np
+from ml_collections import config_dict
+
+from benchmarks.scene_descriptor_benchmark import VIEW, make_timesteps
+from game_environment.playing_utils.level_playing_utils import Game, RenderType
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from game_environment.utils import default_agent_actions_map
+
+ACTION_NAMES = ['move', 'turn', 'fireZap']
+
+class ReplayEnv:
+    """Environment that returns the same timesteps on a loop, whatever the actions are"""
+
+    def __init__(self, n_players, n_steps):
+        self.observations = [timestep.observation for timestep in make_timesteps(n_players, n_steps)]
+        for observation in self.observations:
+            observation['WORLD.RGB'] = np.zeros((144, 192, 3), dtype=np.uint8)
+        self.n_players = n_players
+        self.step_count = 0
+
+    def reset(self):
+        return dm_env.restart(self.observations[0])
+
+    def step(self, actions):
+        self.step_count += 1
+        return dm_env.transition(0.0, self.observations[self.step_count % len(self.observations)])
+
+    def observation_spec(self):
+        return {'WORLD.RGB': self.observations[0]['WORLD.RGB']}
+
+    def action_spec(self):
+        return {f'{i + 1}.{action_name}': None for i in range(self.n_players) for action_name in ACTION_NAMES}
+
+    def close(self):
+        pass
+
+def make_game(interactive, n_players, n_steps):
+    player_names = [f'player_{i}' for i in range(n_players)]
+    game_objects = [{"components": [{"component": "Avatar", "kwargs": {"view": VIEW}}]} for _ in range(n_players)]
+    config = config_dict.ConfigDict({'lab2d_settings': {'numPlayers': n_players, 'levelName': 'commons_harvest_open',
+                                                         'simulation': {'gameObjects': game_objects}},
+                                     'player_names': player_names})
+    return Game('WORLD.RGB', {}, {}, config, ASCII_MAP, init_timestamp='benchmark', interactive=interactive,
+                env_builder=lambda **kwargs: ReplayEnv(n_players, n_steps), player_prefixes=player_names)
+
+def steps_per_second(interactive, n_players, n_steps):
+    game = make_game(interactive, n_players, n_steps)
+    actions = {name: default_agent_actions_map() for name in game.player_prefixes}
+    start_time = game.time
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        game.step(actions)
+    elapsed = time.perf_counter() - start
+    # The game time advances one hour per step whatever the rendering is
+    assert (game.time - start_time).total_seconds() == n_steps * 3600
+    game.end_game()
+    return n_steps / elapsed
+
+def main(n_players: int = 3):
+    pygame_rate = steps_per_second(RenderType.PYGAME, n_players, 16)
+    headless_rate = steps_per_second(RenderType.NONE, n_players, 500)
+    print(f'Game.step with {n_players} players:')
+    print(f'  pygame (8 fps): {pygame_rate:8.1f} steps/s')
+    print(f'  headless:       {headless_rate:8.1f} steps/s   speedup: {headless_rate / pygame_rate:6.1f}x')
+
+if __name__ == '__main__':
+    main()
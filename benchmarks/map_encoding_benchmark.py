@@ -0,0 +1,43 @@
+"""
+Measures the memory of a stored map and the conversion time per step of the commons harvest map stored as a grid of
+uint8 codes against the previous '<U1' matrix of chars. A step parses the global map and renders the observation
+window of each avatar as text.
+
+Usage: python -m benchmarks.map_encoding_benchmark
+"""
+import timeit
+
+import numpy as np
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from game_environment.utils import parse_string_to_matrix, matrix_to_string, parse_string_to_grid, grid_to_string
+
+def window(map, k):
+    """Window of 11x11 cells of the rotated map, as cropped for an avatar"""
+    return np.rot90(map, k=k)[2:13, 3:14]
+
+def main(n_avatars: int = 10, number: int = 500):
+    scenario_map = '\n'.join(ASCII_MAP.split('\n')[1:-1])
+    char_map, grid = parse_string_to_matrix(scenario_map), parse_string_to_grid(scenario_map)
+    assert grid_to_string(grid) == matrix_to_string(char_map)
+    for k in range(4):
+        assert grid_to_string(window(grid, k)) == matrix_to_string(window(char_map, k))
+
+    def chars_step():
+        map = parse_string_to_matrix(scenario_map)
+        for avatar in range(n_avatars):
+            matrix_to_string(window(map, avatar))
+
+    def grid_step():
+        map = parse_string_to_grid(scenario_map)
+        for avatar in range(n_avatars):
+            grid_to_string(window(map, avatar))
+
+    chars_time = min(timeit.repeat(chars_step, number=number, repeat=5)) / number
+    grid_time = min(timeit.repeat(grid_step, number=number, repeat=5)) / number
+    print(f'Map of {grid.shape[0]}x{grid.shape[1]} cells, {n_avatars} avatars:')
+    print(f'  memory per map    chars: {char_map.nbytes:6d} B   grid: {grid.nbytes:6d} B   ratio: {char_map.nbytes / grid.nbytes:5.2f}x')
+    print(f'  conversion/step   chars: {chars_time * 1e6:6.1f} us  grid: {grid_time * 1e6:6.1f} us  speedup: {chars_time / grid_time:5.2f}x')
+
+if __name__ == '__main__':
+    main()
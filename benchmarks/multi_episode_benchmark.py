@@ -0,0 +1,75 @@
+"""
+Measures the episodes per hour of running several episodes as run_simulations.py does, one `python` process per episode
+started with a fixed stagger, against run_episodes.py, where the episodes run together in a single process. Each episode
+is a game loop on the concurrent turn mode with the fake agents and environment of the turn scheduler benchmark, so the
+measure shows the startup cost paid by each process (imports, substrate install) plus the stagger, against the startup
+paid once and the thinking time of the episodes overlapping.
+
+Usage: python -m benchmarks.multi_episode_benchmark
+"""
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks.turn_scheduler_benchmark import FakeAgent, FakeEnv
+from utils.turn_scheduler import CONCURRENT
+
+N_AGENTS = 3
+ARGS = SimpleNamespace(substrate='commons_harvest_open', persist_memories=False, turn_mode=CONCURRENT)
+
+class EpisodeEnv(FakeEnv):
+    def end_game(self):
+        pass
+
+def make_episode(seed, latency, step_time):
+    names = [f'agent_{i}' for i in range(N_AGENTS)]
+    agents = [FakeAgent(name, n_steps=3 + 2 * i, latency=latency, seed=seed + i) for i, name in enumerate(names)]
+    return EpisodeEnv(names, step_time, scene_change_probability=0.0), agents
+
+def run_in_process(n_episodes, latency, step_time):
+    """Runs the episodes together as run_episodes.py does, the process is already started"""
+    from game_environment import server
+    from run_episodes import run_episode
+    server.game = server.import_game('commons_harvest_open')
+    start = time.perf_counter()
+    episodes = [make_episode(seed, latency, step_time) for seed in range(n_episodes)]
+    with ThreadPoolExecutor(max_workers=n_episodes) as executor:
+        rounds = list(executor.map(lambda episode: run_episode(*episode, ARGS, 'benchmark'), episodes))
+    assert all(rounds_count == 3 for rounds_count in rounds)
+    return n_episodes / (time.perf_counter() - start) * 3600
+
+def run_in_subprocesses(n_episodes, latency, step_time, stagger):
+    """Runs each episode on its own process started after a fixed stagger, as run_simulations.py does"""
+    def run_subprocess(seed):
+        time.sleep(seed * stagger)
+        command = [sys.executable, '-m', 'benchmarks.multi_episode_benchmark', 'episode', str(seed), str(latency), str(step_time)]
+        subprocess.run(command, check=True, capture_output=True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_episodes) as executor:
+        list(executor.map(run_subprocess, range(n_episodes)))
+    return n_episodes / (time.perf_counter() - start) * 3600
+
+def run_single_episode(seed, latency, step_time):
+    """Entry point of the episode processes, it pays the imports of main.py as each simulation did"""
+    import main
+    from game_environment import server
+    server.game = server.import_game('commons_harvest_open')
+    env, agents = make_episode(seed, latency, step_time)
+    main.game_loop(env, agents, ARGS.substrate, ARGS.persist_memories, ARGS.turn_mode, 'benchmark')
+
+def main_benchmark(latency: float = 0.5, step_time: float = 0.02, stagger: float = 5.0):
+    print(f'Episodes per hour, {N_AGENTS} agents, {latency * 1e3:.0f} ms mean thinking time per turn, {stagger:.0f} s stagger between processes:')
+    for n_episodes in [2, 4]:
+        subprocess_rate = run_in_subprocesses(n_episodes, latency, step_time, stagger)
+        in_process_rate = run_in_process(n_episodes, latency, step_time)
+        print(f'{n_episodes:3d} episodes   one process each: {subprocess_rate:7.0f}   single process: {in_process_rate:7.0f}   '
+              f'speedup: {in_process_rate / subprocess_rate:5.2f}x')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'episode':
+        run_single_episode(int(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4]))
+    else:
+        main_benchmark()
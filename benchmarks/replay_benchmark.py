@@ -0,0 +1,59 @@
+"""
+Measures the replay of an episode from its actions log, as replay_episode.py does, with the fake environment of the
+headless step benchmark. The replay that only steps the environment is compared with the one that also describes the
+scenes and tracks the state changes, the work of Game.step that the benchmarks of the scene descriptor and of the
+observations generator isolate. The size of the compact actions log is compared with the same steps pickled as the list
+of actions maps the checkpoints held before.
+
+Usage: python -m benchmarks.replay_benchmark
+"""
+import os
+import pickle
+import random
+import tempfile
+import time
+
+from benchmarks.headless_step_benchmark import make_game
+from game_environment.playing_utils.action_log import ActionLog
+from game_environment.playing_utils.level_playing_utils import RenderType
+from game_environment.utils import default_agent_actions_map
+
+def record_episode(n_players, n_steps):
+    """Plays an episode with random actions and returns its actions log"""
+    game = make_game(RenderType.NONE, n_players, n_steps)
+    rng = random.Random(0)
+    for _ in range(n_steps):
+        actions = {name: default_agent_actions_map() for name in game.player_prefixes}
+        for action in actions.values():
+            action['move'], action['turn'], action['fireZap'] = rng.randint(0, 4), rng.randint(-1, 1), rng.randint(0, 1)
+        game.step(actions)
+    game.end_game()
+    return game.action_log
+
+def steps_per_second(action_log, n_players, n_steps, describe):
+    game = make_game(RenderType.NONE, n_players, n_steps)
+    start = time.perf_counter()
+    game.replay(action_log, describe=describe)
+    elapsed = time.perf_counter() - start
+    assert list(game.action_log) == list(action_log)
+    game.end_game()
+    return len(action_log) / elapsed
+
+def main(n_players: int = 3, n_steps: int = 500):
+    action_log = record_episode(n_players, n_steps)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'actions_log.npz')
+        action_log.save(path)
+        log_size = os.path.getsize(path)
+        action_log = ActionLog.load(path)
+    pickled_size = len(pickle.dumps(list(action_log)))
+
+    environment_rate = steps_per_second(action_log, n_players, n_steps, describe=False)
+    describe_rate = steps_per_second(action_log, n_players, n_steps, describe=True)
+    print(f'Replay of {n_steps} steps with {n_players} players:')
+    print(f'  describing the scenes: {describe_rate:10.1f} steps/s')
+    print(f'  environment only:      {environment_rate:10.1f} steps/s   speedup: {environment_rate / describe_rate:6.1f}x')
+    print(f'Actions log size: {log_size:,} bytes, pickled actions maps: {pickled_size:,} bytes   {pickled_size / log_size:5.1f}x smaller')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark of the routing index against the BFS route planner.
+Computes the routes between random pairs of valid cells of the commons harvest map.
+
+Usage: python -m benchmarks.route_plan_benchmark
+"""
+import random
+import time
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from utils.route_plan import get_shortest_valid_route, RoutingIndex
+
+def main(n_routes: int = 2000, seed: int = 0):
+    scenario_map = ASCII_MAP.split('\n')[1:-1]
+    obstacles = ['W', '$']
+    valid_cells = [(i, j) for i, row in enumerate(scenario_map) for j, c in enumerate(row) if c not in obstacles]
+    rng = random.Random(seed)
+    pairs = [(rng.choice(valid_cells), rng.choice(valid_cells)) for _ in range(n_routes)]
+
+    start = time.perf_counter()
+    for origin, destination in pairs:
+        get_shortest_valid_route(scenario_map, origin, destination, invalid_symbols=obstacles)
+    bfs_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    routing_index = RoutingIndex(scenario_map, obstacles)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for origin, destination in pairs:
+        routing_index.get_route(origin, destination)
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for origin, destination in pairs:
+        routing_index.get_route(origin, destination)
+    warm_time = time.perf_counter() - start
+
+    print(f'Routes: {n_routes} on a {len(scenario_map)}x{len(scenario_map[0])} map')
+    print(f'BFS per route:                  {bfs_time / n_routes * 1e6:8.1f} us')
+    print(f'Index build:                    {build_time * 1e3:8.1f} ms')
+    print(f'Index per route (cold cache):   {cold_time / n_routes * 1e6:8.1f} us')
+    print(f'Index per route (warm cache):   {warm_time / n_routes * 1e6:8.1f} us')
+
+if __name__ == '__main__':
+    main()
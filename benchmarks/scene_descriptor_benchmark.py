@@ -0,0 +1,128 @@
+"""
+Measures describe_scene per step with 3, 10 and 30 players on the commons harvest map, with the shared padded and
+rotated views against the previous implementation, that padded and rotated the full map twice per avatar.
+Avatars are located in the map by their id, ids of 10 or more are truncated to their first digit by the '<U1' map,
+so the previous implementation crops around the first avatar with that digit. The cost is the same.
+
+Usage: python -m benchmarks.scene_descriptor_benchmark
+"""
+import random
+import re
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from game_environment.scene_descriptor.scene_descriptor import SceneDescriptor
+from game_environment.utils import matrix_to_string, parse_string_to_matrix
+
+VIEW = {'left': 5, 'right': 5, 'forward': 9, 'backward': 1, 'centered': False}
+
+class PreviousSceneDescriptor(SceneDescriptor):
+    """Scene descriptor with the partial observations computed as before the shared views"""
+
+    def describe_scene(self, timestep):
+        self.reset_population()
+        map, zaps = self.previous_parse_timestep(timestep)
+        self.parse_zaps(zaps)
+        self.compute_previous_partial_observations(map, self.last_map)
+        self.last_map = map
+        result = {}
+        for avatar_id, avatar in self.avatars.items():
+            result[avatar.name] = {"observation": avatar.partial_observation,
+                                   "agents_in_observation": avatar.agents_in_observation,
+                                   "global_position": avatar.position,
+                                   "orientation": int(avatar.orientation),
+                                   "last_observation": avatar.last_partial_observation,
+                                   "effective_zap": avatar.name in [a.murder for a in self.avatars.values() if a.just_died],
+                                   }
+        return result, map
+
+    def previous_parse_timestep(self, timestep):
+        map = parse_string_to_matrix(timestep.observation["GLOBAL.TEXT"].item().decode("utf-8"))
+        states = timestep.observation["WORLD.AVATAR_STATES"]
+        for avatar_id, avatar in self.avatars.items():
+            position = timestep.observation[f"{avatar_id + 1}.POSITION"]
+            if states[avatar_id]:
+                map[position[1], position[0]] = avatar_id
+            avatar.set_position(position[1], position[0])
+            avatar.set_orientation(timestep.observation[f"{avatar_id + 1}.ORIENTATION"])
+            avatar.set_reward(timestep.observation[f"{avatar_id + 1}.REWARD"])
+            avatar.set_state(states[avatar_id])
+        return map, timestep.observation["WORLD.WHO_ZAPPED_WHO"]
+
+    def compute_previous_partial_observations(self, map, last_map):
+        for avatar_id, avatar in self.avatars.items():
+            min_padding = max(avatar.avatar_view.values())
+            padded_map = np.rot90(self.pad_matrix_to_square(map, min_padding), k=int(avatar.orientation))
+            observation, agents_in_observation = self.previous_crop_observation(padded_map, avatar_id, avatar.avatar_view)
+            avatar.set_partial_observation(observation)
+            avatar.set_agents_in_observation(agents_in_observation)
+            if last_map is not None:
+                last_padded_map = np.rot90(self.pad_matrix_to_square(last_map, min_padding), k=int(avatar.orientation))
+                last_observation, _ = self.previous_crop_observation(last_padded_map, avatar_id, avatar.avatar_view)
+                avatar.set_last_partial_observation(last_observation)
+
+    def previous_crop_observation(self, map, avatar_id, avatar_view):
+        avatar_pos = np.where(map == str(avatar_id)[0])
+        avatar_pos = list(zip(avatar_pos[1], avatar_pos[0]))[0]
+        observation = matrix_to_string(map[avatar_pos[1] - avatar_view.get("forward"):avatar_pos[1] + avatar_view.get("backward") + 1,
+                                           avatar_pos[0] - avatar_view.get("left"):avatar_pos[0] + avatar_view.get("right") + 1])
+        observation = observation.replace(str(avatar_id), "#")
+        return observation, self.previous_get_agents_in_observation(observation)
+
+    def previous_get_agents_in_observation(self, observation):
+        digits_list = []
+        for string in observation:
+            digits_list.extend(re.findall(r'\d+', string))
+        return {digit: self.avatars[int(digit)].name for digit in digits_list}
+
+def make_substrate_config(n_players):
+    game_objects = [{"components": [{"component": "Avatar", "kwargs": {"view": VIEW}}]} for _ in range(n_players)]
+    return SimpleNamespace(lab2d_settings=SimpleNamespace(numPlayers=n_players, simulation=SimpleNamespace(gameObjects=game_objects)),
+                           player_names=[f'player_{i}' for i in range(n_players)])
+
+def make_timesteps(n_players, n_steps, seed=0):
+    rng = random.Random(seed)
+    scenario_map = ASCII_MAP.split('\n')[1:-1]
+    valid_cells = [(i, j) for i, row in enumerate(scenario_map) for j, c in enumerate(row) if c != 'W']
+    global_text = np.array('\n'.join(scenario_map).encode('utf-8'))
+    timesteps = []
+    for _ in range(n_steps):
+        observation = {"GLOBAL.TEXT": global_text,
+                       "WORLD.WHO_ZAPPED_WHO": np.zeros((n_players, n_players)),
+                       "WORLD.AVATAR_STATES": np.ones(n_players)}
+        for avatar_id, (i, j) in enumerate(rng.sample(valid_cells, n_players)):
+            observation[f"{avatar_id + 1}.POSITION"] = np.array([j, i])
+            observation[f"{avatar_id + 1}.ORIENTATION"] = np.int32(rng.randrange(4))
+            observation[f"{avatar_id + 1}.REWARD"] = 0.0
+        timesteps.append(SimpleNamespace(observation=observation))
+    return timesteps
+
+def time_descriptor(descriptor_class, n_players, timesteps, repeat=5):
+    def run():
+        descriptor = descriptor_class(make_substrate_config(n_players))
+        for timestep in timesteps:
+            descriptor.describe_scene(timestep)
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(timesteps)
+
+def main(n_steps: int = 50):
+    # Both implementations must describe the same scenes
+    timesteps = make_timesteps(3, n_steps)
+    previous, shared = PreviousSceneDescriptor(make_substrate_config(3)), SceneDescriptor(make_substrate_config(3))
+    text_keys = ['observation', 'agents_in_observation', 'global_position', 'orientation', 'last_observation', 'effective_zap']
+    for timestep in timesteps:
+        previous_description, shared_description = previous.describe_scene(timestep)[0], shared.describe_scene(timestep)[0]
+        for name in previous_description:
+            assert all(previous_description[name][key] == shared_description[name][key] for key in text_keys)
+
+    print(f'describe_scene time per step, {n_steps} steps:')
+    for n_players in [3, 10, 30]:
+        timesteps = make_timesteps(n_players, n_steps)
+        previous_time = time_descriptor(PreviousSceneDescriptor, n_players, timesteps)
+        shared_time = time_descriptor(SceneDescriptor, n_players, timesteps)
+        print(f'{n_players:3d} players   previous: {previous_time * 1e3:7.2f} ms   shared views: {shared_time * 1e3:7.2f} ms   speedup: {previous_time / shared_time:5.2f}x')
+
+if __name__ == '__main__':
+    main()
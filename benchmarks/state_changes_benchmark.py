@@ -0,0 +1,81 @@
+"""
+Measures the state changes detection of ObservationsGenerator.get_observed_changes per step, for 10 observing agents,
+with the vectorized diff against the previous cell by cell implementation. Both must return the same changes.
+
+Usage: python -m benchmarks.state_changes_benchmark
+"""
+import random
+import timeit
+
+import numpy as np
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from game_environment.scene_descriptor.observations_generator import ObservationsGenerator
+
+PLAYERS = [f'player_{i}' for i in range(10)]
+# Changes of a cell between two steps: (last, current)
+TRANSITIONS = [('A', '3'), ('G', 'F'), ('F', 'G'), ('G', 'A'), ('F', 'B'), ('2', 'B'), ('B', 'F'), ('F', '4'), ('4', 'F')]
+
+def previous_get_observed_changes(obs_gen, observed_map, last_observed_map, agent_local_position, agent_global_position, agent_orientation, game_time):
+    """Cell by cell implementation before the vectorized diff"""
+    observations = []
+    curr_m = obs_gen.get_matrix(observed_map)
+    last_m = obs_gen.get_matrix(last_observed_map)
+    for index in np.ndindex(curr_m.shape):
+        curr_el = curr_m[index]
+        last_el = last_m[index]
+        if curr_el != last_el:
+            if last_el.isnumeric() and curr_el == 'B':
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Someone was attacked at position {el_pos}.", game_time))
+            elif curr_el == 'B':
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Observed a ray beam from an attack at position {el_pos}.", game_time))
+            elif last_el == 'B':
+                pass
+            elif last_el == 'A':
+                agent_name = obs_gen.players_names[int(curr_el)]
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Observed that agent {agent_name} took an apple from position {el_pos}.", game_time))
+            elif last_el == 'G' and curr_el == 'F':
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Observed that the grass at position {el_pos} disappeared.", game_time))
+            elif last_el == 'F' and curr_el == 'G':
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Observed that grass to grow apples appeared at position {el_pos}.", game_time))
+            elif last_el == 'G' and curr_el == 'A':
+                el_pos = obs_gen.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
+                observations.append((f"Observed that an apple grew at position {el_pos}.", game_time))
+    return observations
+
+def make_windows(n_windows, change_rate, seed=0):
+    """Random 11x11 windows of the map and the same windows with some cells changed"""
+    rng = random.Random(seed)
+    scenario_map = ASCII_MAP.split('\n')[1:-1]
+    windows = []
+    for _ in range(n_windows):
+        top, left = rng.randrange(len(scenario_map) - 10), rng.randrange(len(scenario_map[0]) - 10)
+        last = [list(row[left:left + 11]) for row in scenario_map[top:top + 11]]
+        curr = [row[:] for row in last]
+        for i in range(11):
+            for j in range(11):
+                if (i, j) != (9, 5) and rng.random() < change_rate:
+                    last[i][j], curr[i][j] = rng.choice(TRANSITIONS)
+        last[9][5] = curr[9][5] = '#'
+        position = (rng.randrange(18), rng.randrange(24))
+        windows.append(('\n'.join(map(''.join, curr)), '\n'.join(map(''.join, last)), (9, 5), position, rng.randrange(4), '2023-01-01 10:00:00'))
+    return windows
+
+def main(n_steps: int = 200, agents_per_step: int = 10):
+    obs_gen = ObservationsGenerator(ASCII_MAP, PLAYERS, 'commons_harvest_open')
+    print(f'State changes detection per step, {agents_per_step} observing agents:')
+    for change_rate in [0.02, 0.1]:
+        windows = make_windows(n_steps * agents_per_step, change_rate)
+        for window in windows:
+            assert obs_gen.get_observed_changes(*window) == previous_get_observed_changes(obs_gen, *window)
+        previous_time = min(timeit.repeat(lambda: [previous_get_observed_changes(obs_gen, *window) for window in windows], number=1, repeat=3))
+        vectorized_time = min(timeit.repeat(lambda: [obs_gen.get_observed_changes(*window) for window in windows], number=1, repeat=3))
+        print(f'{change_rate:4.0%} of cells changed   previous: {previous_time / n_steps * 1e3:6.2f} ms   vectorized: {vectorized_time / n_steps * 1e3:6.2f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the number of env steps per episode of the turn-aware A* planner against the previous planner
+(BFS over cells plus a turn appended at the end of the route).
+An episode is a sequence of random 'go to' and 'attack' actions on the commons harvest map.
+
+Usage: python -m benchmarks.step_planner_benchmark
+"""
+import random
+
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from utils.route_plan import get_shortest_valid_route, RoutingIndex, DX, DY, DIRECTIONS
+
+OBSTACLES = ['W', '$']
+
+def bfs_planner_route(scenario_map, position, orientation, end, include_last_pos):
+    """Route as it was generated before the A* planner"""
+    route = get_shortest_valid_route(scenario_map, position, end, invalid_symbols=OBSTACLES, orientation=orientation)
+    if not include_last_pos and len(route) > 0:
+        route = route[:-2] + route[-1:]
+    if len(route) > 0:
+        new_orientation = 'turn ' + route[-1].split(' ')[1]
+        if new_orientation == 'turn down':
+            route += ['turn right', 'turn right']
+        else:
+            route.append(new_orientation)
+    return route
+
+def simulate_steps(scenario_map, position, orientation, steps):
+    """Applies the steps with the env semantics: moves are relative to the orientation, turns rotate the avatar"""
+    for step in steps:
+        if step == 'turn right':
+            orientation = (orientation + 1) % 4
+        elif step == 'turn left':
+            orientation = (orientation - 1) % 4
+        elif step.startswith('move'):
+            d = (DIRECTIONS.index(step) + orientation) % 4
+            next_position = (position[0] + DX[d], position[1] + DY[d])
+            if scenario_map[next_position[0]][next_position[1]] not in OBSTACLES:
+                position = next_position
+    return position, orientation
+
+def run_episode(scenario_map, planner, actions):
+    position, orientation = (14, 5), 0
+    steps_count, hits = 0, 0
+    routing_index = RoutingIndex.for_map(scenario_map, OBSTACLES)
+    for kind, end in actions:
+        if position == end:
+            continue
+        if planner == 'bfs':
+            steps = bfs_planner_route(scenario_map, position, orientation, end, include_last_pos=kind == 'go to')
+        else:
+            steps = routing_index.get_steps_route(position, end, orientation, face_end=kind == 'attack')
+        position, orientation = simulate_steps(scenario_map, position, orientation, steps)
+        steps_count += len(steps)
+        if kind == 'attack':
+            steps_count += 1
+            hits += (position[0] + DX[orientation], position[1] + DY[orientation]) == end
+    return steps_count, hits
+
+def main(n_episodes: int = 50, actions_per_episode: int = 40, seed: int = 0):
+    scenario_map = ASCII_MAP.split('\n')[1:-1]
+    valid_cells = [(i, j) for i, row in enumerate(scenario_map) for j, c in enumerate(row) if c not in OBSTACLES]
+    rng = random.Random(seed)
+    totals = {'bfs': [0, 0], 'a_star': [0, 0]}
+    n_attacks = 0
+    for _ in range(n_episodes):
+        actions = [(rng.choice(['go to', 'go to', 'attack']), rng.choice(valid_cells)) for _ in range(actions_per_episode)]
+        n_attacks += sum(kind == 'attack' for kind, _ in actions)
+        for planner in totals:
+            steps_count, hits = run_episode(scenario_map, planner, actions)
+            totals[planner][0] += steps_count
+            totals[planner][1] += hits
+
+    print(f'Episodes: {n_episodes}, actions per episode: {actions_per_episode}, attacks: {n_attacks}')
+    for planner, (steps_count, hits) in totals.items():
+        print(f'{planner:7s} env steps per episode: {steps_count / n_episodes:7.1f}   attacks facing the target: {hits / n_attacks:6.1%}')
+
+if __name__ == '__main__':
+    main()
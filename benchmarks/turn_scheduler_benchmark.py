@@ -0,0 +1,122 @@
+"""
+Measures the rounds per hour of main.game_loop on the sequential, concurrent and pipelined turn modes. The LLM is replaced
+by a random latency on each agent turn and the environment by one that only records the joint actions, so the measure
+shows how much of the thinking time of the agents overlaps. The scene observed by each agent changes on each step with a
+given probability, a change while the agent is thinking makes it do its turn again on the pipelined mode.
+It also checks that the joint actions of the concurrent mode do not depend on the order in which the turns finish, and
+that every step planned on the pipelined mode is executed.
+
+Usage: python -m benchmarks.turn_scheduler_benchmark
+"""
+import random
+import time
+from types import SimpleNamespace
+
+import main
+from game_environment import server
+from game_environment.utils import default_agent_actions_map
+from utils.background_tasks import BackgroundTasks
+from utils.queue_utils import queue_from_list
+from utils.turn_scheduler import SEQUENTIAL, CONCURRENT, PIPELINED
+
+class FakeAgent:
+    """Agent that takes a random time to think and then moves up a fixed number of steps"""
+
+    def __init__(self, name, n_steps, latency, seed):
+        self.name = name
+        self.n_steps = n_steps
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.spatial_memory = SimpleNamespace(blocked_moves_avoided=0)
+        self.background_tasks = BackgroundTasks(name, barrier=True)
+
+    def move(self, observations, agent_current_scene, changes_in_state, game_time, agent_reward=0, agent_is_out=False):
+        time.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        return queue_from_list(['move up'] * self.n_steps)
+
+    def avoid_blocked_steps(self, agent_current_scene):
+        pass
+
+    def wait_background_tasks(self):
+        pass
+
+class FakeEnv:
+    """Environment that records the joint actions of each step"""
+
+    def __init__(self, player_names, step_time, scene_change_probability):
+        self.player_prefixes = player_names
+        self.step_time = step_time
+        self.scene_change_probability = scene_change_probability
+        self.scene_versions = {name: 0 for name in player_names}
+        self.rng = random.Random(0)
+        self.score = {name: 0 for name in player_names}
+        self.curr_scene_description = {name: {} for name in player_names}
+        self.bots = None
+        self.steps = []
+
+    def step(self, actions):
+        time.sleep(self.step_time)
+        for name in self.scene_versions:
+            if self.rng.random() < self.scene_change_probability:
+                self.scene_versions[name] += 1
+        if actions is not None:
+            self.steps.append({name: tuple(action.values()) for name, action in actions.items()})
+
+    def get_current_global_map(self):
+        return [['A']]
+
+    def get_observations_by_player(self, player_name):
+        return {'curr_state': [], 'scene_description': {}, 'state_changes': []}
+
+    def get_scene_hash(self, player_name):
+        return hash((player_name, self.scene_versions[player_name]))
+
+    def get_time(self):
+        return ''
+
+    def get_current_step_number(self):
+        return len(self.steps)
+
+    def is_out_of_game(self, player_name):
+        return False
+
+    def update_history_file(self, logger_timestamp, round_count, steps_count):
+        pass
+
+def run_game_loop(turn_mode, n_agents, latency, step_time, seed, scene_change_probability=0.1):
+    names = [f'agent_{i}' for i in range(n_agents)]
+    agents = [FakeAgent(name, n_steps=3 + 2 * i, latency=latency, seed=seed + i) for i, name in enumerate(names)]
+    env = FakeEnv(names, step_time, scene_change_probability)
+    start = time.perf_counter()
+    rounds_count = main.game_loop(env, agents, 'commons_harvest_open', persist_memories=False, turn_mode=turn_mode)
+    elapsed = time.perf_counter() - start
+    return rounds_count / elapsed * 3600, env.steps, rounds_count
+
+def main_benchmark(latency: float = 0.1, step_time: float = 0.02):
+    # The game loop gets the default actions from the game module
+    server.game = server.import_game('commons_harvest_open')
+    # The joint actions of the concurrent mode must be the same whatever the latencies are
+    _, steps, rounds_count = run_game_loop(CONCURRENT, 3, latency, step_time, seed=0)
+    _, other_steps, _ = run_game_loop(CONCURRENT, 3, latency, step_time, seed=100)
+    assert steps == other_steps
+    stay = tuple(default_agent_actions_map().values())
+    assert all(step['agent_0'] == stay for step in steps[-2:]), 'Agents without steps left should stay put'
+    # The pipelined joint actions depend on the timing of the turns, but each agent executes all the steps of its turns
+    _, pipelined_steps, pipelined_rounds_count = run_game_loop(PIPELINED, 3, latency, step_time, seed=0)
+    assert pipelined_rounds_count == rounds_count
+    for i in range(3):
+        moves = sum(step[f'agent_{i}'] != stay for step in pipelined_steps)
+        assert moves == sum(step[f'agent_{i}'] != stay for step in steps) == rounds_count * (3 + 2 * i)
+
+    print(f'Rounds per hour, {latency * 1e3:.0f} ms mean thinking time per turn, {step_time * 1e3:.0f} ms per env step:')
+    for n_agents in [3, 6]:
+        sequential_rate, *_ = run_game_loop(SEQUENTIAL, n_agents, latency, step_time, seed=0)
+        concurrent_rate, *_ = run_game_loop(CONCURRENT, n_agents, latency, step_time, seed=0)
+        print(f'{n_agents:3d} agents   sequential: {sequential_rate:8.0f}   concurrent: {concurrent_rate:8.0f}   speedup: {concurrent_rate / sequential_rate:5.2f}x')
+        for scene_change_probability in [0.0, 0.1]:
+            pipelined_rate, *_ = run_game_loop(PIPELINED, n_agents, latency, step_time, seed=0, scene_change_probability=scene_change_probability)
+            print(f'             pipelined, {scene_change_probability:.0%} scene changes per step: {pipelined_rate:8.0f}   '
+                  f'speedup over concurrent: {pipelined_rate / concurrent_rate:5.2f}x')
+
+if __name__ == '__main__':
+    main_benchmark()
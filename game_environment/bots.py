@@ -3,12 +3,17 @@ from meltingpot.utils.policies.policy import Policy
 from meltingpot.python.bot import build
 import dm_env
 import logging
+import numpy as np
 
 from utils.logging import CustomAdapter
 
 logger = logging.getLogger(__name__)
 logger = CustomAdapter(logger)
 
+# Observations of a player given to its bot policy, the world view is shared by all the players
+BOT_OBSERVATION_KEYS = ['RGB', 'ORIENTATION', 'READY_TO_SHOOT', 'POSITION']
+_policies = {} # Loaded policies by policy name, shared by all the bots with the same policy
+
 def get_bots_for_scenario(scenario: str) -> list[str]:
     """Get the bots for the scenario
     
@@ -42,6 +47,20 @@ def get_bots_for_scenario(scenario: str) -> list[str]:
     return bots_names
     
 
+def get_policy(policy_name: str) -> Policy:
+    """Get the policy with the given name, it is loaded once and shared by all the bots that use it
+
+    Args:
+        policy_name: Name of the policy
+
+    Returns:
+        The policy
+    """
+    if policy_name not in _policies:
+        _policies[policy_name] = build(policy_name)
+    return _policies[policy_name]
+
+
 class Bot:
     """Bot class to initialize the bot policies and get the actions for the bots
     """
@@ -54,7 +73,8 @@ class Bot:
             player_index: Index of the player in the game
             ACTION_SET: List of actions for the game
         """
-        self.policy = build(policy_name)
+        self.policy_name = policy_name
+        self.policy = get_policy(policy_name)
         self.name = name
         self.state = self.policy.initial_state()
         self.player_index = player_index
@@ -87,3 +107,68 @@ class Bot:
         logger.info('Bot %s action: %s', self.name, new_action)
         return new_action
 
+
+class BotGroup:
+    """Bots that share a policy. When the policy has a step_batch method, their observations and states are stacked so the
+    policy does one inference per step for the whole group. The meltingpot policies have no step_batch, so their bots step one by one
+    """
+    def __init__(self, bots: list[Bot]):
+        """Initialize the group
+
+        Args:
+            bots: Bots of the group, all of them with the same policy
+        """
+        self.bots = bots
+        self.policy = bots[0].policy
+        self.batched = hasattr(self.policy, 'step_batch')
+
+    def move(self, timestep) -> dict[str, dict]:
+        """Get the actions for the bots of the group
+
+        Args:
+            timestep: Current timestep of the game
+
+        Returns:
+            The action for each bot, by bot name
+        """
+        if not self.batched:
+            return {bot.name: bot.move(timestep) for bot in self.bots}
+
+        observation = timestep.observation
+        stacked_observation = {key: np.stack([observation[f'{bot.player_index}.{key}'] for bot in self.bots]) for key in BOT_OBSERVATION_KEYS}
+        stacked_observation['WORLD.RGB'] = np.broadcast_to(observation['WORLD.RGB'], (len(self.bots),) + observation['WORLD.RGB'].shape)
+        bots_timestep = dm_env.TimeStep(
+            step_type=np.full(len(self.bots), int(timestep.step_type), dtype=np.int32),
+            reward=np.stack([observation[f'{bot.player_index}.REWARD'] for bot in self.bots]),
+            discount=np.full(len(self.bots), timestep.discount, dtype=np.float32),
+            observation=stacked_observation
+        )
+        try:
+            actions, states = self.policy.step_batch(bots_timestep, [bot.state for bot in self.bots])
+        except Exception:
+            # The states are only updated when the batched step succeeds, so the bots can still move one by one
+            logger.exception('Batched step failed for the bots %s, they will move one by one', [bot.name for bot in self.bots])
+            self.batched = False
+            return self.move(timestep)
+
+        bots_actions = {}
+        for bot, action, state in zip(self.bots, actions, states):
+            bot.state = state
+            bots_actions[bot.name] = bot.ACTION_SET[action]
+            logger.info('Bot %s action: %s', bot.name, bots_actions[bot.name])
+        return bots_actions
+
+
+def group_bots_by_policy(bots: list[Bot]) -> list[BotGroup]:
+    """Group the bots that share a policy
+
+    Args:
+        bots: List of bots
+
+    Returns:
+        A group for each policy, in the order of the first bot of each policy
+    """
+    groups = {}
+    for bot in bots:
+        groups.setdefault(bot.policy_name, []).append(bot)
+    return [BotGroup(group_bots) for group_bots in groups.values()]
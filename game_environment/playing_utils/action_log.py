@@ -0,0 +1,110 @@
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+class ActionLog:
+    """Joint actions map of each step of a game, stored as an int8 array of shape (steps, players, action names), with the
+    seed of the environment. The environment is deterministic for a seed, so the log is enough to replay the game
+    without the agents. Steps executed without actions, like the first step of the game, are logged as None.
+    """
+
+    def __init__(self, player_names: Sequence[str], env_seed: Optional[int] = None, action_names: Sequence[str] = None):
+        """
+        Args:
+            player_names: Names of the players, in the order of the players of the game.
+            env_seed: Seed of the environment of the game. Defaults to None, a random seed.
+            action_names: Names of the actions of a player. By default they are taken from the first logged actions map.
+        """
+        self.player_names = list(player_names)
+        self.env_seed = env_seed
+        self.action_names = list(action_names) if action_names is not None else None
+        self.n_steps = 0
+        self.actions = None
+        self.has_actions = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.n_steps
+
+    def _grow(self) -> None:
+        """Doubles the capacity of the log, so appending a step is amortized constant time"""
+        capacity = max(64, 2 * len(self.has_actions))
+        actions = np.zeros((capacity, len(self.player_names), len(self.action_names or [])), dtype=np.int8)
+        has_actions = np.zeros(capacity, dtype=bool)
+        if self.actions is not None:
+            actions[:self.n_steps] = self.actions[:self.n_steps]
+            has_actions[:self.n_steps] = self.has_actions[:self.n_steps]
+        self.actions, self.has_actions = actions, has_actions
+
+    def append(self, actions_map: Optional[dict]) -> None:
+        """Logs the joint actions map of a step.
+
+        Args:
+            actions_map: Actions of each player, None for a step without actions.
+        """
+        if actions_map and self.action_names is None:
+            self.action_names = list(dict.fromkeys(name for action in actions_map.values() for name in action))
+            # The steps logged before had no actions, so their rows stay empty
+            if self.actions is not None:
+                self.actions = np.zeros((len(self.has_actions), len(self.player_names), len(self.action_names)), dtype=np.int8)
+        if self.actions is None or self.n_steps == len(self.has_actions):
+            self._grow()
+        if actions_map:
+            self.actions[self.n_steps] = [[action.get(name, 0) for name in self.action_names]
+                                          for action in (actions_map[player_name] for player_name in self.player_names)]
+            self.has_actions[self.n_steps] = True
+        self.n_steps += 1
+
+    def get_actions_map(self, step: int) -> Optional[dict]:
+        """Returns the joint actions map of a step.
+
+        Args:
+            step: Index of the step, from 0.
+        Returns:
+            The actions of each player, None if the step was executed without actions.
+        """
+        if not self.has_actions[step]:
+            return None
+        return {player_name: dict(zip(self.action_names, map(int, player_actions)))
+                for player_name, player_actions in zip(self.player_names, self.actions[step])}
+
+    def __iter__(self) -> Iterator[Optional[dict]]:
+        for step in range(self.n_steps):
+            yield self.get_actions_map(step)
+
+    def copy(self) -> 'ActionLog':
+        """Returns a copy of the log with only the logged steps, later steps of the game are not added to it"""
+        action_log = ActionLog(self.player_names, self.env_seed, self.action_names)
+        action_log.n_steps = self.n_steps
+        action_log.has_actions = self.has_actions[:self.n_steps].copy()
+        action_log.actions = self.actions[:self.n_steps].copy() if self.actions is not None else None
+        return action_log
+
+    def save(self, path: str) -> None:
+        """Saves the log as a compressed numpy file.
+
+        Args:
+            path: Path of the file, usually ending in .npz.
+        """
+        n_actions = len(self.action_names or [])
+        actions = self.actions[:self.n_steps] if self.actions is not None else np.zeros((0, len(self.player_names), n_actions), dtype=np.int8)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, actions=actions, has_actions=self.has_actions[:self.n_steps],
+                                env_seed=np.array(-1 if self.env_seed is None else self.env_seed),
+                                player_names=np.array(self.player_names), action_names=np.array(self.action_names or [], dtype=str))
+
+    @classmethod
+    def load(cls, path: str) -> 'ActionLog':
+        """Loads a log saved with save.
+
+        Args:
+            path: Path of the file.
+        Returns:
+            The action log.
+        """
+        with np.load(path) as data:
+            env_seed = int(data['env_seed'])
+            action_log = cls(data['player_names'].tolist(), None if env_seed == -1 else env_seed, data['action_names'].tolist() or None)
+            action_log.has_actions = data['has_actions']
+            action_log.actions = data['actions']
+        action_log.n_steps = len(action_log.has_actions)
+        return action_log
@@ -24,9 +24,11 @@ import enum
 import time
 import logging
 import datetime
+import os
 
 from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
 import dm_env
+import tree
 
 from ml_collections import config_dict
 import numpy as np
@@ -34,13 +36,14 @@ import pygame
 
 import dmlab2d
 from game_environment.recorder.recorder import Recorder
+from game_environment.playing_utils.action_log import ActionLog
 from meltingpot.python.utils.substrates import builder
-from game_environment.scene_descriptor.scene_descriptor import SceneDescriptor
+from game_environment.scene_descriptor.scene_descriptor import SceneDescriptor, get_text_description
 from game_environment.scene_descriptor.observations_generator import ObservationsGenerator
 from utils.files import load_config
 from utils.logging import CustomAdapter
-from game_environment.bots import Bot
-from game_environment.utils import default_agent_actions_map, check_agent_out_of_game
+from game_environment.bots import Bot, group_bots_by_policy
+from game_environment.utils import default_agent_actions_map
 
 import sys
 import ast
@@ -61,7 +64,7 @@ ActionMap = Mapping[str, Callable[[], int]]
 
 
 class RenderType(enum.Enum):
-    NONE = 0
+    NONE = 0 # Headless, the game runs as fast as the environment steps
     PYGAME = 1
 
 
@@ -243,7 +246,10 @@ class Game:
             reset_env_when_done: bool = False,
             record: bool = False,
             bots: Optional[list[Bot]] = None,
-            substrate_name: str = 'commons_harvest_open'
+            fast_forward_bots: bool = True,
+            substrate_name: str = 'commons_harvest_open',
+            env_seed: Optional[int] = None,
+            actions_log_folder: Optional[str] = None
             ):
         """Run multiplayer environment, with per player rendering and actions.
 
@@ -271,7 +277,8 @@ class Game:
             with PyGame, or without any interface.  Setting interactive to false
             enables running e.g. a random agent via the action_map returning actions
             without polling PyGame (or any human input).  Non interactive runs
-            ignore the screen_width, screen_height and fps parameters.
+            ignore the screen_width, screen_height and fps parameters, they do not
+            open a display nor throttle the steps.
         screen_width: Width, in pixels, of the window to render the game.
         screen_height: Height, in pixels, of the window to render the game.
         fps: Frames per second of the game.
@@ -301,7 +308,13 @@ class Game:
             will cause this function to loop infinitely.
         record: Whether to record the game.
         bots: A list of Bot objects. This bots have a predefined policy.
+        fast_forward_bots: Whether to skip the scene descriptions and the state changes of the bots, they act from their policies
+            and only the LLM agents observe the steps. The bots are always described when the game is recorded.
         substrate_name: The name of the substrate to use. By default it is 'commons_harvest_open'.
+        env_seed: Seed of the environment, the episodes with the same seed and the same actions are the same. By default
+            the environment picks a random seed.
+        actions_log_folder: Folder where the joint actions of each step and the seed are saved when the game ends, as
+            actions_log.npz, to replay the episode with replay_episode.py. By default they are not saved.
         """
         # Update the config with the overrides.
         full_config.lab2d_settings.update(config_overrides)
@@ -318,7 +331,7 @@ class Game:
         logger.info(f'Running an episode with {player_count} players: {player_prefixes}.')
         
         # Create the game environment
-        env = env_builder(**full_config)
+        env = env_builder(**full_config, env_seed=env_seed)
 
         # Check that the number of player prefixes matches the number of players.
         if len(player_prefixes) != player_count:
@@ -333,6 +346,7 @@ class Game:
         score = collections.defaultdict(float)
 
         # Set the pygame variables
+        font, game_display, clock = None, None, None
         if interactive == RenderType.PYGAME:
             pygame.init()
             pygame.display.set_caption('Melting Pot: {}'.format(
@@ -367,6 +381,7 @@ class Game:
             record_counter = 0
 
         self.env = env
+        self.env_seed = env_seed
         self.pygame = pygame
         if record:
             self.game_recorder = game_recorder
@@ -405,7 +420,20 @@ class Game:
         self.time = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
         self.dateFormat = load_config()['date_format']
         self.game_steps = 0 # Number of steps of the game
+        # Joint actions map of each step, with the seed they are enough to bring the environment back to any step
+        self.action_log = ActionLog(player_prefixes, env_seed)
+        self.actions_log_folder = actions_log_folder
         self.bots = bots
+        # Bots with the same policy move with one inference per step
+        self.bot_groups = group_bots_by_policy(bots) if bots else []
+        bots_names = {bot.name for bot in bots} if bots else set()
+        self.focal_players = [player_prefix for player_prefix in player_prefixes if player_prefix not in bots_names]
+        self.fast_forward_bots = fast_forward_bots and not record
+        # Players whose scenes are described and whose state changes are tracked on each step
+        self.observing_players = self.focal_players if self.fast_forward_bots else player_prefixes
+        if self.fast_forward_bots:
+            self.descriptor.described_avatars = set(self.focal_players)
+        self.action_reader = ActionReader(env, action_map)
         self.curr_scene_description = None
         self.game_ascii_map = game_ascii_map
         self.substrate_name = substrate_name
@@ -414,10 +442,13 @@ class Game:
         """Ends the game. This function is called when the game is finished."""
         self.env.close()
         self.env = None
-        self.pygame.quit()
+        if self.interactive == RenderType.PYGAME:
+            self.pygame.quit()
         self.pygame = None
         if self.record:
             self.game_recorder.save_log()
+        if self.actions_log_folder:
+            self.action_log.save(os.path.join(self.actions_log_folder, 'actions_log.npz'))
 
         for prefix in self.player_prefixes:
             logger.info('Player %s: score is %g' % (prefix, self.score[prefix]))
@@ -441,22 +472,23 @@ class Game:
             return None, None
         
         self.game_steps += 1
-
-        action_reader = ActionReader(self.env, self.action_map)
-        # Get the raw observations from the environment
-        description, curr_global_map = self.descriptor.describe_scene(self.timestep)
+        self.action_log.append(current_actions_map)
 
         # Get the agents that are observing and didn't move
         agents_observing = []
         if current_actions_map:
-            agents_observing = [agent_name for agent_name, action_map in current_actions_map.items() if action_map == default_agent_actions_map(self.substrate_name)]
+            stay_action_map = default_agent_actions_map(self.substrate_name)
+            agents_observing = [agent_name for agent_name in self.observing_players if current_actions_map[agent_name] == stay_action_map]
 
         if self.record:
+            # Get the raw observations from the environment. The timestep was already described at the end of the last step,
+            # so the memoized description is returned
+            description, curr_global_map = self.descriptor.describe_scene(self.timestep)
             self.game_recorder.record_game_state_before_actions(self.game_ascii_map, curr_global_map, agents_observing, current_actions_map)
         
         if self.first_move_done :
             # Get the next action map
-            game_actions = action_reader.various_agents_step(current_actions_map, self.player_prefixes)
+            game_actions = self.action_reader.various_agents_step(current_actions_map, self.player_prefixes)
             self.timestep = self.env.step(game_actions)
         else:
             self.first_move_done = True
@@ -514,8 +546,8 @@ class Game:
             pygame.display.update()
             self.clock.tick(self.fps)
 
-            # Update the time: One hour per step
-            self.time += datetime.timedelta(hours=1)
+        # Update the time: One hour per step, the game time does not depend on the rendering
+        self.time += datetime.timedelta(hours=1)
 
         # Get the raw observations from the environment after the actions are executed
         description, curr_global_map = self.descriptor.describe_scene(self.timestep)
@@ -525,7 +557,9 @@ class Game:
             self.game_recorder.record(self.timestep, description)
             self.game_recorder.record_rewards(rewards)
             self.game_recorder.record_elements_status(self.game_ascii_map, curr_global_map, agents_observing)
-            self.game_recorder.record_scene_tracking(self.time, curr_global_map, description)
+            # The scene track is read back line by line with eval, so only the text fields are recorded
+            self.game_recorder.record_scene_tracking(self.time, curr_global_map, {name: get_text_description(agent_description)
+                                                                                  for name, agent_description in description.items()})
             self.record_counter += 1
         
         # Update the observations generator
@@ -544,9 +578,9 @@ class Game:
         Returns:
             A dictionary with the observations of the player
         """
-        curr_state = self.observationsGenerator.get_all_observations_descriptions(str(self.curr_scene_description).strip())[player_prefix]
+        curr_state = self.observationsGenerator.get_observations(self.curr_scene_description, player_prefix)
         scene_description = self.curr_scene_description[player_prefix]
-        if (check_agent_out_of_game(curr_state)):
+        if self.is_out_of_game(player_prefix):
             state_changes = []
         else:
             # When the agent is out, do not get the state changes to accumulate them until the agent is revived
@@ -557,6 +591,26 @@ class Game:
             'state_changes': state_changes
         }
     
+    def is_out_of_game(self, player_prefix: str) -> bool:
+        """Returns True if the player is out of the game on the current step.
+        Args:
+            player_prefix: The prefix of the player
+        Returns:
+            True if the player is out of the game, False otherwise
+        """
+        return self.descriptor.avatars_by_name[player_prefix].avatar_state == 0
+
+    def get_scene_hash(self, player_prefix: str) -> int:
+        """Returns a hash of the scene observed by the given player on the current step.
+        Args:
+            player_prefix: The prefix of the player
+        Returns:
+            A hash of the observation, position, orientation and score of the player
+        """
+        scene_description = self.curr_scene_description[player_prefix]
+        return hash((scene_description['observation'], tuple(scene_description['global_position']),
+                     scene_description['orientation'], self.score[player_prefix]))
+
     def get_time(self) -> str:
         """Returns the current time of the game. The time will be formatted as specified in the config file."""
         return self.time.strftime(self.dateFormat)
@@ -578,6 +632,53 @@ class Game:
             # Write round_number and actions_count in the history file
             file.write(f'{round_count} {steps_count}\n')
     
+    def get_checkpoint(self) -> dict:
+        """Returns the state of the game to save on a checkpoint of the simulation. The environment can not be saved,
+        but it is deterministic for a seed, so the seed and the actions of all the steps are saved instead.
+        Returns:
+            A dictionary with the seed, the actions log, the changes not yet observed by the agents and the states of the bots
+        """
+        return {
+            'action_log': self.action_log.copy(),
+            'observed_changes': {name: list(changes) for name, changes in self.observationsGenerator.observed_changes.items()},
+            'bot_states': {bot.name: tree.map_structure(np.asarray, bot.state) for bot in self.bots or []},
+        }
+
+    def replay(self, action_log: ActionLog, describe: bool = True) -> None:
+        """Executes the steps of an action log as fast as possible, without rendering.
+        Args:
+            action_log: The actions of the steps to execute, the game must have been created with its seed and its players
+            describe: Whether to describe the scenes and to track the state changes on each step, as a normal step does.
+                Otherwise only the environment steps, so the descriptions and the recordings are not updated
+        """
+        if action_log.env_seed != self.env_seed or action_log.player_names != list(self.player_prefixes):
+            raise ValueError(f'The action log was saved with the seed {action_log.env_seed} and the players {action_log.player_names}, '
+                             f'the game was created with the seed {self.env_seed} and the players {self.player_prefixes}')
+        interactive, self.interactive = self.interactive, RenderType.NONE
+        for actions_map in action_log:
+            if describe:
+                self.step(actions_map)
+                continue
+            self.game_steps += 1
+            self.action_log.append(actions_map)
+            if self.first_move_done:
+                self.timestep = self.env.step(self.action_reader.various_agents_step(actions_map, self.player_prefixes))
+            self.first_move_done = True
+        self.interactive = interactive
+
+    def load_checkpoint(self, checkpoint: dict) -> None:
+        """Brings a new game to the state of a checkpoint. The actions of the checkpoint are executed again from the start
+        without rendering, so the environment, the scene descriptions, the scores, the recorded images and the indicators are
+        rebuilt on the way. The steps are appended again to the text logs of the recorder, restore_checkpoint cuts them back.
+        Args:
+            checkpoint: The state saved by get_checkpoint, the game must have been created with the same seed
+        """
+        self.replay(checkpoint['action_log'])
+        logger.info('Replayed %s steps from the checkpoint', len(checkpoint['action_log']))
+        self.observationsGenerator.observed_changes = checkpoint['observed_changes']
+        for bot in self.bots or []:
+            bot.state = checkpoint['bot_states'][bot.name]
+
     def get_current_global_map(self) -> dict:
         """Returns the current scene description."""
         return self.curr_global_map
\ No newline at end of file
@@ -7,7 +7,7 @@ import numpy as np
 from skimage import io
 from skimage.transform import resize
 from game_environment.recorder import recreate_simulation
-from game_environment.utils import parse_string_to_matrix, matrix_to_string, connected_elems_map
+from game_environment.utils import parse_string_to_matrix, matrix_to_string, connected_elems_map, grid_code
 import importlib
 from utils.files import create_directory_if_not_exists
 
@@ -66,8 +66,8 @@ class Recorder:
             rewards = {i: int(rr) for i, rr in enumerate(list(rewards.values()))}
             f.write(f"{self.step}: {rewards}\n")
 
-    def record_scene_tracking(self, time:datetime, current_map: list[list[str]], agents_status=None) -> None:
-        #Writes the map to a file
+    def record_scene_tracking(self, time:datetime, current_map: np.ndarray, agents_status=None) -> None:
+        #Writes the map to a file, the grid of codes is rendered as text only here
         with open(os.path.join(self.log_path, "scene_track.txt"), "a") as f:
             scene_dict = {'step':self.step,  'memory_time': str(time), 'current_map': matrix_to_string(current_map), 'agents_status': agents_status}
             f.write(f"{scene_dict}\n")
@@ -78,21 +78,15 @@ class Recorder:
 
         Args:
             initial_map (str): Initial map
-            current_map (list[list[str]]): Current map
+            current_map (np.ndarray | list[list[str]]): Current map, as a grid of codes or as a matrix of chars
             agents_observing (list[str]): Agent names of the agents that are not going to take any action
         """
         if self._record_elements_status:
             self._record_elements_status(self, initial_map, current_map, agents_observing)
         elif self.substrate_name == 'clean_up':
-            apples = 0
-            dirt = 0
-
-            for row in current_map:
-                for elem in row:
-                    if elem == 'A':
-                        apples += 1
-                    elif elem == 'D':
-                        dirt += 1
+            current_map = np.asarray(current_map)
+            apples = np.count_nonzero(current_map == grid_code(current_map, 'A'))
+            dirt = np.count_nonzero(current_map == grid_code(current_map, 'D'))
             
             with open(os.path.join(self.log_path, "apples_history.txt"), "a") as f:
                 f.write(f"{self.step}: A_{apples} - D_{dirt}\n ")
@@ -0,0 +1,74 @@
+"""
+
+File: observation.py
+Description: Structured observation of an agent. Observations are produced once per scene by the observations generator
+            and rendered as text only when a prompt or a memory is built.
+
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Observation:
+    """
+    Description: Observation of an element of the scene
+
+    Attributes:
+        kind (str): Kind of the observation: 'apple', 'grass', 'tree', 'agent', 'dirt', 'river_bank', 'apple_field_edge' or 'out_of_game'
+        position (tuple[int, int] | None): Global position of the observed element
+        entity_id (str | None): Name of the observed agent
+        tree_id (int | None): Id of the tree of the element, None if the element does not belong to a tree
+        apple_count (int | None): Number of apples observed on the tree
+        grass_count (int | None): Number of grass for apples growing observed on the tree
+        message (str | None): Message of the out of game observations
+    """
+    kind: str
+    position: tuple[int, int] | None = None
+    entity_id: str | None = None
+    tree_id: int | None = None
+    apple_count: int | None = None
+    grass_count: int | None = None
+    message: str | None = None
+
+    def __str__(self) -> str:
+        """
+        Description: Renders the observation as the text used on the prompts
+
+        Returns:
+            str: Observation text
+        """
+        position = list(self.position) if self.position is not None else None
+        if self.kind == 'out_of_game':
+            return self.message
+        if self.kind == 'agent':
+            return "Observed agent {} at position {}.".format(self.entity_id, position)
+        if self.kind == 'tree':
+            return ("Observed tree {} at position {}. This tree has {} apples remaining and {} grass for apples growing on the observed map. "
+                    "The tree might have more apples and grass on the global map.").format(self.tree_id, position, self.apple_count, self.grass_count)
+        if self.kind == 'apple':
+            if self.tree_id is None:
+                return "Observed an apple at position {}".format(position)
+            return "Observed an apple at position {}. This apple belongs to tree {}.".format(position, self.tree_id)
+        if self.kind == 'grass':
+            return "Observed grass to grow apples at position {}. This grass belongs to tree {}.".format(position, self.tree_id)
+        if self.kind == 'dirt':
+            return "Observed dirt on the river at position {}".format(position)
+        if self.kind == 'river_bank':
+            return "Observed river bank at position {}".format(position)
+        if self.kind == 'apple_field_edge':
+            return "Observed apple field edge at position {}".format(position)
+        raise ValueError(f'Observation kind {self.kind} is not valid')
+
+
+def render_observations(observations: list[Observation]) -> list[str]:
+    """
+    Description: Renders a list of observations as text
+
+    Args:
+        observations (list[Observation]): Observations to render
+
+    Returns:
+        list[str]: Observations texts
+    """
+    return [str(observation) for observation in observations]
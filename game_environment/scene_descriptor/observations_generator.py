@@ -9,8 +9,10 @@ import numpy as np
 import ast
 from scipy.ndimage import label, center_of_mass
 from collections import defaultdict
+from itertools import groupby
 import re
-from game_environment.utils import connected_elems_map, check_agent_out_of_game
+from game_environment.utils import connected_elems_map, check_agent_out_of_game, is_grid
+from game_environment.scene_descriptor.observation import Observation
 import inflect 
 
 
@@ -21,6 +23,32 @@ logger = logging.getLogger(__name__)
 logger = CustomAdapter(logger)
 
 
+# Kinds of the state changes observed between two consecutive observations
+NO_CHANGE, ATTACKED, RAY_BEAM, APPLE_TAKEN, GRASS_DISAPPEARED, GRASS_APPEARED, APPLE_GREW = range(7)
+
+def build_changes_table() -> np.ndarray:
+    """
+    Description: Builds the lookup table that classifies the change of a cell from its (last, current) ascii codes
+
+    Returns:
+        np.ndarray: 256x256 table with the kind of change for each pair of codes
+    """
+    table = np.full((256, 256), NO_CHANGE, dtype=np.uint8)
+    digits = [ord(str(digit)) for digit in range(10)]
+    table[ord('G'), ord('F')] = GRASS_DISAPPEARED
+    table[ord('F'), ord('G')] = GRASS_APPEARED
+    table[ord('G'), ord('A')] = APPLE_GREW
+    table[ord('A'), digits] = APPLE_TAKEN
+    # Changes to a ray beam have precedence over the rest of the rules
+    table[:, ord('B')] = RAY_BEAM
+    table[digits, ord('B')] = ATTACKED
+    table[ord('B'), :] = NO_CHANGE
+    np.fill_diagonal(table, NO_CHANGE)
+    return table
+
+CHANGES_TABLE = build_changes_table()
+
+
 class ObservationsGenerator (object):
     """
     Description: Implements required functions for the observations descriptor. 
@@ -44,12 +72,21 @@ class ObservationsGenerator (object):
         self.other_players_symbols = [str(i) for i in range(len(players_names))]
         self.observed_changes = {name: [] for name in players_names}
         self.substrate_name = substrate_name
+        self.observations_cache = (None, {}) # Scene description and the observations already computed for it
 
         if self.substrate_name == 'commons_harvest_open':
             self.global_trees = connected_elems_map(self.global_map, ['A', 'G'])
+            # Id of the tree of each cell of the global map, 0 for the cells that do not belong to a tree
+            map_rows = [row for row in self.global_map.split('\n') if row != '']
+            self.tree_ids = np.zeros((len(map_rows), len(map_rows[0])), dtype=np.int16)
+            for tree_id, tree_data in self.global_trees.items():
+                tree_elements = np.array(tree_data['elements'])
+                self.tree_ids[tree_elements[:, 0], tree_elements[:, 1]] = tree_id
         elif self.substrate_name == 'clean_up':
-            self.river_bank =  connected_elems_map(self.global_map, ['=','+']) # Chars that represent the river bank
-            self.apple_field_edge = connected_elems_map(self.global_map, ['^','T']) # Chars that represent the apple field edge
+            # Static features of the map in global coordinates
+            global_matrix = np.array([list(row) for row in self.global_map.split('\n') if row != ''])
+            self.river_bank_mask = np.isin(global_matrix, ['=','+']) # Chars that represent the river bank
+            self.apple_field_edge_mask = np.isin(global_matrix, ['^','T']) # Chars that represent the apple field edge
 
 
     def get_element_global_pos(self, el_local_pos, self_local_pos, self_global_pos, agent_orientation=0) -> list[int]:
@@ -80,10 +117,55 @@ class ObservationsGenerator (object):
                                 (el_local_pos[0] - self_local_pos[0]) + self_global_pos[1]
         return list(element_global)
 
+    def get_elements_global_pos(self, els_local_pos: np.ndarray, self_local_pos, self_global_pos, agent_orientation=0) -> np.ndarray:
+        """
+        Description: Returns the global positions of several elements given their local positions and the global position of the agent
+
+        Args:
+            els_local_pos (np.ndarray): Local positions of the elements, one (row, col) per row
+            self_local_pos (tuple): Local position of the agent 
+            self_global_pos (tuple): Global position of the agent
+            agent_orientation (int, optional): Orientation of the agent. Defaults to 0.
+
+        Returns:
+            np.ndarray: Global positions of the elements, one (row, col) per row
+        """
+        delta_rows = els_local_pos[:, 0] - self_local_pos[0]
+        delta_cols = els_local_pos[:, 1] - self_local_pos[1]
+        if agent_orientation == 0:
+            global_rows, global_cols = delta_rows, delta_cols
+        elif agent_orientation == 1:
+            global_rows, global_cols = delta_cols, -delta_rows
+        elif agent_orientation == 2:
+            global_rows, global_cols = -delta_rows, -delta_cols
+        else:
+            global_rows, global_cols = -delta_cols, delta_rows
+        return np.stack([global_rows + self_global_pos[0], global_cols + self_global_pos[1]], axis=1)
+
     
 
 
-    def get_all_observations_descriptions(self,  agents_observations_str: str) -> dict[str, list[str]]:
+    def get_observations(self, scene_description: dict, agent_name: str) -> list[Observation]:
+        """
+        Description: Returns the observations of an agent. The observations are computed only for the requested agent,
+            and memoized until a new scene description is given
+
+        Args:
+            scene_description (dict): Scene description of the agents, as returned by the scene descriptor
+            agent_name (str): Name of the agent
+
+        Returns:
+            list[Observation]: List with the observations of the agent
+        """
+        if scene_description is not self.observations_cache[0]:
+            self.observations_cache = (scene_description, {})
+        cached_observations = self.observations_cache[1]
+        if agent_name not in cached_observations:
+            cached_observations[agent_name] = self.get_observations_per_agent(scene_description[agent_name], agent_name, True)
+            logger.info(f' Observations descriptions for agent {agent_name}: {cached_observations[agent_name]} \n')
+        return cached_observations[agent_name]
+
+    def get_all_observations_descriptions(self,  agents_observations_str: str) -> dict[str, list[Observation]]:
         """
         Description: Returns a dictionary with the descriptions of the observations of the agents
 
@@ -92,7 +174,7 @@ class ObservationsGenerator (object):
             agents_observing (list[str]): List of the agents that are observing and didn't take an action
             
         Returns:
-            dict[str, list[str]]: Dictionary with the descriptions of the observations in a list by agent name
+            dict[str, list[Observation]]: Dictionary with the observations in a list by agent name
         """
         agents_observations = ast.literal_eval(agents_observations_str)
         observations_description_per_agent = {}
@@ -104,9 +186,9 @@ class ObservationsGenerator (object):
         return observations_description_per_agent
     
 
-    def get_observations_per_agent(self, agent_dict: dict, agent_name: str, is_observing: bool) -> list[str]:
+    def get_observations_per_agent(self, agent_dict: dict, agent_name: str, is_observing: bool) -> list[Observation]:
         """
-        Description: Returns a list with the descriptions of the observations of the agent
+        Description: Returns a list with the observations of the agent
 
         Args:
             agent_dict (dict): Dictionary with the observations of the agent
@@ -114,18 +196,18 @@ class ObservationsGenerator (object):
             is_observing (bool): True if the agent is observing, False otherwise
         
         Returns:
-            list: List with the descriptions of the observations of the agent
+            list[Observation]: List with the observations of the agent
         """
         list_of_observations = []
         if agent_dict['observation'].startswith('There are no observations: You were attacked'):
-            list_of_observations.append(str(agent_dict['observation'] + ' At position {}'.format(agent_dict['global_position'])))
+            message = str(agent_dict['observation'] + ' At position {}'.format(agent_dict['global_position']))
+            list_of_observations.append(Observation('out_of_game', position=tuple(agent_dict['global_position']), message=message))
             return list_of_observations
         elif agent_dict['observation'].startswith('There are no observations: you\'re out of the game'):
-            list_of_observations.append(str(agent_dict['observation']))
+            list_of_observations.append(Observation('out_of_game', message=str(agent_dict['observation'])))
             return list_of_observations
         else:
-            local_observation_map = agent_dict['observation']
-            last_observation_map =  agent_dict['last_observation']
+            local_observation_map, last_observation_map = self.get_observation_grids(agent_dict)
             local_map_position = (9,5)
             global_position = agent_dict['global_position']
             agent_orientation = agent_dict['orientation']
@@ -146,6 +228,25 @@ class ObservationsGenerator (object):
         
         return list_of_observations
     
+    def get_observation_grids(self, agent_dict: dict) -> tuple:
+        """
+        Description: Returns the current and the last observations of an agent as grids of codes when the scene description
+            provides them, and in ascci format otherwise
+
+        Args:
+            agent_dict (dict): Dictionary with the observations of the agent
+
+        Returns:
+            tuple[np.ndarray | str, np.ndarray | str | None]: Current and last observations of the agent
+        """
+        observation = agent_dict.get('observation_grid')
+        if observation is None:
+            return agent_dict['observation'], agent_dict['last_observation']
+        last_observation = agent_dict.get('last_observation_grid')
+        if last_observation is None and agent_dict['last_observation'] is not None:
+            last_observation = agent_dict['last_observation']
+        return observation, last_observation
+
     def update_state_changes(self, scene_description: dict, agents_observing: list[str], game_time: str):
         """Update the state changes of the agents
 
@@ -155,8 +256,7 @@ class ObservationsGenerator (object):
         """
         for agent_name in agents_observing:
             agent_dict = scene_description[agent_name]
-            local_observation_map = agent_dict['observation']
-            last_observation_map =  agent_dict['last_observation']
+            local_observation_map, last_observation_map = self.get_observation_grids(agent_dict)
             local_map_position = (9,5)
             global_position = agent_dict['global_position']
             agent_orientation = agent_dict['orientation']
@@ -179,98 +279,104 @@ class ObservationsGenerator (object):
         self.observed_changes[agent_name] = []
         return observations
     
-    def get_agents_observed(self, local_observation_map: str, local_map_position: tuple, global_position: tuple, agent_orientation: int) -> list[str]:
+    def get_agents_observed(self, local_observation_map: str, local_map_position: tuple, global_position: tuple, agent_orientation: int) -> list[Observation]:
         """
-        Returns a list with the descriptions of the agents observed by the agent
+        Returns a list with the agents observed by the agent
 
         Args:
-            local_observation_map (str): Local map in ascci format
+            local_observation_map (str | np.ndarray): Local map in ascci format or as a grid of codes
             local_map_position (tuple): Local position of the agent in the observed window
             global_position (tuple): Global position of the agent
             agent_orientation (int): Orientation of the agent
 
         Returns:
-            list[str]: List with the descriptions of the agents observed by the agent
+            list[Observation]: List with the agents observed by the agent
         """
 
         agents_observed = []
 
-        i = 0
-        for row in local_observation_map.split('\n'):
-            j=0
-            for char in row:
-                if re.match(r'^[0-9]$', char):
-                    agent_id = int(char)
-                    agent_name = self.players_names[agent_id]
-                    agent_global_pos = self.get_element_global_pos((i,j), local_map_position, global_position, agent_orientation)
-                    agents_observed.append("Observed agent {} at position {}.".format(agent_name, agent_global_pos))
-                j+=1
-            i+=1
+        local_codes = self.get_codes_matrix(local_observation_map)
+        agents_cells = np.argwhere((local_codes >= ord('0')) & (local_codes <= ord('9')))
+        for (i, j) in agents_cells.tolist():
+            agent_name = self.players_names[local_codes[i, j] - ord('0')]
+            agent_global_pos = self.get_element_global_pos((i,j), local_map_position, global_position, agent_orientation)
+            agents_observed.append(Observation('agent', position=tuple(agent_global_pos), entity_id=agent_name))
 
         return agents_observed
 
     def get_trees_descriptions(self, local_map:str, local_position:tuple, global_position:tuple, agent_orientation:int):
         """
-        Description: Returns a list with the descriptions of the trees observed by the agent
+        Description: Returns a list with the trees, apples and grass observed by the agent
 
         Args:
-            local_map (str): Local map in ascci format
+            local_map (str | np.ndarray): Local map in ascci format or as a grid of codes
             local_position (tuple): Local position of the agent
             global_position (tuple): Global position of the agent
             agent_orientation (int): Orientation of the agent
             
         Returns:
-            list: List with the descriptions of the trees observed by the agent
+            list[Observation]: List with the trees, apples and grass observed by the agent
         """
         tree_elements = ['A', 'G']
         elements_to_find = tree_elements + self.other_players_symbols + [self.self_symbol]
-        local_tree_elements = connected_elems_map(local_map, elements_to_find=elements_to_find)
+        local_codes = self.get_codes_matrix(local_map)
+        local_tree_elements = connected_elems_map(local_codes, elements_to_find=elements_to_find)
+        local_rows = local_codes.tolist()
+
+        # Find the global tree of each local group with its center, the groups are kept in order for each tree
+        local_groups_by_tree = {}
+        for local_tree_data in local_tree_elements.values():
+            # Check if the group is a tree element
+            first_element = local_tree_data['elements'][0]
+            element_type = chr(local_rows[first_element[0]][first_element[1]])
+            second_element_type = None
+            if len(local_tree_data['elements'])>1: # We'll make a double check to verify if the first elelment is being overlapped by another element
+                second_element = local_tree_data['elements'][1] 
+                second_element_type = chr(local_rows[second_element[0]][second_element[1]])
+            if (element_type not in tree_elements) and (second_element_type not in tree_elements):
+                continue
+
+            # Check if the local tree corresponds to a global tree
+            center_row, center_col = self.get_element_global_pos(local_tree_data['center'], local_position, global_position, agent_orientation)
+            if not (0 <= center_row < self.tree_ids.shape[0] and 0 <= center_col < self.tree_ids.shape[1]):
+                continue
+            global_tree_id = int(self.tree_ids[center_row, center_col])
+            if global_tree_id == 0:
+                continue
+            local_groups_by_tree.setdefault(global_tree_id, []).append((element_type, local_tree_data))
+
+        # A tree is described with its first local group of each element type
+        observed_groups = []
+        for global_tree_id in sorted(local_groups_by_tree):
+            observed_types = set()
+            for element_type, local_tree_data in local_groups_by_tree[global_tree_id]:
+                if element_type not in observed_types:
+                    observed_types.add(element_type)
+                    observed_groups.append((global_tree_id, local_tree_data['elements']))
+        if not observed_groups:
+            return []
+
+        # The global positions of the elements of all the observed groups are computed at once
+        local_elements = np.array([element for _, elements in observed_groups for element in elements])
+        elements_global_pos = iter(self.get_elements_global_pos(local_elements, local_position, global_position, agent_orientation).tolist())
+
         list_trees_observations = []
-        trees_observed = {}
-        for global_tree_id, global_tree_data in self.global_trees.items():
+        for global_tree_id, tree_groups in groupby(observed_groups, key=lambda group: group[0]):
             apple_count, grass_count = 0, 0
-            apple_list, grass_list = [], []
-            for local_tree_data in local_tree_elements.values():
-                # Check if the group is a tree element
-                first_element = local_tree_data['elements'][0]
-                element_type = local_map.split('\n')[first_element[0]][first_element[1]]
-                second_element_type = None
-                if len(local_tree_data['elements'])>1: # We'll make a double check to verify if the first elelment is being overlapped by another element
-                    second_element = local_tree_data['elements'][1] 
-                    second_element_type = local_map.split('\n')[second_element[0]][second_element[1]]
-                if (element_type not in tree_elements) and (second_element_type not in tree_elements):
-                    continue
-
-                # Continue if the tree has already been observed
-                if global_tree_id in trees_observed.get(element_type, []): 
-                    continue
-
-                local_tree_center = local_tree_data['center']
-                local_center_real_pos = self.get_element_global_pos(local_tree_center, local_position, global_position, agent_orientation)
-
-                # Check if the local tree corresponds to the global tree
-                if local_center_real_pos not in global_tree_data['elements']:
-                    continue
-
-                # Find the cluster tree of the local tree
-                trees_observed[element_type] = trees_observed.get(element_type, []) + [global_tree_id]
-    
-                for apple in local_tree_data['elements']:
-                    apple_global_pos = self.get_element_global_pos(apple, local_position, global_position, agent_orientation)
-                    if local_map.split('\n')[apple[0]][apple[1]] == 'G':
-                        list_trees_observations.append("Observed grass to grow apples at position {}. This grass belongs to tree {}."
-                                                    .format(apple_global_pos, global_tree_id))
-                        grass_list.append(apple_global_pos)
+            for _, elements in tree_groups:
+                for element in elements:
+                    element_global_pos = tuple(next(elements_global_pos))
+                    element_char = chr(local_rows[element[0]][element[1]])
+                    if element_char == 'G':
+                        list_trees_observations.append(Observation('grass', position=element_global_pos, tree_id=global_tree_id))
                         grass_count += 1
-                    elif local_map.split('\n')[apple[0]][apple[1]] == 'A':
-                        list_trees_observations.append("Observed an apple at position {}. This apple belongs to tree {}."
-                                                    .format(apple_global_pos, global_tree_id ))
-                        apple_list.append(apple_global_pos)
+                    elif element_char == 'A':
+                        list_trees_observations.append(Observation('apple', position=element_global_pos, tree_id=global_tree_id))
                         apple_count += 1
 
             if apple_count > 0 or grass_count > 0:      
-                list_trees_observations.append("Observed tree {} at position {}. This tree has {} apples remaining and {} grass for apples growing on the observed map. The tree might have more apples and grass on the global map."
-                                                .format(global_tree_id, list(global_tree_data['center']), apple_count, grass_count))
+                list_trees_observations.append(Observation('tree', position=tuple(self.global_trees[global_tree_id]['center']), tree_id=global_tree_id,
+                                                           apple_count=apple_count, grass_count=grass_count))
         return list_trees_observations
     
     def get_matrix(self, map) -> np.array:
@@ -284,12 +390,26 @@ class ObservationsGenerator (object):
         """
         return np.array([[l for l in row] for row in map.split('\n')])
 
+    def get_codes_matrix(self, map: str | np.ndarray) -> np.ndarray:
+        """Convert a map in ascci format to a matrix of ascii codes. Maps that already are grids of codes are returned as they are
+
+        Args:
+            map (str | np.ndarray): Map in ascci format or as a grid of codes
+
+        Returns:
+            np.ndarray: Map as a uint8 matrix
+        """
+        if is_grid(map):
+            return map
+        rows = map.split('\n')
+        return np.frombuffer(''.join(rows).encode('ascii', 'replace'), dtype=np.uint8).reshape(len(rows), -1)
+
     def get_observed_changes(self, observed_map: str, last_observed_map: str | None, agent_local_position: tuple, agent_global_position: tuple, agent_orientation: int, game_time: str) -> list[tuple[str, str]]:
         """Create a list of observations of the changes in the environment
         
         Args:
-            observed_map (str): Map observed by the agent
-            last_observed_map (str | None): Last map observed by the agent
+            observed_map (str | np.ndarray): Map observed by the agent, in ascci format or as a grid of codes
+            last_observed_map (str | np.ndarray | None): Last map observed by the agent
             agent_local_position (tuple): Position of the agent on the observed map
             agent_global_position (tuple): Global position of the agent
             agent_orientation (int): Orientation of the agent
@@ -298,85 +418,90 @@ class ObservationsGenerator (object):
         Returns:
             list[tuple[str, str]]: List of tuples with the changes in the environment, and the game time
         """
-        if check_agent_out_of_game([observed_map]):
+        if isinstance(observed_map, str) and check_agent_out_of_game([observed_map]):
             return [(observed_map, game_time)]
         
         observations = []
-        if last_observed_map == None:
+        if last_observed_map is None:
             return observations
         
-        curr_m = self.get_matrix(observed_map)
-        last_m = self.get_matrix(last_observed_map)
-        for index in np.ndindex(curr_m.shape):
-            curr_el = curr_m[index]
-            last_el = last_m[index]
-            if curr_el != last_el:
-                # If someone attacked nearby
-                if last_el.isnumeric() and curr_el == 'B':
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Someone was attacked at position {el_pos}.", game_time))
-                elif curr_el == 'B':
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Observed a ray beam from an attack at position {el_pos}.", game_time))
-                elif last_el == 'B':
-                    pass
-                # If an apple was taken
-                elif last_el == 'A':
-                    agent_id = int(curr_el)
-                    agent_name = self.players_names[agent_id]
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Observed that agent {agent_name} took an apple from position {el_pos}.", game_time))
-                # If grass desappeared
-                elif last_el == 'G' and curr_el == 'F':
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Observed that the grass at position {el_pos} disappeared.", game_time))
-                # If grass appeared
-                elif last_el == 'F' and curr_el == 'G':
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Observed that grass to grow apples appeared at position {el_pos}.", game_time))
-                # If an apple appeared
-                elif last_el == 'G' and curr_el == 'A':
-                    el_pos = self.get_element_global_pos(index, agent_local_position, agent_global_position, agent_orientation)
-                    observations.append((f"Observed that an apple grew at position {el_pos}.", game_time))
+        curr_m = self.get_codes_matrix(observed_map)
+        last_m = self.get_codes_matrix(last_observed_map)
+        changes = CHANGES_TABLE[last_m, curr_m]
+        changed_cells = np.argwhere(changes != NO_CHANGE)
+        if len(changed_cells) == 0:
+            return observations
+        changes = changes[changed_cells[:, 0], changed_cells[:, 1]]
+        curr_codes = curr_m[changed_cells[:, 0], changed_cells[:, 1]]
+        els_pos = self.get_elements_global_pos(changed_cells, agent_local_position, agent_global_position, agent_orientation).tolist()
+
+        for change, curr_code, el_pos in zip(changes, curr_codes, els_pos):
+            # If someone attacked nearby
+            if change == ATTACKED:
+                observations.append((f"Someone was attacked at position {el_pos}.", game_time))
+            elif change == RAY_BEAM:
+                observations.append((f"Observed a ray beam from an attack at position {el_pos}.", game_time))
+            # If an apple was taken
+            elif change == APPLE_TAKEN:
+                agent_name = self.players_names[int(chr(curr_code))]
+                observations.append((f"Observed that agent {agent_name} took an apple from position {el_pos}.", game_time))
+            # If grass desappeared
+            elif change == GRASS_DISAPPEARED:
+                observations.append((f"Observed that the grass at position {el_pos} disappeared.", game_time))
+            # If grass appeared
+            elif change == GRASS_APPEARED:
+                observations.append((f"Observed that grass to grow apples appeared at position {el_pos}.", game_time))
+            # If an apple appeared
+            elif change == APPLE_GREW:
+                observations.append((f"Observed that an apple grew at position {el_pos}.", game_time))
 
         return observations
 
 
     def get_clean_up_descriptions (self, local_map:str, local_position:tuple, global_position:tuple, agent_orientation:int):
         """
-        Description: Returns a list with the descriptions of the objects observed by the agent
+        Description: Returns a list with the objects observed by the agent
 
         Args:
-            local_map (str): Local map in ascci format
+            local_map (str | np.ndarray): Local map in ascci format or as a grid of codes
             local_position (tuple): Local position of the agent
             global_position (tuple): Global position of the agent
             agent_orientation (int): Orientation of the agent
             
         Returns:
-            list: List with the descriptions of the objects observed by the agent
+            list[Observation]: List with the objects observed by the agent
         """
         
+        local_codes = self.get_codes_matrix(local_map)
+        local_cells = np.argwhere(np.ones(local_codes.shape, dtype=bool))
+        cells_global_pos = self.get_elements_global_pos(local_cells, local_position, global_position, agent_orientation)
+
+        # The static features are looked up on the global masks for the cells of the window inside the map
+        map_shape = self.river_bank_mask.shape
+        inside = (cells_global_pos[:, 0] >= 0) & (cells_global_pos[:, 0] < map_shape[0]) & \
+                 (cells_global_pos[:, 1] >= 0) & (cells_global_pos[:, 1] < map_shape[1])
+        inside_rows, inside_cols = cells_global_pos[inside, 0], cells_global_pos[inside, 1]
+        is_river_bank = np.zeros(len(local_cells), dtype=bool)
+        is_river_bank[inside] = self.river_bank_mask[inside_rows, inside_cols]
+        is_apple_field_edge = np.zeros(len(local_cells), dtype=bool)
+        is_apple_field_edge[inside] = self.apple_field_edge_mask[inside_rows, inside_cols]
+        local_chars = local_codes.ravel()
+        is_apple = local_chars == ord('A')
+        is_dirt = local_chars == ord('D')
+
         items_observed = []
-        # Get apples (A) and dirt (D) observed descriptions
-        for i, row in enumerate(local_map.split('\n')):
-            for j, char in enumerate(row):
-                if char == 'A':
-                    apple_global_pos = self.get_element_global_pos((i,j), local_position, global_position, agent_orientation)
-                    items_observed.append("Observed an apple at position {}".format(apple_global_pos))
-
-                elif char == 'D':
-                    dirt_global_pos = self.get_element_global_pos((i,j), local_position, global_position, agent_orientation)
-                    items_observed.append("Observed dirt on the river at position {}".format(dirt_global_pos))
-
-                for elm in self.river_bank.values():
-                    if (i,j) in elm['elements']:
-                        river_bank_global_pos = self.get_element_global_pos((i,j), local_position, global_position, agent_orientation)
-                        items_observed.append("Observed river bank at position {}".format(river_bank_global_pos))
-                
-                for elm in self.apple_field_edge.values():
-                    if (i,j) in elm['elements']:
-                        apple_field_edge_global_pos = self.get_element_global_pos((i,j), local_position, global_position, agent_orientation)
-                        items_observed.append("Observed apple field edge at position {}".format(apple_field_edge_global_pos))
+        cells_global_pos = cells_global_pos.tolist()
+        for cell in np.flatnonzero(is_apple | is_dirt | is_river_bank | is_apple_field_edge).tolist():
+            cell_global_pos = tuple(cells_global_pos[cell])
+            # Get apples (A) and dirt (D) observed descriptions
+            if is_apple[cell]:
+                items_observed.append(Observation('apple', position=cell_global_pos))
+            elif is_dirt[cell]:
+                items_observed.append(Observation('dirt', position=cell_global_pos))
+            if is_river_bank[cell]:
+                items_observed.append(Observation('river_bank', position=cell_global_pos))
+            if is_apple_field_edge[cell]:
+                items_observed.append(Observation('apple_field_edge', position=cell_global_pos))
 
         return items_observed
 
@@ -1,12 +1,27 @@
 import re
 import numpy as np
 import logging
-from game_environment.utils import parse_string_to_matrix, matrix_to_string
+from game_environment.utils import parse_string_to_grid, grid_to_string, grid_code
 from utils.logging import CustomAdapter
 
 logger = logging.getLogger(__name__)
 logger = CustomAdapter(logger)
 
+SELF_CODE = ord('#') # Code of the avatar on its own observation
+GRID_KEYS = ('observation_grid', 'last_observation_grid') # Keys of the description of an avatar that hold arrays, not text
+
+def get_text_description(description: dict) -> dict:
+    """
+    Removes the grids of codes from the description of an avatar, so it can be logged and recorded as text
+
+    Args:
+        description: Description of an avatar, as returned by describe_scene
+
+    Returns:
+        The description without the grids of codes
+    """
+    return {key: value for key, value in description.items() if key not in GRID_KEYS}
+
 class Avatar:
     def __init__(self, name:str, avatar_config):
         """
@@ -26,6 +41,8 @@ class Avatar:
         self.reward = None
         self.partial_observation = None
         self.last_partial_observation = None
+        self.observation_grid = None # Partial observations as grids of codes, the same windows as the text observations
+        self.last_observation_grid = None
         self.agents_in_observation = None
         self.murder = None
         self.avatar_state = 1
@@ -58,6 +75,12 @@ class Avatar:
     def set_last_partial_observation(self, partial_observation):
         self.last_partial_observation = partial_observation
 
+    def set_observation_grid(self, observation_grid):
+        self.observation_grid = observation_grid
+
+    def set_last_observation_grid(self, observation_grid):
+        self.last_observation_grid = observation_grid
+
     def set_position(self, x, y):
         self.position = (x, y)
 
@@ -72,6 +95,7 @@ class Avatar:
         self.orientation = None
         self.reward = None
         self.partial_observation = None
+        self.observation_grid = None
         self.agents_in_observation = None
     
     def __str__(self):
@@ -85,13 +109,66 @@ class Avatar:
         
 
 
+class MapViews:
+    """
+    Padded map of a step and its rotations. The map is padded once per step and each rotation is computed only
+    the first time it is requested, so all the avatars share the same views. Cropping an observation is then
+    index arithmetic on the view.
+    """
+
+    def __init__(self, map, padding, padding_char="-"):
+        """
+        Args:
+            map (np.ndarray): Global map of the step, as a grid of codes or as a matrix of chars
+            padding (int): Minimum padding of the map, the largest view distance of the avatars
+            padding_char (str, optional): Char used for the padding. Defaults to "-".
+        """
+        self.padded_map = SceneDescriptor.pad_matrix_to_square(map, padding, padding_char)
+        self.size = self.padded_map.shape[0]
+        self.offset = (self.size - max(map.shape)) // 2
+        self.rotations = {}
+
+    def get_rotation(self, k):
+        """Returns the padded map rotated k times by 90 degrees counterclockwise"""
+        k = int(k) % 4
+        if k not in self.rotations:
+            self.rotations[k] = np.rot90(self.padded_map, k=k)
+        return self.rotations[k]
+
+    def get_rotated_position(self, position, k):
+        """Returns the (row, col) of a global position on the padded map rotated k times"""
+        row, col = position[0] + self.offset, position[1] + self.offset
+        last = self.size - 1
+        k = int(k) % 4
+        if k == 1:
+            return last - col, row
+        if k == 2:
+            return last - row, last - col
+        if k == 3:
+            return col, last - row
+        return row, col
+
+    def crop(self, position, k, avatar_view):
+        """Returns the window seen by an avatar at the global position, looking to the orientation k. The window is a view of the map, not a copy"""
+        row, col = self.get_rotated_position(position, k)
+        return self.get_rotation(k)[row - avatar_view.get("forward"):row + avatar_view.get("backward") + 1,
+                                    col - avatar_view.get("left"):col + avatar_view.get("right") + 1]
+
+
 class SceneDescriptor:
 
     def __init__(self, substrate_config):
         self.substrate_config = substrate_config
         self.n_players = substrate_config.lab2d_settings.numPlayers
         self.avatars = self.get_avatars(substrate_config.player_names)
+        self.avatars_by_name = {avatar.name: avatar for avatar in self.avatars.values()}
         self.last_map = None # Map of the inmediately last step
+        self.last_views = None # Padded and rotated views of the last map
+        self.last_positions = {} # Positions of the alive avatars on the last map
+        self.described_timestep = None # Last described timestep and its observation, its description is memoized
+        self.last_description = None
+        self.described_avatars = None # Names of the avatars whose observations are computed, None for all of them
+        self.view_padding = max(max(avatar.avatar_view.values()) for avatar in self.avatars.values())
         for avatar_id, avatar in self.avatars.items():
             logger.info(f"{avatar.name} is player {avatar_id}")
         
@@ -103,14 +180,31 @@ class SceneDescriptor:
         return avatars
 
     def describe_scene(self, timestep):
+        """
+        Describes the scene of a timestep. Descriptions are memoized by the identity of the timestep and its observation,
+        so describing the same timestep again does not advance the state of the avatars nor the last map.
+
+        Args:
+            timestep (dm_env.TimeStep): Timestep of the environment
+
+        Returns:
+            tuple[dict, np.ndarray]: Description of the scene for each avatar and the global map as a grid of codes
+        """
+        if self.described_timestep is not None and timestep is self.described_timestep[0] \
+                and timestep.observation is self.described_timestep[1]:
+            return self.last_description
         self.reset_population()
         map, zaps = self.parse_timestep(timestep)
         self.parse_zaps(zaps)
-        self.compute_partial_observations(map, self.last_map)
+        views = MapViews(map, self.view_padding)
+        self.compute_partial_observations(views, self.last_views)
 
         self.last_map = map
+        self.last_views = views
+        self.last_positions = {avatar_id: avatar.position for avatar_id, avatar in self.avatars.items() if avatar.avatar_state == 1}
 
         result = {}
+        murders = {avatar.murder for avatar in self.avatars.values() if avatar.just_died}
         for avatar_id, avatar in self.avatars.items():
             logger.info(f"Avatar {avatar_id} is in position {avatar.position}")
             result[avatar.name] = {"observation": avatar.partial_observation,
@@ -118,19 +212,31 @@ class SceneDescriptor:
                                  "global_position": avatar.position,
                                  "orientation": int(avatar.orientation),
                                  "last_observation": avatar.last_partial_observation,
-                                 "effective_zap": avatar.name in [a.murder for a in self.avatars.values() if a.just_died],
+                                 "observation_grid": avatar.observation_grid,
+                                 "last_observation_grid": avatar.last_observation_grid,
+                                 "effective_zap": avatar.name in murders,
                                 }
+        self.described_timestep = (timestep, timestep.observation)
+        self.last_description = (result, map)
         return result, map
 
     def parse_zaps(self, zaps):
-        for victim_index, row in enumerate(zaps):
-            for murder_index, value in enumerate(row):
-                murder_name = self.avatars[murder_index].name
-                if value > 0:
-                    self.avatars[victim_index].set_murder(murder_name)
+        # Only the zaps that happened are visited, in the same row-major order as the matrix
+        for victim_index, murder_index in zip(*np.nonzero(np.asarray(zaps) > 0)):
+            self.avatars[int(victim_index)].set_murder(self.avatars[int(murder_index)].name)
 
-    def compute_partial_observations(self, map, last_map):
+    def compute_partial_observations(self, views, last_views):
+        """
+        Computes the partial observations of the avatars from the views of the current and the last map.
+        The avatars that are not described keep empty observations.
+
+        Args:
+            views (MapViews): Views of the current map
+            last_views (MapViews | None): Views of the last map, None on the first step
+        """
         for avatar_id, avatar in self.avatars.items():
+            if self.described_avatars is not None and avatar.name not in self.described_avatars:
+                continue
             if avatar.avatar_state == 0:
                 if avatar.just_died:
                     obs_text = f"There are no observations: You were attacked by agent {avatar.murder} and currently you're out of the game."
@@ -139,43 +245,54 @@ class SceneDescriptor:
                 avatar.set_partial_observation(obs_text)
                 avatar.set_agents_in_observation({})
             else:
-                min_padding = max(avatar.avatar_view.values())
-                padded_map = self.pad_matrix_to_square(map, min_padding)
-                padded_map = np.rot90(padded_map, k=int(avatar.orientation))
-                observation, agents_in_observation = self.crop_observation(padded_map, avatar_id, avatar.avatar_view)
+                observation, observation_grid, agents_in_observation = self.crop_observation(views, avatar.position, avatar.orientation,
+                                                                                            avatar_id, avatar.avatar_view)
                 avatar.set_partial_observation(observation)
+                avatar.set_observation_grid(observation_grid)
                 avatar.set_agents_in_observation(agents_in_observation)
 
                 # Get the past observations of the observed map to calculate state changes
-                if last_map is not None and not avatar.just_revived:
-                    last_padded_map = self.pad_matrix_to_square(last_map, min_padding)
-                    last_padded_map = np.rot90(last_padded_map, k=int(avatar.orientation))
-                    last_observation, _ = self.crop_observation(last_padded_map, avatar_id, avatar.avatar_view)
+                if last_views is not None and not avatar.just_revived and avatar_id in self.last_positions:
+                    last_observation, last_observation_grid, _ = self.crop_observation(last_views, self.last_positions[avatar_id], avatar.orientation,
+                                                                                       avatar_id, avatar.avatar_view, find_agents=False)
                     avatar.set_last_partial_observation(last_observation)
+                    avatar.set_last_observation_grid(last_observation_grid)
                 # If the avatar just revived, set the last observation to None
-                elif last_map is not None and avatar.just_revived:
+                elif last_views is not None and avatar.just_revived:
                     avatar.set_last_partial_observation(None)
+                    avatar.set_last_observation_grid(None)
 
-    def crop_observation(self, map, avatar_id, avatar_view):
-        # get avatar position in matrix
-        avatar_pos = np.where(map == str(avatar_id))
-        avatar_pos = list(zip(avatar_pos[1], avatar_pos[0]))[0]
-        upper_bound = avatar_pos[1] - avatar_view.get("forward")
-        left_bound = avatar_pos[0] - avatar_view.get("left")
-        lower_bound = avatar_pos[1] + avatar_view.get("backward") + 1
-        right_bound = avatar_pos[0] + avatar_view.get("right") + 1
-        observation = matrix_to_string(map[upper_bound:lower_bound, left_bound:right_bound])
-        observation = observation.replace(str(avatar_id), "#")
-        agents_in_observation = self.get_agents_in_observation(observation)
-        return observation, agents_in_observation
+    def crop_observation(self, views, position, orientation, avatar_id, avatar_view, find_agents=True):
+        """
+        Crops the observation of an avatar from the shared views of a map. The window is copied once to mark the avatar with '#',
+        and the text observation is rendered from that grid
 
-    def get_agents_in_observation(self, observation):
-        digits_list = []
-        pattern = r'\d+'
+        Args:
+            views (MapViews): Views of the map
+            position (tuple): Global position of the avatar on the map
+            orientation (int): Orientation of the avatar
+            avatar_id (int): Id of the avatar
+            avatar_view (dict): View distances of the avatar
+            find_agents (bool, optional): Whether to find the agents in the observation. Defaults to True.
+
+        Returns:
+            tuple[str, np.ndarray, dict | None]: Observation of the avatar, the observation as a grid of codes and the agents in the observation
+        """
+        observation_grid = views.crop(position, orientation, avatar_view).copy()
+        if avatar_id < 10:
+            observation_grid[observation_grid == self.get_avatar_code(avatar_id)] = SELF_CODE
+        observation = grid_to_string(observation_grid)
+        agents_in_observation = self.get_agents_in_observation(observation) if find_agents else None
+        return observation, observation_grid, agents_in_observation
 
-        for string in observation:
-            digits = re.findall(pattern, string)
-            digits_list.extend(digits)
+    @staticmethod
+    def get_avatar_code(avatar_id):
+        """Returns the code of an avatar on the map. Maps keep one char per cell, so ids of 10 or more keep only their first digit"""
+        return ord(str(avatar_id)[0])
+
+    def get_agents_in_observation(self, observation):
+        # The observation has one char per cell, so each digit is an agent
+        digits_list = re.findall(r'\d', observation)
 
         agents = {}
         for digit in digits_list:
@@ -194,7 +311,7 @@ class SceneDescriptor:
 
         new_dim = max_dim + 2 * total_padding
 
-        padded_matrix = np.full((new_dim, new_dim), padding_char, dtype=matrix.dtype)
+        padded_matrix = np.full((new_dim, new_dim), grid_code(matrix, padding_char), dtype=matrix.dtype)
 
         start_row = total_padding
         start_col = total_padding
@@ -208,8 +325,7 @@ class SceneDescriptor:
 
     def parse_timestep(self, timestep):
         
-        map = timestep.observation["GLOBAL.TEXT"].item().decode("utf-8")
-        map = parse_string_to_matrix(map)
+        map = parse_string_to_grid(timestep.observation["GLOBAL.TEXT"].item().decode("utf-8"))
         zaps = timestep.observation["WORLD.WHO_ZAPPED_WHO"]
 
         states = timestep.observation["WORLD.AVATAR_STATES"]
@@ -217,7 +333,7 @@ class SceneDescriptor:
             _id = avatar_id + 1
             position = timestep.observation[f"{_id}.POSITION"]
             if states[avatar_id]: # Only include the avatar in the map if it is alive
-                map[position[1], position[0]] = avatar_id
+                map[position[1], position[0]] = self.get_avatar_code(avatar_id)
             avatar.set_position(position[1], position[0])
             avatar.set_orientation(timestep.observation[f"{_id}.ORIENTATION"])
             avatar.set_reward(timestep.observation[f"{_id}.REWARD"])
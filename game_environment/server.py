@@ -15,6 +15,8 @@ from utils.logging import CustomAdapter
 from typing import Dict, Any
 import importlib
 import os
+import numpy as np
+from game_environment.utils import grid_code
 
 # Import functions 
 def import_game(substrate_name:str, kind_experiment:str = ""):
@@ -92,7 +94,7 @@ _ACTION_MAP = {
 def verbose_fn(unused_timestep, unused_player_index: int) -> None:
     pass
 
-def run_episode(game_name: str, record: bool, players: list[str], init_timestamp:str, scenario: str = None, kind_experiment: str = ""):
+def run_episode(game_name: str, record: bool, players: list[str], init_timestamp:str, scenario: str = None, kind_experiment: str = "", render: str = "pygame", seed: int = None):
     """Create the simulation environment and run an episode of the game
     Args:
         game_name: Name of the game to run, the name must match a folder in game_environment/substrates/python
@@ -100,6 +102,8 @@ def run_episode(game_name: str, record: bool, players: list[str], init_timestamp
         players: List with the player names to run the game with
         scenario: Name of the scenario to run, the must be one of the predefined scenarios for the chosen game
         kind_experiment: The kind of experiment that will bi run, valid options are: '' for no experiment, 'adversarial_event' for the adversarial event experiment, 'personalized' pre-loaded experiments
+        render: How to render the game, 'pygame' shows the game on a window at a fixed fps, 'none' runs it headless as fast as possible
+        seed: Seed of the game environment, None for a random seed
     Returns:
         A game environment
     """
@@ -140,7 +144,7 @@ def run_episode(game_name: str, record: bool, players: list[str], init_timestamp
         config_overrides,
         _ACTION_MAP,
         env_config, 
-        interactive=level_playing_utils.RenderType.PYGAME,
+        interactive=level_playing_utils.RenderType[render.upper()],
         player_prefixes=players,
         game_ascii_map=ASCII_MAP,
         init_timestamp=init_timestamp,
@@ -149,11 +153,13 @@ def run_episode(game_name: str, record: bool, players: list[str], init_timestamp
         record=record,
         bots=bots,
         substrate_name=game_name,
+        env_seed=seed,
+        actions_log_folder=os.path.join('logs', init_timestamp),
         )
     return game_env
 
 
-def start_server(players: list[str],init_timestamp: str,  game_name: str = "commons_harvest_open", record: bool = False, scenario: str = None, kind_experiment: str = ""):
+def start_server(players: list[str],init_timestamp: str,  game_name: str = "commons_harvest_open", record: bool = False, scenario: str = None, kind_experiment: str = "", render: str = "pygame", seed: int = None):
     """Start the game simulation server
     Args:
         players: List with the player names to run the game with
@@ -161,6 +167,8 @@ def start_server(players: list[str],init_timestamp: str,  game_name: str = "comm
         record: Whether to record the game
         scenario: Name of the scenario to run, the must be one of the predefined scenarios for the chosen game
         kind_experiment: The kind of experiment that will bi run, valid options are: '' for no experiment, 'adversarial_event' for the adversarial event experiment, 'personalized' pre-loaded experiments
+        render: How to render the game, 'pygame' or 'none' for a headless game
+        seed: Seed of the game environment, None for a random seed
     Returns:
         A game environment
     """
@@ -169,7 +177,7 @@ def start_server(players: list[str],init_timestamp: str,  game_name: str = "comm
     #Imports the game module
     game = import_game(game_name, kind_experiment)
 
-    return run_episode(game_name, record, players, init_timestamp, scenario, kind_experiment)
+    return run_episode(game_name, record, players, init_timestamp, scenario, kind_experiment, render, seed)
 
 def get_scenario_map  (game_name:str)-> str:
     """Get the scenario map from the game environment
@@ -227,21 +235,21 @@ def change_avatars_appearance(lab2d_settings: Dict[str, Any],is_focal_player: li
     
 
 
-def condition_to_end_game(substrate_name:str, current_map:list[str]):
+def condition_to_end_game(substrate_name:str, current_map:np.ndarray):
     """
     Check if the game has ended
     Args:
         substrate_name: Name of the game to run, the name must match a folder in game_environment/substrates/python
-        current_map: The current map of the game
+        current_map: The current map of the game, as a grid of codes
     Returns:
         A boolean indicating if the game has ended if condition for the specific substrate is met
     """
     
     if substrate_name == "commons_harvest_open":
         # Checks if there's any apple "A" in the current map
-        for row in current_map:
-            if "A" in row:
-                return False
+        current_map = np.asarray(current_map)
+        if np.any(current_map == grid_code(current_map, "A")):
+            return False
     
     
     return True
\ No newline at end of file
@@ -1,7 +1,7 @@
 import os
 import json
 
-from game_environment.utils import connected_elems_map, get_local_position_of_element
+from game_environment.utils import connected_elems_map, get_local_position_of_element, grid_code
 from utils.math import manhattan_distance
 
 def get_nearest_apple(game_map: list[list[str]], position: tuple[int, int]) -> tuple[int, int]:
@@ -49,7 +49,7 @@ def is_apple_the_last_of_tree(game_map: list[list[str]], apple_position: tuple[i
 
         for elem in group['elements']:
             element = game_map[elem[0]][elem[1]]
-            if element == 'A':
+            if element == grid_code(game_map, 'A'):
                 apples.append(elem)
         
         if len(apples) == 1:
@@ -133,7 +133,7 @@ def record_elements_status(record_obj, initial_map: list[list[str]], current_map
     for elem_key in connected_elements:
         elements = connected_elements[elem_key]['elements']
         if len(elements) > 1:
-            apples_count = len([elem for elem in elements if current_map[elem[0]][elem[1]] == 'A'])
+            apples_count = len([elem for elem in elements if current_map[elem[0]][elem[1]] == grid_code(current_map, 'A')])
             trees[elem_key] = apples_count
 
     with open(os.path.join(record_obj.log_path, "trees_history.txt"), "a") as f:
@@ -152,7 +152,7 @@ def record_elements_status(record_obj, initial_map: list[list[str]], current_map
                 if new_distance < record_obj.last_apple_object[agent]['distance']:
                     record_obj.last_apple_object[agent]['move_towards_last_apple'] += 1
                 # Check if the agent took the last apple
-                if current_map[record_obj.last_apple_object[agent]['last_apple_pos'][0]][record_obj.last_apple_object[agent]['last_apple_pos'][1]] == record_obj.agents_ids[agent]:
+                if current_map[record_obj.last_apple_object[agent]['last_apple_pos'][0]][record_obj.last_apple_object[agent]['last_apple_pos'][1]] == grid_code(current_map, record_obj.agents_ids[agent]):
                     record_obj.last_apple_object[agent]['took_last_apple'] += 1
 
                 # Reset the last_apple information
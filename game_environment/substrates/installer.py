@@ -1,21 +1,29 @@
 import os
 import shutil
 import logging
+import threading
 from distutils.dir_util import copy_tree
 from utils.files import load_config
 
 logger = logging.getLogger(__name__)
+# Substrates already installed by this process, the episodes run in the same process install each substrate once
+_installed_substrates = set()
+_install_lock = threading.Lock()
 
 def install_substrate(substrate_name):
-    config = load_config()
-    meltingpot_dir = os.getenv("MELTING_POT_DIR")
-    substrates_suffix = "meltingpot/lua/levels/"
-    source_dir = os.path.join(config["game_folder"], "substrates", "lua", substrate_name)
-    target_dir = os.path.join(meltingpot_dir.replace("~", os.path.expanduser("~")),
-                              substrates_suffix, substrate_name)
-    assert os.path.isdir(source_dir), "The substrate does not exist in levels/"
-    if os.path.isdir(target_dir):
-        logger.debug("Removing old substrate")
-        shutil.rmtree(target_dir)
-    copy_tree(source_dir, target_dir)
-    logger.debug("Substrate installed in meltingpot!")
\ No newline at end of file
+    with _install_lock:
+        if substrate_name in _installed_substrates:
+            return
+        config = load_config()
+        meltingpot_dir = os.getenv("MELTING_POT_DIR")
+        substrates_suffix = "meltingpot/lua/levels/"
+        source_dir = os.path.join(config["game_folder"], "substrates", "lua", substrate_name)
+        target_dir = os.path.join(meltingpot_dir.replace("~", os.path.expanduser("~")),
+                                  substrates_suffix, substrate_name)
+        assert os.path.isdir(source_dir), "The substrate does not exist in levels/"
+        if os.path.isdir(target_dir):
+            logger.debug("Removing old substrate")
+            shutil.rmtree(target_dir)
+        copy_tree(source_dir, target_dir)
+        logger.debug("Substrate installed in meltingpot!")
+        _installed_substrates.add(substrate_name)
@@ -1,8 +1,8 @@
 import json
 import numpy as np
 from copy import deepcopy
-from scipy.ndimage import label, center_of_mass
-from collections import defaultdict
+from scipy.ndimage import label
+from collections import OrderedDict
 
 from agent.agent import Agent
 
@@ -14,10 +14,75 @@ def parse_string_to_matrix(input_string):
 
 
 def matrix_to_string(matrix):
+    if is_grid(matrix):
+        return grid_to_string(matrix)
     rows = [''.join(row) for row in matrix]
     return '\n'.join(rows)
 
 
+# Maps are stored as grids of uint8 codes, one code per cell. The maps of all the substrates are ascii, so the code of a char
+# is its ascii value: the same char <-> code table is shared by every substrate and rendering a grid is a single bytes decode
+GRID_DTYPE = np.uint8
+NEWLINE_CODE = ord('\n')
+
+def is_grid(matrix) -> bool:
+    """
+    Checks if a map is a grid of uint8 codes
+
+    Args:
+        matrix: Map as a grid, a matrix of chars or a list of rows
+
+    Returns:
+        bool: True if the map is a grid of codes, False otherwise
+    """
+    return isinstance(matrix, np.ndarray) and matrix.dtype == GRID_DTYPE
+
+def grid_code(matrix, char: str):
+    """
+    Returns the value of a char on a map, its code if the map is a grid and the char itself otherwise.
+    It lets compare the cells of a map with a char without knowing how the map is stored.
+
+    Args:
+        matrix: Map as a grid, a matrix of chars or a list of rows
+        char (str): Char to encode
+
+    Returns:
+        int | str: Value of the char on the map
+    """
+    return ord(char) if is_grid(matrix) else char
+
+def parse_string_to_grid(input_string: str | bytes) -> np.ndarray:
+    """
+    Parses a map in ascci format to a grid of codes without building any intermediate list of chars
+
+    Args:
+        input_string (str | bytes): Map in ascci format, rows are separated by new lines
+
+    Returns:
+        np.ndarray: Map as a writable uint8 grid
+    """
+    if isinstance(input_string, str):
+        input_string = input_string.encode('ascii')
+    rows = input_string.strip().split(b'\n')
+    return np.frombuffer(b''.join(rows), dtype=GRID_DTYPE).reshape(len(rows), -1).copy()
+
+def grid_to_string(grid: np.ndarray) -> str:
+    """
+    Renders a grid of codes as a map in ascci format. The grid can be any view of a map, like a window or a rotation.
+
+    Args:
+        grid (np.ndarray): Map as a uint8 grid
+
+    Returns:
+        str: Map in ascci format, rows are separated by new lines
+    """
+    num_rows, num_cols = grid.shape
+    rows = np.empty((num_rows, num_cols + 1), dtype=GRID_DTYPE)
+    rows[:, :num_cols] = grid
+    rows[:, num_cols] = NEWLINE_CODE
+    return rows.tobytes()[:-1].decode('ascii')
+
+
 def get_defined_valid_actions(game_name:str = 'commons_harvest_open'):
     if game_name == 'commons_harvest_open':
         return  ['go to position (x,y): This action takes the agent to the position specified, if there is an apple in the position the apple would be taken. You can choose any position on the map from the top left [0, 0] to the bottom right [17, 23]', 
@@ -127,22 +192,26 @@ def check_agent_out_of_game(observations:list[str]):
     Description: Checks if the agent is out of the game
     
     Args:
-        observations (list[str]): Observations of the agents
+        observations (list[str] | list[Observation]): Observations of the agents
     
     Returns:
         bool: True if the agent is out of the game, False otherwise
    """
-   return (len(observations) >0 and observations[0].startswith(('There are no observations: You were attacked', 'There are no observations: you\'re out of the game')))
+   return (len(observations) >0 and str(observations[0]).startswith(('There are no observations: You were attacked', 'There are no observations: you\'re out of the game')))
 
 
 
 
+CONNECTED_ELEMS_CACHE_SIZE = 64 # Number of maps whose connected components are kept, enough for all the agents of a step
+_connected_elems_cache = OrderedDict()
+
 def connected_elems_map(ascci_map: str | list[list[str]], elements_to_find):
         """
-        Returns a dictionary with the connected components of the map and their elements
+        Returns a dictionary with the connected components of the map and their elements.
+        Results are cached by the content of the map, the returned dictionary is shared and must not be modified.
 
         Args:
-            ascci_map (str | list[list[str]]): Map in ascci format
+            ascci_map (str | list[list[str]] | np.ndarray): Map in ascci format, as a matrix of chars or as a grid of codes
             elements_to_find (list): List of elements to find in the map
 
         Returns:
@@ -150,43 +219,83 @@ def connected_elems_map(ascci_map: str | list[list[str]], elements_to_find):
         """
 
         if isinstance(ascci_map, str):
+            matrix = None
+            cache_key = (ascci_map, tuple(elements_to_find))
+        else:
+            matrix = np.asarray(ascci_map)
+            cache_key = (matrix.shape, matrix.dtype.str, matrix.tobytes(), tuple(elements_to_find))
+
+        if cache_key in _connected_elems_cache:
+            _connected_elems_cache.move_to_end(cache_key)
+            return _connected_elems_cache[cache_key]
+
+        if matrix is None:
             # Convierte la matriz en una matriz numpy
             matrix = np.array([list(row) for row in ascci_map.split('\n') if row != ''])
-        else:
-            matrix = np.array(ascci_map)
 
-        # Generate mask
-        mask = (matrix == elements_to_find[0]) 
-        for elem in elements_to_find[1:]:
-            mask |= (matrix == elem)
+        component_data = index_connected_elems(matrix, elements_to_find)
 
-        # Encontrar componentes conectados
-        labeled_matrix, num_features = label(mask)
+        _connected_elems_cache[cache_key] = component_data
+        if len(_connected_elems_cache) > CONNECTED_ELEMS_CACHE_SIZE:
+            _connected_elems_cache.popitem(last=False)
+        return component_data
 
-        # Inicializa un diccionario para almacenar los centros de los componentes y sus elementos
-        component_data = defaultdict(list)
+def index_connected_elems(matrix: np.ndarray, elements_to_find) -> dict:
+        """
+        Finds the connected components of the elements on a map in a single pass.
+        The sizes and centers of all the components are computed at once with np.bincount over the labels,
+        and the elements are grouped by component with one stable sort of the labeled cells, so they keep the row-major order.
 
-        # Calcula el centro de cada componente y almacena sus elementos
-        for i in range(1, num_features + 1):
-            component_mask = labeled_matrix == i
-            center = center_of_mass(component_mask)
-            center_coords = (int(center[0]), int(center[1]))
-            component_elements = np.argwhere(component_mask)
-            component_data[i] = {'center': center_coords, 'elements': component_elements.tolist()}
+        Args:
+            matrix (np.ndarray): Map as a matrix of chars or as a grid of codes
+            elements_to_find (list): List of elements to find in the map
 
-        return dict(component_data)
+        Returns:
+            dict: Dictionary with the connected components of the map, with their center and their elements
+        """
+        if is_grid(matrix):
+            # Grids have one code per cell, so elements of more than one char are never found on them
+            elements_to_find = [grid_code(matrix, elem) for elem in elements_to_find if len(elem) == 1]
+        # Generate mask
+        mask = np.isin(matrix, elements_to_find)
+
+        # Encontrar componentes conectados
+        labeled_matrix, num_features = label(mask)
+        if num_features == 0:
+            return {}
+
+        # The center of mass of a component is the mean of the coordinates of its elements
+        flat_labels = labeled_matrix.ravel()
+        rows, cols = np.indices(labeled_matrix.shape)
+        counts = np.bincount(flat_labels, minlength=num_features + 1)[1:]
+        center_rows = np.bincount(flat_labels, weights=rows.ravel(), minlength=num_features + 1)[1:] / counts
+        center_cols = np.bincount(flat_labels, weights=cols.ravel(), minlength=num_features + 1)[1:] / counts
+
+        cells = np.flatnonzero(flat_labels)
+        cells = cells[np.argsort(flat_labels[cells], kind='stable')]
+        positions = np.stack(np.unravel_index(cells, labeled_matrix.shape), axis=1).tolist()
+
+        component_data = {}
+        start = 0
+        for i, (center_row, center_col, count) in enumerate(zip(center_rows.tolist(), center_cols.tolist(), counts.tolist()), start=1):
+            component_data[i] = {'center': (int(center_row), int(center_col)), 'elements': positions[start:start + count]}
+            start += count
+        return component_data
 
 def get_local_position_of_element(current_map: list[list[str]], element: str) -> tuple[int, int] | None:
     """
     Get the local position of an element in the map
 
     Args:
-        current_map (list[list[str]]): Current map
+        current_map (list[list[str]] | np.ndarray): Current map, as a matrix of chars or as a grid of codes
         element (str): Element to find
 
     Returns:
         tuple[int, int] | None: Local position of the element. If the element is not found, return None
     """
+    if is_grid(current_map):
+        cells = np.flatnonzero(current_map == grid_code(current_map, element))
+        return tuple(int(i) for i in np.unravel_index(cells[0], current_map.shape)) if len(cells) else None
     for i, row in enumerate(current_map):
         for j, cell in enumerate(row):
             if cell == element:
@@ -79,4 +79,19 @@ class LLMModels():
 
         tokens['total'] = total_tokens
 
-        return tokens
\ No newline at end of file
+        return tokens
+
+    def get_checkpoint(self) -> dict:
+        """Get the costs and tokens of the models to save on a checkpoint of the simulation
+        Returns:
+            dict: Costs and tokens by model
+        """
+        return {model_name: model.cost_manager.get_checkpoint() for model_name, model in self.llm_models.items()}
+
+    def load_checkpoint(self, checkpoint: dict):
+        """Replace the costs and tokens of the models with the ones of a checkpoint
+        Args:
+            checkpoint (dict): Costs and tokens by model, saved by get_checkpoint
+        """
+        for model_name, model_checkpoint in checkpoint.items():
+            self.llm_models[model_name].cost_manager.load_checkpoint(model_checkpoint)
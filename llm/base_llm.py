@@ -4,6 +4,7 @@ import os
 import time
 import random
 import re
+import threading
 
 from utils.llm_cost import CostManager
 from utils.logging import CustomAdapter
@@ -11,6 +12,11 @@ from utils.logging import CustomAdapter
 class BaseLLM(ABC):
     """Base class for all LLM classes. It defines the api to use the LLMs"""
 
+    # The requests of all the models and episodes of the process share this limit, so running several episodes together
+    # interleaves their calls instead of piling them up on the api rate limits. It is created on the first request, once the .env file is loaded
+    requests_limit = None
+    requests_limit_lock = threading.Lock()
+
     def __init__(self, prompt_token_cost: float, response_token_cost: float, max_tokens: int, max_tokens_ratio_per_input: float = 0.7):
         """Constructor for the BaseLLM class
         Args:
@@ -120,6 +126,19 @@ class BaseLLM(ABC):
         """
         pass
 
+    def _limited_completion(self, prompt: str, **kwargs) -> tuple:
+        """Calls the completion api once there are less than LLM_MAX_CONCURRENT_REQUESTS requests running in the process
+        Args:
+            prompt (str): Prompt for the completion
+        Returns:
+            tuple: The result of _completion
+        """
+        with BaseLLM.requests_limit_lock:
+            if BaseLLM.requests_limit is None:
+                BaseLLM.requests_limit = threading.BoundedSemaphore(int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", 16)))
+        with BaseLLM.requests_limit:
+            return self._completion(prompt, **kwargs)
+
     def _load_prompt(self, prompt: str) -> str:
         """Load the prompt from a file or return the prompt if it is a string
         Args:
@@ -181,7 +200,7 @@ class BaseLLM(ABC):
         
         self.logger.info(f"Prompt: {prompt}")
         kwargs.pop("inputs", None) # Remove the inputs from the kwargs to avoid passing them to the completion api
-        response, prompt_tokens, response_tokens = self._completion(prompt, **kwargs)
+        response, prompt_tokens, response_tokens = self._limited_completion(prompt, **kwargs)
         self.logger.info(f"Response: {response}")
 
         self._update_costs(prompt_tokens, response_tokens)
@@ -332,7 +332,7 @@ class Ada(BaseLLM):
         if tokens > self.max_tokens * self.max_tokens_ratio_per_input:
             raise ValueError("Text is too long to embed")
         
-        embedding, prompt_tokens, response_tokens = self._completion(text)
+        embedding, prompt_tokens, response_tokens = self._limited_completion(text)
 
         # Update the cost of the prompt and response
         self._update_costs(prompt_tokens, response_tokens)
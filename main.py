@@ -1,16 +1,26 @@
+import argparse
 from datetime import datetime
+import json
 import logging
 import os
+import random
 from dotenv import load_dotenv
+import numpy as np
 import time
 import traceback
+from queue import Queue
+from concurrent.futures import FIRST_COMPLETED, wait
 from utils.logging import setup_logging, CustomAdapter
-from game_environment.utils import generate_agent_actions_map, check_agent_out_of_game, get_defined_valid_actions
+from game_environment.utils import generate_agent_actions_map, get_defined_valid_actions
 from agent.agent import Agent
+from game_environment.playing_utils.level_playing_utils import Game
+from game_environment.scene_descriptor.scene_descriptor import get_text_description
 from game_environment.server import start_server, get_scenario_map,  default_agent_actions_map, condition_to_end_game
 from llm import LLMModels
 from utils.queue_utils import new_empty_queue
+from utils.turn_scheduler import TurnScheduler, SpeculativeTurn, SEQUENTIAL, CONCURRENT, PIPELINED
 from utils.args_handler import get_args
+from utils.checkpoint import create_checkpoint, restore_checkpoint, save_checkpoint, load_checkpoint, save_args, load_args
 from utils.files import extract_players, persist_short_term_memories, create_directory_if_not_exists
 
 # Set up logging timestamp
@@ -19,105 +29,273 @@ logger_timestamp = datetime.now().strftime("%Y-%m-%d--%H-%M-%S")
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
-rounds_count = 0
+BOTS_STEPS_PER_AGENT_MOVE = 2 # Bots move once every this number of steps
 
-def game_loop(agents: list[Agent], substrate_name:str, persist_memories:bool) -> None:
+def game_loop(env: Game, agents: list[Agent], substrate_name:str, persist_memories:bool, turn_mode:str = SEQUENTIAL,
+              log_timestamp: str = logger_timestamp, save_checkpoints: bool = False, checkpoint: dict = None) -> int:
     """Main game loop. The game loop is executed until the game ends or the maximum number of steps is reached.
+    On the sequential mode each agent thinks and executes all its steps before the next agent starts its turn.
+    On the concurrent mode all the agents think at the same time over the same observations, then their steps are executed together.
+    On the pipelined mode each agent starts its next turn as soon as it executed its steps, while the rest keep moving, see pipelined_game_loop.
 
     Args:
+        env (Game): Game environment of the episode.
         agents (list[Agent]): List of agents.
         substrate_name (str): Name of the substrate.
         persist_memories (bool): Whether to persist the agents memories to the logs folder.
+        turn_mode (str, optional): How the turns of the agents are scheduled, 'sequential', 'concurrent' or 'pipelined'. Defaults to 'sequential'.
+        log_timestamp (str, optional): Name of the logs folder of the episode. Defaults to the timestamp of the program.
+        save_checkpoints (bool, optional): Whether to save a checkpoint at the end of each round, on the sequential and concurrent modes. Defaults to False.
+        checkpoint (dict, optional): Checkpoint to resume the episode from, the env and the agents must be new. Defaults to None, a new episode.
     Returns:
-        None
+        int: Number of rounds executed.
     """
-    global rounds_count
     actions = None
 
-    # Define bots number of steps per action
     rounds_count, steps_count, max_rounds = 0, 0, 3
-    bots_steps_per_agent_move = 2
+    scheduler = TurnScheduler(turn_mode, max_workers=len(agents))
+    # On the concurrent mode all the agents take their turn together
+    turns_groups = [agents] if turn_mode == CONCURRENT else [[agent] for agent in agents]
+    loop_start_time = time.time()
+    if save_checkpoints and turn_mode == PIPELINED:
+        # The turns of the pipelined mode cross the end of the rounds, so there is no point where all the agents are idle
+        logger.warning('Checkpoints are not saved on the pipelined mode')
+        save_checkpoints = False
 
-    # Get the initial observations and environment information
-    env.step(actions)
-    actions = {player_name: default_agent_actions_map() for player_name in env.player_prefixes}
-    env.step(actions)
-    
-    while rounds_count < max_rounds and not condition_to_end_game(substrate_name, env.get_current_global_map()):
-        # Reset the actions for each agent
+    if checkpoint is None:
+        # Get the initial observations and environment information
+        env.step(actions)
         actions = {player_name: default_agent_actions_map() for player_name in env.player_prefixes}
-        # Execute an action for each agent on each step
+        env.step(actions)
+    else:
+        rounds_count, steps_count = restore_checkpoint(checkpoint, env, agents, log_timestamp)
+        logger.info('Resumed the episode from the checkpoint of round %s, step %s', rounds_count, steps_count)
+
+    if turn_mode == PIPELINED:
+        rounds_count, steps_count = pipelined_game_loop(env, agents, substrate_name, persist_memories, scheduler, max_rounds, log_timestamp)
+    else:
+        while rounds_count < max_rounds and not condition_to_end_game(substrate_name, env.get_current_global_map()):
+            # Reset the actions for each agent
+            actions = {player_name: default_agent_actions_map() for player_name in env.player_prefixes}
+            for turn_agents in turns_groups:
+                # The observations of all the agents of the turn are taken before any of them starts thinking
+                turns_inputs = {agent.name: get_turn_inputs(env, agent) for agent in turn_agents}
+                step_queues = scheduler.run_turns(turn_agents, lambda agent: take_turn(agent, turns_inputs[agent.name]))
+                steps_count = execute_steps(env, turn_agents, step_queues, actions, steps_count)
+
+                # Persist the short term memories of the agents
+                if persist_memories:
+                    memories = {agent.name: agent.stm.render_memories() for agent in agents}
+                    persist_short_term_memories(memories, rounds_count, steps_count, log_timestamp)
+
+            rounds_count += 1
+            logger.info('Round %s completed. Executed all the high level actions for each agent.', rounds_count)
+            env.update_history_file(log_timestamp, rounds_count, steps_count)
+            if save_checkpoints:
+                save_checkpoint(create_checkpoint(env, agents, rounds_count, steps_count, log_timestamp), log_timestamp)
+            time.sleep(0.01)
+
+    scheduler.shutdown()
+    # The memories are complete once the last reflections finished, then the background threads are released
+    try:
         for agent in agents:
-            # Helps to define the dynamic number of bot steps per action as acumulated number
-            accumulated_steps = 0
-
-            #Updates the observations for the current agent
-            all_observations =  env.get_observations_by_player(agent.name)
-            observations = all_observations['curr_state']
-            scene_description = all_observations['scene_description']
-            state_changes = all_observations['state_changes']
-            # Get the current observations and environment information
-            game_time = env.get_time()
-            logger.info("\n\n" + f"Agent's {agent.name} turn".center(50, '#') + "\n")
-            logger.info('%s Observations: %s, Scene descriptions: %s', agent.name, observations, scene_description)
-            # Get the steps for the agent to execute a high level action
-            agent_reward = env.score[agent.name]
-            if check_agent_out_of_game(observations):
-                logger.info('Agent %s was taken out of the game', agent.name)
-                agent.move(observations, scene_description, state_changes, game_time, agent_reward, agent_is_out=True)
-                step_actions = new_empty_queue()
-            else:
-                step_actions = agent.move(observations, scene_description, state_changes, game_time, agent_reward)
-
-
-            while not step_actions.empty():
-                step_action = step_actions.get()
-                # Update the actions map for the agent
-                actions[agent.name] = generate_agent_actions_map(step_action, default_agent_actions_map())
-                logger.info('Agent %s action map: %s', agent.name, actions[agent.name] )
-
-                # Execute a move for the bots
-                if env.bots:
-                    for bot in env.bots:
-                        bot_observations =  env.get_observations_by_player(bot.name)
-                        bot_observations = bot_observations['curr_state']
-                        if check_agent_out_of_game(bot_observations):
-                            logger.info(f'Bot {bot.name} was taken out of the game. Skipping bot move.')
-                            actions[bot.name] = default_agent_actions_map()
-                        if env.get_current_step_number() % bots_steps_per_agent_move == 0:
-                            bot_action = bot.move(env.timestep)
-                            actions[bot.name] = bot_action
-                        else:
-                            actions[bot.name] = default_agent_actions_map()
-
-                # Execute each step one by one until the agent has executed all the steps for the high level action
-                try:
-                    env.step(actions)
-                    steps_count += 1
-                    accumulated_steps += 1
-                except:
-                    logger.exception("Error executing action %s", step_action)
-                    step_actions = new_empty_queue()
-
-            # Reset actions for the agent until its next turn
+            agent.wait_background_tasks()
+    finally:
+        for agent in agents:
+            agent.background_tasks.shutdown()
+    elapsed_hours = (time.time() - loop_start_time) / 3600
+    logger.info('Executed %s rounds on %s turn mode, %.2f rounds per hour.', rounds_count, turn_mode, rounds_count / elapsed_hours if elapsed_hours else 0)
+    for agent in agents:
+        logger.info('Agent %s avoided %s blocked moves.', agent.name, agent.spatial_memory.blocked_moves_avoided)
+    return rounds_count
+
+def get_turn_inputs(env: Game, agent: Agent) -> dict:
+    """Gets the observations and the environment information for the turn of an agent.
+
+    Args:
+        env (Game): Game environment of the episode.
+        agent (Agent): Agent that takes the turn.
+    Returns:
+        dict: Arguments of the move of the agent.
+    """
+    #Updates the observations for the current agent
+    all_observations =  env.get_observations_by_player(agent.name)
+    observations = all_observations['curr_state']
+    scene_description = all_observations['scene_description']
+    state_changes = all_observations['state_changes']
+    # Get the current observations and environment information
+    game_time = env.get_time()
+    logger.info("\n\n" + f"Agent's {agent.name} turn".center(50, '#') + "\n")
+    logger.info('%s Observations: %s, Scene descriptions: %s', agent.name, observations, get_text_description(scene_description))
+    agent_reward = env.score[agent.name]
+    agent_is_out = env.is_out_of_game(agent.name)
+    if agent_is_out:
+        logger.info('Agent %s was taken out of the game', agent.name)
+    return {'observations': observations, 'agent_current_scene': scene_description, 'changes_in_state': state_changes,
+            'game_time': game_time, 'agent_reward': agent_reward, 'agent_is_out': agent_is_out}
+
+def take_turn(agent: Agent, turn_inputs: dict) -> Queue:
+    """Runs the cognitive sequence of an agent. It only uses the state of the agent and the given inputs, so the turns of different agents can run at the same time.
+
+    Args:
+        agent (Agent): Agent that takes the turn.
+        turn_inputs (dict): Observations and environment information for the turn, as returned by get_turn_inputs.
+    Returns:
+        Queue: Steps to execute for the high level action of the agent.
+    """
+    # Get the steps for the agent to execute a high level action
+    step_actions = agent.move(**turn_inputs)
+    if turn_inputs['agent_is_out']:
+        step_actions = new_empty_queue()
+    return step_actions
+
+def execute_steps(env: Game, turn_agents: list[Agent], step_queues: dict[str, Queue], actions: dict, steps_count: int) -> int:
+    """Executes the steps of the agents of a turn until all of them executed all their steps.
+
+    Args:
+        env (Game): Game environment of the episode.
+        turn_agents (list[Agent]): Agents of the turn.
+        step_queues (dict[str, Queue]): Steps to execute of each agent.
+        actions (dict): Actions map of all the players, it is updated with the actions of the agents and the bots.
+        steps_count (int): Number of steps executed.
+    Returns:
+        int: Number of steps executed after the turn.
+    """
+    while any(not step_queues[agent.name].empty() for agent in turn_agents):
+        step_queues, steps_count = execute_joint_step(env, turn_agents, step_queues, actions, steps_count)
+
+    # Reset actions for the agents until their next turn
+    for agent in turn_agents:
+        actions[agent.name] = default_agent_actions_map()
+    return steps_count
+
+def execute_joint_step(env: Game, turn_agents: list[Agent], step_queues: dict[str, Queue], actions: dict, steps_count: int) -> tuple[dict[str, Queue], int]:
+    """Executes one environment step where every agent executes its next step. Agents are always visited
+    in the same order and the agents without steps left stay put.
+
+    Args:
+        env (Game): Game environment of the episode.
+        turn_agents (list[Agent]): Agents that move on the step.
+        step_queues (dict[str, Queue]): Steps to execute of each agent.
+        actions (dict): Actions map of all the players, it is updated with the actions of the agents and the bots.
+        steps_count (int): Number of steps executed.
+    Returns:
+        tuple[dict[str, Queue], int]: Steps left of each agent, they are dropped if the step failed, and number of steps executed.
+    """
+    for agent in turn_agents:
+        step_actions = step_queues[agent.name]
+        if step_actions.empty():
             actions[agent.name] = default_agent_actions_map()
-            
+            continue
+        # Other agents may have moved into the route since the steps were planned
+        agent.avoid_blocked_steps(env.curr_scene_description[agent.name])
+        step_action = step_actions.get()
+        # Update the actions map for the agent
+        actions[agent.name] = generate_agent_actions_map(step_action, default_agent_actions_map())
+        logger.info('Agent %s action map: %s', agent.name, actions[agent.name] )
+
+    # Execute a move for the bots, the bots that share a policy move with one inference
+    if env.bots:
+        for bot in env.bots:
+            if env.is_out_of_game(bot.name):
+                logger.info(f'Bot {bot.name} was taken out of the game. Skipping bot move.')
+            actions[bot.name] = default_agent_actions_map()
+        if env.get_current_step_number() % BOTS_STEPS_PER_AGENT_MOVE == 0:
+            for bot_group in env.bot_groups:
+                actions.update(bot_group.move(env.timestep))
+
+    # Execute each step one by one until the agents have executed all the steps for their high level actions
+    try:
+        env.step(actions)
+        steps_count += 1
+    except:
+        logger.exception("Error executing actions %s", {agent.name: actions[agent.name] for agent in turn_agents})
+        step_queues = {agent.name: new_empty_queue() for agent in turn_agents}
+    return step_queues, steps_count
+
+def pipelined_game_loop(env: Game, agents: list[Agent], substrate_name: str, persist_memories: bool, scheduler: TurnScheduler, max_rounds: int,
+                        log_timestamp: str) -> tuple[int, int]:
+    """Game loop of the pipelined mode. Each agent starts its next turn as soon as it executed its steps, while the rest of
+    the agents keep moving, so the environment only waits for the agents when none of them has steps left.
+    The turns are speculative: the steps of a turn are only executed if the scene observed by the agent did not change while it
+    was thinking, otherwise the turn is done again over the current scene. The second try is always used.
+    An agent never starts a turn of the next round before all the agents completed their turn of the current round.
+
+    Args:
+        env (Game): Game environment of the episode.
+        agents (list[Agent]): List of agents.
+        substrate_name (str): Name of the substrate.
+        persist_memories (bool): Whether to persist the agents memories to the logs folder.
+        scheduler (TurnScheduler): Scheduler of the turns, on the pipelined mode.
+        max_rounds (int): Maximum number of rounds.
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        tuple[int, int]: Number of rounds and number of steps executed.
+    """
+    rounds_count, steps_count, speculation_hits, speculation_misses = 0, 0, 0, 0
+    actions = {player_name: default_agent_actions_map() for player_name in env.player_prefixes}
+    step_queues = {agent.name: new_empty_queue() for agent in agents}
+    completed_turns = {agent.name: 0 for agent in agents}
+    speculative_turns = {}
+
+    def start_speculative_turn(agent: Agent, redone: bool = False) -> None:
+        turn_inputs = get_turn_inputs(env, agent)
+        future = scheduler.submit_turn(agent, lambda agent: take_turn(agent, turn_inputs))
+        speculative_turns[agent.name] = SpeculativeTurn(env.get_scene_hash(agent.name), future, redone)
+
+    game_running = True
+    while True:
+        game_running = game_running and rounds_count < max_rounds and not condition_to_end_game(substrate_name, env.get_current_global_map())
+        for agent in agents:
+            if game_running and step_queues[agent.name].empty() and agent.name not in speculative_turns and completed_turns[agent.name] == rounds_count:
+                start_speculative_turn(agent)
+
+        # The agents are visited in the same order, so the turns finished at the same time are committed in a fixed order
+        for agent in agents:
+            speculative_turn = speculative_turns.get(agent.name)
+            if speculative_turn is None or not speculative_turn.future.done():
+                continue
+            del speculative_turns[agent.name]
+            if not speculative_turn.redone and env.get_scene_hash(agent.name) != speculative_turn.scene_hash:
+                logger.info('The scene of agent %s changed while it was thinking, its turn is done again', agent.name)
+                speculation_misses += 1
+                start_speculative_turn(agent, redone=True)
+                continue
+            speculation_hits += not speculative_turn.redone
+            step_queues[agent.name] = speculative_turn.future.result()
+            completed_turns[agent.name] += 1
+
+        if min(completed_turns.values()) > rounds_count:
+            rounds_count += 1
+            logger.info('Round %s completed. Executed all the high level actions for each agent.', rounds_count)
+            env.update_history_file(log_timestamp, rounds_count, steps_count)
             # Persist the short term memories of the agents
             if persist_memories:
-                memories = {agent.name: agent.stm.get_memories().copy() for agent in agents}
-                persist_short_term_memories(memories, rounds_count, steps_count, logger_timestamp)
+                memories = {agent.name: agent.stm.render_memories() for agent in agents}
+                persist_short_term_memories(memories, rounds_count, steps_count, log_timestamp)
 
-        rounds_count += 1
-        logger.info('Round %s completed. Executed all the high level actions for each agent.', rounds_count)
-        env.update_history_file(logger_timestamp, rounds_count, steps_count)
-        time.sleep(0.01)
+        if all(step_queue.empty() for step_queue in step_queues.values()):
+            if not speculative_turns:
+                break
+            # No agent has steps left, the environment waits for the first turn to finish
+            wait([speculative_turn.future for speculative_turn in speculative_turns.values()], return_when=FIRST_COMPLETED)
+            continue
+        step_queues, steps_count = execute_joint_step(env, agents, step_queues, actions, steps_count)
+
+    logger.info('Speculative turns used: %s, done again: %s.', speculation_hits, speculation_misses)
+    return rounds_count, steps_count
 
-if __name__ == "__main__":
-    args = get_args()
-    setup_logging(logger_timestamp)
-    logger.info("Program started")
-    start_time = time.time()
 
+def create_episode(args: argparse.Namespace, log_timestamp: str, simulation_id: str = None) -> tuple[Game, list[Agent], str]:
+    """Creates the agents and the game environment of an episode from the command line arguments.
+
+    Args:
+        args (argparse.Namespace): Command line arguments, as returned by get_args.
+        log_timestamp (str): Name of the logs folder of the episode, the recordings of the game are saved there.
+        simulation_id (str, optional): Id of the simulation, the long term memories of the agents are kept in its own folder. Defaults to None.
+    Returns:
+        tuple[Game, list[Agent], str]: Game environment, agents and data folder of the episode.
+    """
     # Define the simulation mode
     mode = None # cooperative or None, if cooperative the agents will use the cooperative modules
     
@@ -131,7 +309,6 @@ if __name__ == "__main__":
     # Define players
     experiment_path = os.path.join("data", "defined_experiments", args.substrate)
     agents_bio_dir =  os.path.join( experiment_path, "agents_context", args.agents_bio_config)
-    game_scenario = args.scenario if args.scenario != "default" else None
     players_context = [os.path.abspath(os.path.join(agents_bio_dir, player_file)) for player_file in os.listdir(agents_bio_dir)]
 
     players = extract_players(players_context)
@@ -140,16 +317,46 @@ if __name__ == "__main__":
     valid_actions = get_defined_valid_actions(game_name= args.substrate)
     scenario_obstacles  = ['W', '$'] # TODO : Change this. This should be also loaded from the scenario file
     scenario_info = {'scenario_map': get_scenario_map(game_name=args.substrate), 'valid_actions': valid_actions, 'scenario_obstacles': scenario_obstacles} ## TODO: ALL THIS HAVE TO BE LOADED USING SUBSTRATE NAME
-    data_folder = "data" if not args.simulation_id else f"data/databases/{args.simulation_id}"
+    data_folder = "data" if not simulation_id else f"data/databases/{simulation_id}"
     create_directory_if_not_exists (data_folder)
     # Create agents
     agents = [Agent(name=player, data_folder=data_folder, agent_context_file=player_context,
                     world_context_file=world_context_path, scenario_info=scenario_info, mode=mode,
-                    prompts_folder=str(args.prompts_source), substrate_name=args.substrate, start_from_scene = scene_path) 
+                    prompts_folder=str(args.prompts_source), substrate_name=args.substrate, start_from_scene = scene_path,
+                    cognition_barrier=args.cognition_barrier)
               for player, player_context in zip(players, players_context)]
 
     # Start the game server
-    env = start_server(players, init_timestamp=logger_timestamp, record=args.record, game_name=  args.substrate, scenario=args.scenario, kind_experiment = args.kind_experiment)
+    env = start_server(players, init_timestamp=log_timestamp, record=args.record, game_name=  args.substrate, scenario=args.scenario, kind_experiment = args.kind_experiment, render=args.render,
+                       seed=args.seed)
+    return env, agents, data_folder
+
+
+if __name__ == "__main__":
+    args = get_args()
+    checkpoint = None
+    if args.resume:
+        # The episode continues on its logs folder, with the arguments it was started with
+        logger_timestamp, results_file = args.resume, args.results_file
+        args = load_args(logger_timestamp)
+        args.resume, args.results_file = logger_timestamp, results_file
+        checkpoint = load_checkpoint(logger_timestamp)
+    elif args.simulation_id:
+        # Simulations started on the same second get their own logs folder
+        logger_timestamp = f"{logger_timestamp}__{args.simulation_id}"
+    setup_logging(logger_timestamp)
+    logger.info("Program started")
+    start_time = time.time()
+    # The environment can only be brought back to a checkpoint from a known seed
+    if args.seed is None:
+        args.seed = random.randrange(2**31)
+    logger.info("Seed: %s", args.seed)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    if not args.resume:
+        save_args(args, logger_timestamp)
+
+    env, agents, data_folder = create_episode(args, logger_timestamp, args.simulation_id)
     logger = CustomAdapter(logger, game_env=env)
     # We are setting args.prompts_source as a global variable to be used in the LLMModels class
     llm = LLMModels()
@@ -157,12 +364,14 @@ if __name__ == "__main__":
     gpt_longer_context = llm.get_longer_context_fallback()
     embedding_model = llm.get_embedding_model()
     gpt_best_model = llm.get_best_model()
+    rounds_count = None
     try:
-        game_loop(agents, args.substrate, args.persist_memories)
+        rounds_count = game_loop(env, agents, args.substrate, args.persist_memories, args.turn_mode, logger_timestamp,
+                                 save_checkpoints=True, checkpoint=checkpoint)
     except KeyboardInterrupt:
-        logger.info("Program interrupted. %s rounds executed.", rounds_count)
+        logger.info("Program interrupted.")
     except Exception as e:
-        logger.exception("Rounds executed: %s. Exception: %s", rounds_count, e)
+        logger.exception("Exception: %s", e)
 
     env.end_game()
 
@@ -179,9 +388,12 @@ if __name__ == "__main__":
     end_time = time.time()
     logger.info("Execution time: %.2f minutes", (end_time - start_time)/60)
 
+    # The experiment scheduler reads the results of each simulation from this file
+    if args.results_file:
+        results = {'completed': rounds_count is not None, 'rounds': rounds_count, 'steps': env.get_current_step_number(),
+                   'cost': costs['total'], 'tokens': tokens['total'], 'duration': end_time - start_time}
+        with open(args.results_file, 'w') as file:
+            json.dump(results, file)
+
     logger.info("Program finished")
-    
-    # If there's a simulation_id, we will change the logs/{logger_timestamp} name to logs/{logger_timestamp}__{simulation_id}
-    if args.simulation_id:
-        os.system(f"mv logs/{logger_timestamp} logs/{logger_timestamp}__{args.simulation_id}")
         
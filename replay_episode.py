@@ -0,0 +1,53 @@
+"""
+Replays an episode from its actions log, without the agents or the LLM. The game is created again with the seed and the
+arguments of the episode, and the logged joint actions of each step are executed as fast as possible. By default only the
+environment steps, to reach the states of the episode; with --describe the scenes are described and the state changes
+tracked on every step as in the episode, and with --record the recordings and the indicators of the episode are
+generated again on the replay folder inside the logs folder of the episode.
+
+Usage: python replay_episode.py <logs folder of the episode> [--describe] [--record]
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+
+from game_environment.bots import get_bots_for_scenario
+from game_environment.playing_utils.action_log import ActionLog
+from game_environment.server import start_server
+from utils.checkpoint import load_args
+from utils.files import create_directory_if_not_exists
+from utils.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+def get_replay_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Replays an episode from the actions log saved on its logs folder.')
+    parser.add_argument('logs_folder', type=str, help='Name of the logs folder of the episode, for example 2024-01-01--10-00-00')
+    parser.add_argument('--describe', action='store_true', help='Describe the scenes and track the state changes on every step')
+    parser.add_argument('--record', action='store_true', help='Generate the recordings and the indicators of the episode again')
+    return parser.parse_args()
+
+def main():
+    replay_args = get_replay_args()
+    args = load_args(replay_args.logs_folder)
+    action_log = ActionLog.load(os.path.join('logs', replay_args.logs_folder, 'actions_log.npz'))
+    log_timestamp = os.path.join(replay_args.logs_folder, 'replay')
+    create_directory_if_not_exists(os.path.join('logs', log_timestamp))
+    setup_logging(datetime.now().strftime('%Y-%m-%d--%H-%M-%S'))
+
+    # The bots of the scenario are added to the players by the server
+    n_bots = len(get_bots_for_scenario(args.scenario)) if args.scenario else 0
+    players = action_log.player_names[:len(action_log.player_names) - n_bots]
+    env = start_server(players, init_timestamp=log_timestamp, record=replay_args.record, game_name=args.substrate, scenario=args.scenario,
+                       kind_experiment=args.kind_experiment, render='none', seed=action_log.env_seed)
+
+    start_time = time.time()
+    env.replay(action_log, describe=replay_args.describe or replay_args.record)
+    elapsed_time = time.time() - start_time
+    env.end_game()
+    logger.info('Replayed %s steps in %.2f seconds, %.0f steps per second', len(action_log), elapsed_time, len(action_log) / elapsed_time)
+
+if __name__ == '__main__':
+    main()
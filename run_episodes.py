@@ -0,0 +1,101 @@
+"""
+Runs several episodes of the simulation in a single process. The episodes are created one after another and then their
+game loops run together, each one on its own thread, so the LLM calls of all the episodes interleave on the shared
+clients, limited by LLM_MAX_CONCURRENT_REQUESTS. The imports, tokenizers, bot policies, installed substrates and cached
+embeddings are shared by all the episodes instead of being loaded again by a new process for each simulation.
+The episodes run headless. Each one keeps its recordings, history and actions log on its own folder inside the logs
+folder of the program, while the log messages of all the episodes go to the single log file of the program, without the
+game time of their episode. The arguments of each episode are saved on its folder, so it can be replayed with
+replay_episode.py. No checkpoints are saved and the episodes can not be resumed with --resume: the LLM costs and the
+random generators that a checkpoint holds are shared by all the episodes of the process.
+
+Usage: python run_episodes.py --episodes 4 [the arguments of main.py]
+"""
+import argparse
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.agent import Agent
+from game_environment.playing_utils.level_playing_utils import Game
+from llm import LLMModels
+from main import logger_timestamp, create_episode, game_loop
+from utils.args_handler import get_args
+from utils.checkpoint import save_args
+from utils.files import create_directory_if_not_exists
+from utils.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+def run_episode(env: Game, agents: list[Agent], args: argparse.Namespace, log_timestamp: str) -> int | None:
+    """Runs the game loop of an episode and ends its game. An error only stops its own episode.
+
+    Args:
+        env (Game): Game environment of the episode.
+        agents (list[Agent]): Agents of the episode.
+        args (argparse.Namespace): Command line arguments, as returned by get_args.
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        int | None: Number of rounds executed, None if the episode failed.
+    """
+    rounds_count = None
+    try:
+        rounds_count = game_loop(env, agents, args.substrate, args.persist_memories, args.turn_mode, log_timestamp)
+    except Exception as e:
+        logger.exception("Episode %s failed. Exception: %s", log_timestamp, e)
+    finally:
+        env.end_game()
+        # A failed episode does not reach the end of its game loop, where the background threads of the agents are released
+        for agent in agents:
+            agent.background_tasks.shutdown()
+    return rounds_count
+
+def main():
+    args = get_args()
+    setup_logging(logger_timestamp)
+    logger.info("Program started, running %s episodes", args.episodes)
+    start_time = time.time()
+    # A single process can not show the windows of several games
+    args.render = "none"
+
+    episodes = []
+    for episode in range(1, args.episodes + 1):
+        simulation_id = f"{args.simulation_id or 'sim'}_{episode}"
+        log_timestamp = os.path.join(logger_timestamp, simulation_id)
+        create_directory_if_not_exists(os.path.join("logs", log_timestamp))
+        # Each episode gets its own environment seed
+        episode_args = argparse.Namespace(**vars(args))
+        episode_args.seed = args.seed + episode - 1 if args.seed is not None else random.randrange(2**31)
+        episode_args.simulation_id = simulation_id
+        save_args(episode_args, log_timestamp)
+        env, agents, data_folder = create_episode(episode_args, log_timestamp, simulation_id)
+        episodes.append((env, agents, data_folder, episode_args, log_timestamp))
+    logger.info("Created %s episodes in %.2f seconds", args.episodes, time.time() - start_time)
+
+    loop_start_time = time.time()
+    with ThreadPoolExecutor(max_workers=args.episodes, thread_name_prefix="episode") as executor:
+        futures = [executor.submit(run_episode, env, agents, episode_args, log_timestamp) for env, agents, _, episode_args, log_timestamp in episodes]
+        rounds = [future.result() for future in futures]
+
+    # Persisting agents memories to the logs folder of each episode
+    if args.persist_memories:
+        for _, _, data_folder, _, log_timestamp in episodes:
+            os.system(f"cp -r {data_folder}/ltm_database logs/{log_timestamp}")
+
+    completed_episodes = sum(rounds_count is not None for rounds_count in rounds)
+    elapsed_hours = (time.time() - start_time) / 3600
+    logger.info("Completed %s of %s episodes, %s rounds in total. Game loops time: %.2f minutes, %.2f episodes per hour",
+                completed_episodes, args.episodes, sum(rounds_count or 0 for rounds_count in rounds),
+                (time.time() - loop_start_time) / 60, completed_episodes / elapsed_hours)
+
+    # LLm total cost
+    llm = LLMModels()
+    costs = llm.get_costs()
+    tokens = llm.get_tokens()
+    logger.info("LLM total cost: {:,.2f}, Cost by model: {}, Total tokens: {:,}, Tokens by model: {}".format(costs['total'], costs,  tokens['total'], tokens))
+    logger.info("Program finished")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,34 @@
-import subprocess
-import time
-from concurrent.futures import ProcessPoolExecutor
-from datetime import datetime
+"""
+Runs the simulations of an experiment, every combination of the values of its grid, as described on a json file:
 
-def run_simulation(simulation_id, start_delay):
-    time.sleep(start_delay)  # Delay for the staggered start time
-    command = [
-        "python", "main.py",
-        "--substrate=commons_harvest_open",
-        "--scenario=",
-        "--agents_bio_config=all_coop",
-        "--world_context=context_with_definitions",
-        "--llm_model=gpt-3.5",
-        f"--simulation_id=sim_{str(simulation_id).format(2)}",
-    ]
-    subprocess.run(command)
+    {
+        "name": "commons_harvest_bios",
+        "grid": {"agents_bio_config": ["all_coop", "all_selfish"], "seed": [1, 2, 3]},
+        "fixed_args": {"substrate": "commons_harvest_open", "world_context": "context_with_definitions"},
+        "workers": 2,
+        "llm_max_concurrent_requests": 8,
+        "max_retries": 1,
+        "budget": 10.0
+    }
 
-def main(simulations_count):
-    start_timestamp = datetime.now()
-    print(f"The first simulation started at: {start_timestamp}")
-    
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(run_simulation, i, i*5) for i in range(1, simulations_count + 1)]
-        # Wait until all simulations are completed
-        for future in futures:
-            future.result()
-    
-    print("All simulations have been completed.")
+The grid and the fixed arguments are arguments of main.py. The state of the jobs is kept on logs/experiments/<name>,
+running the same experiment again continues with the jobs that did not finish.
+
+Usage: python run_simulations.py data/simulations_set/commons_harvest_bios.json
+"""
+import argparse
+import json
+
+from utils.experiment_scheduler import ExperimentScheduler
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the simulations of an experiment described on a json file")
+    parser.add_argument("experiment_file", type=str, help="Path to the json file that describes the experiment")
+    args = parser.parse_args()
+
+    with open(args.experiment_file) as file:
+        experiment = json.load(file)
+    ExperimentScheduler(**experiment).run()
 
 if __name__ == "__main__":
-    simulations_count = int(input("Enter the number of simulations to run: "))
-    main(simulations_count)
+    main()
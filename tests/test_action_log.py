@@ -0,0 +1,39 @@
+from game_environment.playing_utils.action_log import ActionLog
+
+def get_actions_map(step):
+    return {'Juan': {'move': step % 5, 'turn': -1, 'fireZap': 0},
+            'bot_1': {'move': 0, 'turn': 1, 'fireZap': step % 2}}
+
+def test_action_log(tmp_path):
+    action_log = ActionLog(['Juan', 'bot_1'], env_seed=42)
+    # The first steps of a game are executed without actions
+    actions_maps = [None, None] + [get_actions_map(step) for step in range(100)] + [None]
+    for actions_map in actions_maps:
+        action_log.append(actions_map)
+    assert len(action_log) == len(actions_maps)
+    assert list(action_log) == actions_maps
+
+    # The copy keeps the logged steps only
+    copy = action_log.copy()
+    action_log.append(get_actions_map(0))
+    assert list(copy) == actions_maps
+
+    path = tmp_path / 'actions_log.npz'
+    copy.save(path)
+    loaded_log = ActionLog.load(path)
+    assert loaded_log.env_seed == 42
+    assert loaded_log.player_names == ['Juan', 'bot_1']
+    assert list(loaded_log) == actions_maps
+
+    # The loaded log can keep logging steps
+    loaded_log.append(get_actions_map(3))
+    assert loaded_log.get_actions_map(len(actions_maps)) == get_actions_map(3)
+
+def test_action_log_without_seed(tmp_path):
+    action_log = ActionLog(['Juan'])
+    action_log.append(None)
+    path = tmp_path / 'actions_log.npz'
+    action_log.save(path)
+    loaded_log = ActionLog.load(path)
+    assert loaded_log.env_seed is None
+    assert list(loaded_log) == [None]
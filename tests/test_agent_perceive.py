@@ -1,16 +1,25 @@
 from agent.memory_structures.short_term_memory import ShortTermMemory
-from agent.cognitive_modules.perceive import update_known_agents
+from agent.cognitive_modules.perceive import update_known_agents, update_known_objects
+from game_environment.scene_descriptor.observation import Observation
 
 stm = ShortTermMemory()
 
 def test_update_known_agents():
-    observations = ['Observed agent Manuel at position [3, 4]']
+    observations = [Observation('agent', position=(3, 4), entity_id='Manuel')]
     update_known_agents(observations, stm)
     known_agents = stm.get_known_agents()
     assert 'Manuel' in known_agents, "The agent Manuel is not in the known agents"
 
-    observations = ['Observed agent Manuel at position [3, 4]', 'Observed agent Juan at position [5, 6]']
+    observations = [Observation('agent', position=(3, 4), entity_id='Manuel'), Observation('agent', position=(5, 6), entity_id='Juan')]
     update_known_agents(observations, stm)
     known_agents = stm.get_known_agents()
     assert 'Juan' in known_agents, "The agent Juan is not in the known agents"
     assert len(known_agents) == 2, "The number of known agents is not 2"
+
+def test_update_known_objects():
+    observations = [Observation('tree', position=(8, 20), tree_id=6, apple_count=4, grass_count=1),
+                    Observation('apple', position=(8, 21), tree_id=6),
+                    Observation('agent', position=(5, 6), entity_id='Juan')]
+    update_known_objects(observations, stm, 'commons_harvest_open')
+    assert stm.get_known_objects_by_key('known_trees') == {('6', '[8,20]')}
+    assert str(observations[0]) == 'Observed tree 6 at position [8, 20]. This tree has 4 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.'
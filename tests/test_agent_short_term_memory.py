@@ -0,0 +1,35 @@
+import pickle
+from queue import Queue
+
+from agent.memory_structures.short_term_memory import ShortTermMemory
+
+def test_render_memories():
+    stm = ShortTermMemory()
+    stm.add_memory('Juan', 'name')
+    stm.add_memory(1.0, 'current_reward')
+    stm.add_memory(Queue(), 'current_steps_sequence')
+    assert eval(stm.render_memories()) == {'name': 'Juan', 'current_reward': 1.0, 'current_steps_sequence': ''}
+
+    # The rendered memories are updated after a new write
+    stm.add_memory(2.0, 'current_reward')
+    assert eval(stm.render_memories())['current_reward'] == 2.0
+    assert stm.get_memories() == {'current_reward': 2.0, 'name': 'Juan', 'current_steps_sequence': stm.get_memory('current_steps_sequence')}
+
+def test_checkpoint():
+    stm = ShortTermMemory()
+    stm.add_memory('Juan', 'name')
+    stm.add_memory((3, 4), 'current_position')
+    steps = Queue()
+    for step in ['move up', 'turn left']:
+        steps.put(step)
+    stm.add_memory(steps, 'current_steps_sequence')
+
+    # The checkpoint can be pickled and keeps the steps of the queues without consuming them
+    checkpoint = pickle.loads(pickle.dumps(stm.get_checkpoint()))
+    assert list(steps.queue) == ['move up', 'turn left']
+    restored_stm = ShortTermMemory()
+    restored_stm.add_memory('old plan', 'current_plan')
+    restored_stm.load_checkpoint(checkpoint)
+    assert restored_stm.get_memory('current_plan') is None
+    assert restored_stm.get_memory('name') == 'Juan' and restored_stm.get_memory('current_position') == (3, 4)
+    assert list(restored_stm.get_memory('current_steps_sequence').queue) == ['move up', 'turn left']
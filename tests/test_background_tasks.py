@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+from agent.agent import Agent
+from agent.memory_structures.short_term_memory import ShortTermMemory
+from utils.background_tasks import BackgroundTasks
+
+def test_background_tasks_order():
+    # The tasks run on one background thread, in the order they were submitted, and wait returns once all finished
+    calls = []
+    def task(name, latency):
+        time.sleep(latency)
+        calls.append((name, threading.current_thread().name))
+
+    tasks = BackgroundTasks('agent_0')
+    tasks.submit(task, 'understand', 0.05)
+    tasks.submit(task, 'reflect', 0.0)
+    tasks.wait()
+    tasks.shutdown()
+    assert [name for name, _ in calls] == ['understand', 'reflect']
+    assert all(thread_name.startswith('agent_0_background') for _, thread_name in calls)
+
+    # The barrier option runs each task before submit returns, on the caller thread
+    calls.clear()
+    tasks = BackgroundTasks('agent_0', barrier=True)
+    tasks.submit(task, 'reflect', 0.0)
+    assert calls == [('reflect', threading.current_thread().name)]
+
+def test_background_tasks_errors():
+    def failing_task():
+        raise RuntimeError('LLM error')
+
+    tasks = BackgroundTasks('agent_0')
+    tasks.submit(failing_task)
+    with pytest.raises(RuntimeError):
+        tasks.wait()
+    # The failed task is not raised again
+    tasks.wait()
+    tasks.shutdown()
+
+def test_agent_move_waits_for_reflection():
+    # The reflection submitted by a move is in the memories when the next move perceives
+    agent = Agent.__new__(Agent)
+    agent.name, agent.mode, agent.logger = 'Juan', 'normal', logging.getLogger(__name__)
+    agent.stm = ShortTermMemory()
+    agent.background_tasks = BackgroundTasks(agent.name)
+    agent.spatial_memory = SimpleNamespace(update_current_scene=lambda *args: None)
+    perceived_reflections = []
+    def perceive(observations, changes_in_state, game_time, reward):
+        perceived_reflections.append(agent.stm.get_memory('reflections'))
+        return False, [observations], []
+    def reflect(filtered_observations):
+        time.sleep(0.05)
+        agent.stm.add_memory(f'Reflected on {filtered_observations}', 'reflections')
+    agent.perceive, agent.reflect, agent.get_actions_to_execute = perceive, reflect, Queue
+
+    scene = {'global_position': (1, 1), 'orientation': 0, 'observation': ''}
+    for turn in range(2):
+        agent.move([f'observation {turn}'], scene, [], '2021-01-01 00:00:00')
+    assert perceived_reflections == [None, "Reflected on [['observation 0']]"]
+    agent.wait_background_tasks()
+    agent.background_tasks.shutdown()
+    assert not any(thread.name.startswith('Juan_background') for thread in threading.enumerate())
+
+def test_agent_understands_before_planning():
+    # The cooperative plan is made with the understanding of the current observations, only the reflection runs on the background
+    agent = Agent.__new__(Agent)
+    agent.name, agent.mode, agent.logger = 'Juan', 'cooperative', logging.getLogger(__name__)
+    agent.stm = ShortTermMemory()
+    agent.background_tasks = BackgroundTasks(agent.name)
+    agent.spatial_memory = SimpleNamespace(update_current_scene=lambda *args: None)
+    calls = []
+    agent.perceive = lambda observations, changes_in_state, game_time, reward: (True, observations, changes_in_state)
+    agent.understand = lambda observations, state_changes: calls.append('understand')
+    agent.plan = lambda: calls.append('plan')
+    agent.generate_new_actions = lambda: calls.append('generate_new_actions')
+    agent.reflect = lambda filtered_observations: calls.append('reflect')
+    agent.get_actions_to_execute = Queue
+
+    agent.move(['observation'], {'global_position': (1, 1), 'orientation': 0, 'observation': ''}, [], '2021-01-01 00:00:00')
+    agent.wait_background_tasks()
+    agent.background_tasks.shutdown()
+    assert calls == ['understand', 'plan', 'generate_new_actions', 'reflect']
@@ -0,0 +1,49 @@
+import dm_env
+import numpy as np
+
+from game_environment import bots as bots_module
+from game_environment.bots import Bot, group_bots_by_policy
+
+ACTION_SET = [{'move': i, 'turn': 0, 'fireZap': 0} for i in range(5)]
+
+class FakePolicy:
+    """Policy that moves the bot as many cells as its orientation, the state counts the steps"""
+
+    def initial_state(self):
+        return 0
+
+    def step(self, timestep, prev_state):
+        return int(timestep.observation['ORIENTATION']), prev_state + 1
+
+    def step_batch(self, timestep, prev_states):
+        return timestep.observation['ORIENTATION'].tolist(), [state + 1 for state in prev_states]
+
+class FailingBatchPolicy(FakePolicy):
+    def step_batch(self, timestep, prev_states):
+        raise RuntimeError('Model can not be vectorized')
+
+def make_timestep(n_bots):
+    observation = {'WORLD.RGB': np.zeros((4, 4, 3), dtype=np.uint8)}
+    for i in range(1, n_bots + 1):
+        observation.update({f'{i}.RGB': np.zeros((2, 2, 3), dtype=np.uint8), f'{i}.ORIENTATION': np.int32(i % 4),
+                            f'{i}.READY_TO_SHOOT': 1.0, f'{i}.POSITION': np.array([i, i]), f'{i}.REWARD': 0.0})
+    return dm_env.transition(0.0, observation)
+
+def test_bot_groups(monkeypatch):
+    monkeypatch.setattr(bots_module, '_policies', {})
+    monkeypatch.setattr(bots_module, 'build', lambda policy_name: FailingBatchPolicy() if policy_name == 'failing' else FakePolicy())
+    bots = [Bot(policy_name, f'bot_{i + 1}', i + 1, ACTION_SET) for i, policy_name in enumerate(['a', 'b', 'a', 'failing'])]
+
+    # The bots with the same policy share it and move together
+    bot_groups = group_bots_by_policy(bots)
+    assert [[bot.name for bot in group.bots] for group in bot_groups] == [['bot_1', 'bot_3'], ['bot_2'], ['bot_4']]
+    assert bots[0].policy is bots[2].policy and bots[0].policy is not bots[1].policy
+
+    timestep = make_timestep(len(bots))
+    actions = {}
+    for bot_group in bot_groups:
+        actions.update(bot_group.move(timestep))
+    assert actions == {bot.name: ACTION_SET[bot.player_index % 4] for bot in bots}
+    assert [bot.state for bot in bots] == [1, 1, 1, 1]
+    # A group whose policy can not be batched moves its bots one by one
+    assert not bot_groups[2].batched and bot_groups[0].batched
@@ -0,0 +1,20 @@
+from utils.checkpoint import get_text_logs_sizes, truncate_text_logs
+
+def test_truncate_text_logs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log_folder = tmp_path / 'logs' / 'episode'
+    log_folder.mkdir(parents=True)
+    (log_folder / 'scene_track.txt').write_text("{'step': 0}\n{'step': 1}\n")
+    (log_folder / 'steps_history.txt').write_text('1 10\n')
+    (log_folder / 'custom_indicators.json').write_text('{}')
+    text_logs_sizes = get_text_logs_sizes('episode')
+    assert set(text_logs_sizes) == {'scene_track.txt', 'steps_history.txt'}
+
+    # The steps written after the checkpoint and the replayed steps are dropped
+    with open(log_folder / 'scene_track.txt', 'a') as file:
+        file.write("{'step': 2}\n{'step': 0}\n{'step': 1}\n")
+    (log_folder / 'rewards_history.txt').write_text('2: {0: 1}\n')
+    truncate_text_logs(text_logs_sizes, 'episode')
+    assert (log_folder / 'scene_track.txt').read_text() == "{'step': 0}\n{'step': 1}\n"
+    assert (log_folder / 'steps_history.txt').read_text() == '1 10\n'
+    assert (log_folder / 'rewards_history.txt').read_text() == ''
@@ -0,0 +1,32 @@
+from utils.llm import CustomEmbeddingFunction
+
+class FakeEmbeddingModel:
+    """Embeds each text as its length and records the texts sent to the api"""
+
+    def __init__(self):
+        self.embedded_texts = []
+
+    def get_embeddings(self, texts):
+        self.embedded_texts.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+def test_embedding_cache(monkeypatch):
+    monkeypatch.setattr(CustomEmbeddingFunction, 'cache', type(CustomEmbeddingFunction.cache)())
+    monkeypatch.setattr(CustomEmbeddingFunction, 'max_cached_embeddings', 2)
+    model = FakeEmbeddingModel()
+    embedding_functions = []
+    for _ in range(2):
+        embedding_function = CustomEmbeddingFunction.__new__(CustomEmbeddingFunction)
+        embedding_function.model = model
+        embedding_functions.append(embedding_function)
+
+    # The repeated texts are embedded once, also by other embedding functions of the process
+    embeddings = embedding_functions[0](['apple', 'tree', 'apple'])
+    assert [list(embedding) for embedding in embeddings] == [[5.0], [4.0], [5.0]]
+    embeddings = embedding_functions[1](['tree', 'grass'])
+    assert [list(embedding) for embedding in embeddings] == [[4.0], [5.0]]
+    assert model.embedded_texts == ['apple', 'tree', 'grass']
+
+    # The least recently used text was dropped from the cache
+    embedding_functions[0](['apple'])
+    assert model.embedded_texts == ['apple', 'tree', 'grass', 'apple']
@@ -0,0 +1,95 @@
+import csv
+import json
+import time
+
+import pytest
+
+from utils import experiment_scheduler
+from utils.args_handler import get_parser
+
+from utils.experiment_scheduler import DONE, FAILED, PENDING, ExperimentScheduler, expand_grid, get_command_args, get_job_id
+
+GRID = {'agents_bio_config': ['all_coop', 'all_selfish'], 'scenario': [''], 'seed': [1, 2]}
+
+class FakeSimulations:
+    """Runs the jobs without simulations, the jobs on fail_times fail that number of times"""
+
+    def __init__(self, fail_times=None, cost=1.0):
+        self.fail_times = dict(fail_times or {})
+        self.cost = cost
+        self.calls = []
+
+    def __call__(self, job):
+        self.calls.append(job.job_id)
+        if self.fail_times.get(job.job_id, 0) > 0:
+            self.fail_times[job.job_id] -= 1
+            raise RuntimeError('Simulation crashed')
+        return {'completed': True, 'rounds': 3, 'steps': 30, 'cost': self.cost, 'tokens': 100}
+
+def test_expand_grid():
+    combinations = expand_grid(GRID)
+    assert combinations[:2] == [{'agents_bio_config': 'all_coop', 'scenario': '', 'seed': 1},
+                                {'agents_bio_config': 'all_coop', 'scenario': '', 'seed': 2}]
+    assert len(combinations) == 4
+    assert get_job_id(combinations[0]) == 'all_coop__default__seed_1'
+
+def test_experiment_scheduler_retries_and_resume(tmp_path):
+    flaky_job, broken_job = 'all_coop__default__seed_2', 'all_selfish__default__seed_1'
+    simulations = FakeSimulations(fail_times={flaky_job: 1, broken_job: 5})
+    scheduler = ExperimentScheduler('test', GRID, workers=2, max_retries=1, experiments_folder=str(tmp_path), run_job=simulations)
+    jobs = {job.job_id: job for job in scheduler.run()}
+    assert jobs[flaky_job].status == DONE and jobs[flaky_job].attempts == 2
+    assert jobs[broken_job].status == FAILED and jobs[broken_job].attempts == 2
+    assert sum(job.status == DONE for job in jobs.values()) == 3
+
+    # Every finished try is a row of the summary
+    with open(tmp_path / 'test' / 'summary.csv') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 6
+    assert all(row['tokens'] == ('100' if row['status'] == DONE else '0') for row in rows)
+    with open(tmp_path / 'test' / 'jobs.json') as file:
+        assert json.load(file)[flaky_job]['status'] == DONE
+
+    # Running the experiment again only runs the failed job
+    simulations = FakeSimulations()
+    scheduler = ExperimentScheduler('test', GRID, workers=2, experiments_folder=str(tmp_path), run_job=simulations)
+    jobs = {job.job_id: job for job in scheduler.run()}
+    assert simulations.calls == [broken_job]
+    assert all(job.status == DONE for job in jobs.values()) and jobs[broken_job].attempts == 3
+
+def test_experiment_scheduler_budget(tmp_path):
+    # No job starts once the cost of the finished ones reaches the budget
+    simulations = FakeSimulations(cost=1.5)
+    scheduler = ExperimentScheduler('test', GRID, workers=1, budget=2.0, experiments_folder=str(tmp_path), run_job=simulations)
+    jobs = scheduler.run()
+    assert [job.status for job in jobs] == [DONE, DONE, PENDING, PENDING]
+
+def test_get_command_args(tmp_path):
+    command_args = get_command_args({'record': False, 'persist_memories': True, 'cognition_barrier': True, 'seed': 3})
+    assert command_args == ['--record=False', '--persist_memories=True', '--cognition_barrier', '--seed=3']
+    args = get_parser().parse_args(command_args)
+    assert args.record is False and args.persist_memories is True and args.cognition_barrier is True and args.seed == 3
+    # The flags are left out when they are false
+    assert get_parser().parse_args(get_command_args({'cognition_barrier': False})).cognition_barrier is False
+
+    # An unknown argument is rejected before any job runs
+    with pytest.raises(ValueError):
+        ExperimentScheduler('test', {'seeds': [1, 2]}, experiments_folder=str(tmp_path), run_job=FakeSimulations())
+
+def test_run_simulation_stagger(tmp_path, monkeypatch):
+    # The simulations started together get their own simulation id, so their own logs folder, and staggered starts
+    starts = []
+    def run(command, **kwargs):
+        starts.append((time.time(), command))
+        results_path = next(arg.split('=', 1)[1] for arg in command if arg.startswith('--results_file='))
+        with open(results_path, 'w') as file:
+            json.dump({'completed': True}, file)
+        return None
+    monkeypatch.setattr(experiment_scheduler.subprocess, 'run', run)
+    scheduler = ExperimentScheduler('test', GRID, workers=4, experiments_folder=str(tmp_path), start_stagger=0.1)
+    jobs = scheduler.run()
+    assert all(job.status == DONE for job in jobs)
+    start_times = sorted(start_time for start_time, _ in starts)
+    assert all(later - earlier >= 0.09 for earlier, later in zip(start_times, start_times[1:]))
+    simulation_ids = {arg for _, command in starts for arg in command if arg.startswith('--simulation_id=')}
+    assert len(simulation_ids) == len(jobs)
@@ -1,6 +1,7 @@
 from game_environment.scene_descriptor.observations_generator import ObservationsGenerator
+from game_environment.scene_descriptor.observation import Observation, render_observations
 from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
-from game_environment.utils import connected_elems_map
+from game_environment.utils import connected_elems_map, parse_string_to_grid
 
 players = ['agent1', 'agent2', 'agent3']
 obs_gen = ObservationsGenerator(ASCII_MAP, players, 'commons_harvest_open')
@@ -86,6 +87,13 @@ def test_connected_elems_map():
     elements_found = connected_elems_map(observed_map, elements_to_find)
     assert elements_found == expected_output, f"Expected {expected_output}, got {elements_found}. Failed for multiple connected components"
 
+    # Test case 5: The same map is indexed only once, as a string or as a matrix
+    observed_map = "-AA---\nGA----\n----AG\n----GA"
+    assert connected_elems_map(observed_map, ["A", "G"]) is connected_elems_map(observed_map, ["A", "G"])
+    matrix = [list(row) for row in observed_map.split('\n')]
+    assert connected_elems_map(matrix, ["A", "G"]) is connected_elems_map(matrix, ["A", "G"])
+    assert connected_elems_map(matrix, ["A", "G"]) == connected_elems_map(observed_map, ["A", "G"])
+
     print("All test cases pass")
 
 def test_get_trees_descriptions():
@@ -94,7 +102,7 @@ def test_get_trees_descriptions():
     global_position = (7, 21)
     agent_orientation = 0
     expected_output = ['Observed an apple at position [8, 20]. This apple belongs to tree 6.', 'Observed an apple at position [7, 20]. This apple belongs to tree 6.', 'Observed an apple at position [6, 20]. This apple belongs to tree 6.', 'Observed grass to grow apples at position [8, 21]. This grass belongs to tree 6.', 'Observed an apple at position [8, 22]. This apple belongs to tree 6.', 'Observed tree 6 at position [8, 20]. This tree has 4 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.', 'Observed an apple at position [3, 22]. This apple belongs to tree 4.', 'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.']
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     observed_map = 'AFFFFA\nFFFF#G\nFFFAAA'
@@ -102,7 +110,7 @@ def test_get_trees_descriptions():
     global_position = (7, 21)
     agent_orientation = 1
     expected_output = ['Observed an apple at position [8, 20]. This apple belongs to tree 6.', 'Observed an apple at position [7, 20]. This apple belongs to tree 6.', 'Observed an apple at position [6, 20]. This apple belongs to tree 6.', 'Observed grass to grow apples at position [8, 21]. This grass belongs to tree 6.', 'Observed an apple at position [8, 22]. This apple belongs to tree 6.', 'Observed tree 6 at position [8, 20]. This tree has 4 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.', 'Observed an apple at position [3, 22]. This apple belongs to tree 4.', 'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.']
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     observed_map = 'AGA\nF#A\nFFA\nFFF\nFFF\nAFF'
@@ -110,7 +118,7 @@ def test_get_trees_descriptions():
     global_position = (7, 21)
     agent_orientation = 2
     expected_output = ['Observed an apple at position [8, 20]. This apple belongs to tree 6.', 'Observed an apple at position [7, 20]. This apple belongs to tree 6.', 'Observed an apple at position [6, 20]. This apple belongs to tree 6.', 'Observed grass to grow apples at position [8, 21]. This grass belongs to tree 6.', 'Observed an apple at position [8, 22]. This apple belongs to tree 6.', 'Observed tree 6 at position [8, 20]. This tree has 4 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.', 'Observed an apple at position [3, 22]. This apple belongs to tree 4.', 'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.']
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     observed_map = 'AAAFFF\nG#FFFF\nAFFFFA'
@@ -118,7 +126,7 @@ def test_get_trees_descriptions():
     global_position = (7, 21)
     agent_orientation = 3
     expected_output = ['Observed an apple at position [8, 20]. This apple belongs to tree 6.', 'Observed an apple at position [7, 20]. This apple belongs to tree 6.', 'Observed an apple at position [6, 20]. This apple belongs to tree 6.', 'Observed grass to grow apples at position [8, 21]. This grass belongs to tree 6.', 'Observed an apple at position [8, 22]. This apple belongs to tree 6.', 'Observed tree 6 at position [8, 20]. This tree has 4 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.', 'Observed an apple at position [3, 22]. This apple belongs to tree 4.', 'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.']
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     # When the agent is in a tree and might interrupt the connected components observed
@@ -141,7 +149,7 @@ def test_get_trees_descriptions():
     'Observed an apple at position [1, 20]. This apple belongs to tree 4.', 
     'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.'
     ]
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     # When another agent is in a tree and might interrupt the connected components observed
@@ -163,7 +171,7 @@ def test_get_trees_descriptions():
     'Observed an apple at position [1, 20]. This apple belongs to tree 4.', 
     'Observed tree 4 at position [1, 21]. This tree has 1 apples remaining and 0 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.'
     ]
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
 
     # When agent is on a corner 
@@ -178,7 +186,7 @@ def test_get_trees_descriptions():
         'Observed grass to grow apples at position [1, 21]. This grass belongs to tree 4.',
         'Observed tree 4 at position [1, 21]. This tree has 3 apples remaining and 1 grass for apples growing on the observed map. The tree might have more apples and grass on the global map.',
         ]
-    trees_descriptions = obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation)
+    trees_descriptions = render_observations(obs_gen.get_trees_descriptions(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(trees_descriptions) == sorted(expected_output), f"Expected {expected_output}, got {trees_descriptions}."
   
 def test_get_observed_agents():
@@ -187,7 +195,7 @@ def test_get_observed_agents():
     global_position = (7, 21)
     agent_orientation = 0
     expected_output = ['Observed agent agent1 at position [5, 20].']
-    agents_observed = obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation)
+    agents_observed = render_observations(obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(agents_observed) == sorted(expected_output), f"Expected {expected_output}, got {agents_observed}."
 
     observed_map = 'AFFFF2\nFFFF#G\nFFFAAA'
@@ -195,7 +203,7 @@ def test_get_observed_agents():
     global_position = (7, 21)
     agent_orientation = 1
     expected_output = ['Observed agent agent3 at position [8, 22].']
-    agents_observed = obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation)
+    agents_observed = render_observations(obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(agents_observed) == sorted(expected_output), f"Expected {expected_output}, got {agents_observed}."
 
     observed_map = 'AGA\nF#1\nFFA\nFFF\nFFF\nAFF'
@@ -203,7 +211,7 @@ def test_get_observed_agents():
     global_position = (7, 21)
     agent_orientation = 2
     expected_output = ['Observed agent agent2 at position [7, 20].']
-    agents_observed = obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation)
+    agents_observed = render_observations(obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(agents_observed) == sorted(expected_output), f"Expected {expected_output}, got {agents_observed}."
 
     observed_map = 'AAAFFF\n0#FFFF\nAFFFFA'
@@ -211,7 +219,7 @@ def test_get_observed_agents():
     global_position = (7, 21)
     agent_orientation = 3
     expected_output = ['Observed agent agent1 at position [8, 21].']
-    agents_observed = obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation)
+    agents_observed = render_observations(obs_gen.get_agents_observed(observed_map, local_map_position, global_position, agent_orientation))
     assert sorted(agents_observed) == sorted(expected_output), f"Expected {expected_output}, got {agents_observed}."
 
 def test_get_observed_changes():
@@ -259,4 +267,37 @@ def test_get_observed_changes():
     global_position = (5, 5)
     expected_output = [('Observed that agent agent3 took an apple from position [6, 4].', game_time), ('Observed that the grass at position [6, 5] disappeared.', game_time)]
     observed_changes = obs_gen.get_observed_changes(observed_map, last_observed_map, local_position, global_position, agent_orientation, game_time)
-    assert sorted(observed_changes) == sorted(expected_output), f"Expected {expected_output}, got {observed_changes}."
\ No newline at end of file
+    assert sorted(observed_changes) == sorted(expected_output), f"Expected {expected_output}, got {observed_changes}."
+
+
+def test_get_observations():
+    scene_description = {
+        'agent1': {'observation': 'FFA\nFFF\nFFF\nAFF\nA#F\nAGA', 'global_position': (7, 21), 'orientation': 0, 'last_observation': None},
+        'agent2': {'observation': "There are no observations: you're out of the game.", 'global_position': (1, 1), 'orientation': 0, 'last_observation': None},
+    }
+    observations = obs_gen.get_observations(scene_description, 'agent2')
+    assert render_observations(observations) == ["There are no observations: you're out of the game."]
+    assert 'agent1' not in obs_gen.observations_cache[1], "Observations should only be computed for the requested agent"
+    # Observations are memoized until a new scene description is given
+    assert obs_gen.get_observations(scene_description, 'agent2') is observations
+    assert obs_gen.get_observations(dict(scene_description), 'agent2') is not observations
+
+    # The grids of codes of the scene descriptor give the same observations as the text observations
+    grid_description = {'agent1': dict(scene_description['agent1'], observation_grid=parse_string_to_grid(scene_description['agent1']['observation']),
+                                       last_observation_grid=None)}
+    assert render_observations(obs_gen.get_observations(grid_description, 'agent1')) == render_observations(obs_gen.get_observations(scene_description, 'agent1'))
+
+def test_get_clean_up_descriptions():
+    global_map = '\nWWWWW\nW=A^W\nW+DTW\nWWWWW\n'
+    clean_up_obs_gen = ObservationsGenerator(global_map, players, 'clean_up')
+    # The agent is at [2, 2] looking to the north, it is standing over the dirt
+    observed_map = '=A^\n+#T\nWWW'
+    expected_output = ['Observed river bank at position [1, 1]', 'Observed an apple at position [1, 2]', 'Observed apple field edge at position [1, 3]',
+                       'Observed river bank at position [2, 1]', 'Observed apple field edge at position [2, 3]']
+    items_observed = render_observations(clean_up_obs_gen.get_clean_up_descriptions(observed_map, (1, 1), (2, 2), 0))
+    assert items_observed == expected_output, f"Expected {expected_output}, got {items_observed}."
+
+    # Looking to the south, the window is rotated
+    observed_map = 'WWW\nT#+\n^A='
+    items_observed = render_observations(clean_up_obs_gen.get_clean_up_descriptions(observed_map, (1, 1), (2, 2), 2))
+    assert sorted(items_observed) == sorted(expected_output), f"Expected {expected_output}, got {items_observed}."
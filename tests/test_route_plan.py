@@ -0,0 +1,64 @@
+from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
+from utils.route_plan import get_shortest_valid_route, RoutingIndex, DX, DY, DIRECTIONS
+
+scenario_map = ASCII_MAP.split('\n')[1:-1]
+routing_index = RoutingIndex.for_map(scenario_map, ['W', '$'])
+
+def follow_route(start, route):
+    position = start
+    for step in route:
+        d = DIRECTIONS.index(step)
+        position = (position[0] + DX[d], position[1] + DY[d])
+        assert scenario_map[position[0]][position[1]] not in ['W', '$'], f'The route crosses an obstacle at {position}'
+    return position
+
+def simulate_steps(start, orientation, steps):
+    position = start
+    for step in steps:
+        if step == 'turn right':
+            orientation = (orientation + 1) % 4
+        elif step == 'turn left':
+            orientation = (orientation - 1) % 4
+        else:
+            d = (DIRECTIONS.index(step) + orientation) % 4
+            position = (position[0] + DX[d], position[1] + DY[d])
+            assert scenario_map[position[0]][position[1]] not in ['W', '$'], f'The route crosses an obstacle at {position}'
+    return position, orientation
+
+def test_routing_index_matches_bfs():
+    cells = [(i, j) for i in range(len(scenario_map)) for j in range(len(scenario_map[0]))]
+    for start in cells[::13]:
+        for end in cells[::9]:
+            expected_route = get_shortest_valid_route(scenario_map, start, end, invalid_symbols=['W', '$'])
+            route = routing_index.get_route(start, end)
+            assert len(route) == len(expected_route), f'Expected a route of {len(expected_route)} moves from {start} to {end}, got {len(route)}'
+            if route:
+                assert follow_route(start, route) == end, f'The route from {start} to {end} does not reach the end'
+
+def test_routing_index_is_shared():
+    assert RoutingIndex.for_map(list(scenario_map), ['$', 'W']) is routing_index, 'The routing index should be shared for the same map'
+
+def test_routing_index_invalid_positions():
+    assert routing_index.get_route((1, 1), (0, 0)) == [], 'There is no route to a wall'
+    assert routing_index.get_route((1, 1), (-1, -1)) == [], 'There is no route to a position outside of the map'
+    assert routing_index.get_distance((1, 1), (1, 3)) == 2
+
+def test_steps_route():
+    # Moves do not change the orientation, so going to a position does not need any turn
+    for orientation in range(4):
+        steps = routing_index.get_steps_route((1, 1), (10, 12), orientation)
+        assert len(steps) == routing_index.get_distance((1, 1), (10, 12)), f'Expected only moves, got {steps}'
+        assert simulate_steps((1, 1), orientation, steps)[0] == (10, 12), f'The route {steps} does not reach the end'
+
+    # To attack the agent ends next to the position and facing it
+    steps = routing_index.get_steps_route((1, 1), (1, 3), 0, face_end=True)
+    assert len(steps) == 2, f'Expected a move and a turn, got {steps}'
+    assert simulate_steps((1, 1), 0, steps) == ((1, 2), 1), f'The route {steps} does not end facing the position'
+
+    steps = routing_index.get_steps_route((5, 5), (5, 4), 3, face_end=True)
+    assert steps == [], f'The agent is already facing the position, got {steps}'
+
+    steps = routing_index.get_steps_route((5, 5), (8, 5), 0, face_end=True)
+    assert len(steps) == 4, f'Expected four steps, got {steps}'
+    position, orientation = simulate_steps((5, 5), 0, steps)
+    assert (position[0] + DX[orientation], position[1] + DY[orientation]) == (8, 5), f'The route {steps} does not end facing the position'
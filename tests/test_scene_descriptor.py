@@ -1,5 +1,7 @@
+import numpy as np
 
-from game_environment.scene_descriptor.scene_descriptor import SceneDescriptor
+from game_environment.scene_descriptor.scene_descriptor import SceneDescriptor, MapViews, get_text_description
+from game_environment.utils import parse_string_to_grid, grid_to_string, matrix_to_string
 
 def test_describe_scene(mocker):
     # Test that an agent who zapped another agent is detected
@@ -93,6 +95,10 @@ def test_describe_scene(mocker):
     assert scene_description['player2']['effective_zap'] == True, "The 'effective_zap' observation for player2 should be True"
     assert scene_description['player3']['effective_zap'] == False, "The 'effective_zap' observation for player3 should be False"
 
+    # Describing the same timestep again returns the memoized description without advancing the avatars state
+    assert scene_descriptor.describe_scene(timestep)[0] is scene_description
+    assert scene_descriptor.avatars[0].just_died, "Describing the same timestep again should not reset the just_died flag"
+
     # Finally the 'effective_zap' should be reseted
     timestep.observation = {
         "GLOBAL.TEXT": globalmap,
@@ -116,4 +122,48 @@ def test_describe_scene(mocker):
 
     assert scene_description['player1']['effective_zap'] == False, "The 'effective_zap' observation for player1 should be False"
     assert scene_description['player2']['effective_zap'] == False, "The 'effective_zap' observation for player2 should be False"
-    assert scene_description['player3']['effective_zap'] == False, "The 'effective_zap' observation for player3 should be False"
\ No newline at end of file
+    assert scene_description['player3']['effective_zap'] == False, "The 'effective_zap' observation for player3 should be False"
+
+    # The avatars that are not described, like the bots on fast forward, keep empty observations
+    scene_descriptor.described_avatars = {'player1', 'player3'}
+    timestep.observation = dict(timestep.observation)
+    scene_description, curr_map = scene_descriptor.describe_scene(timestep)
+    assert scene_description['player2']['observation'] is None and scene_description['player2']['global_position'] == (3, 2)
+    assert isinstance(scene_description['player3']['observation'], str)
+
+    # The text description is written on a single line of the scene track and read back with eval
+    text_description = get_text_description(scene_description['player3'])
+    assert 'observation_grid' not in text_description and '\n' not in str(text_description)
+    assert eval(str(text_description)) == text_description
+
+def test_map_views_crop():
+    # The crops on the shared views must match padding and rotating the map for each avatar
+    view = {'left': 5, 'right': 5, 'forward': 9, 'backward': 1, 'centered': False}
+    rng = np.random.default_rng(0)
+    global_map = rng.choice(list('FAGW'), size=(7, 14))
+    views = MapViews(global_map, 9)
+    for position in [(0, 0), (3, 7), (6, 13), (2, 12)]:
+        marked_map = global_map.copy()
+        marked_map[position] = '0'
+        marked_views = MapViews(marked_map, 9)
+        for orientation in range(4):
+            padded_map = np.rot90(SceneDescriptor.pad_matrix_to_square(marked_map, 9), k=orientation)
+            avatar_pos = np.argwhere(padded_map == '0')[0]
+            expected = padded_map[avatar_pos[0] - 9:avatar_pos[0] + 2, avatar_pos[1] - 5:avatar_pos[1] + 6]
+            assert np.array_equal(marked_views.crop(position, orientation, view), expected), f'Wrong crop at {position} with orientation {orientation}'
+            assert views.crop(position, orientation, view).shape == (11, 11)
+
+def test_map_views_grid_crop():
+    # Crops of a grid of codes must render as the crops of the same map stored as chars
+    view = {'left': 5, 'right': 5, 'forward': 9, 'backward': 1, 'centered': False}
+    rng = np.random.default_rng(1)
+    char_map = rng.choice(list('FAGW0'), size=(7, 14))
+    grid = parse_string_to_grid(matrix_to_string(char_map))
+    assert grid.dtype == np.uint8 and grid.nbytes == char_map.size
+    assert grid_to_string(grid) == matrix_to_string(char_map)
+    char_views, grid_views = MapViews(char_map, 9), MapViews(grid, 9)
+    for position in [(0, 0), (3, 7), (6, 13)]:
+        for orientation in range(4):
+            grid_crop = grid_views.crop(position, orientation, view)
+            assert np.shares_memory(grid_crop, grid_views.padded_map), 'Crops should be views of the padded map'
+            assert grid_to_string(grid_crop) == matrix_to_string(char_views.crop(position, orientation, view))
@@ -1,3 +1,4 @@
+import pickle
 from game_environment.scene_descriptor.observations_generator import ObservationsGenerator
 from game_environment.substrates.python.commons_harvest_open import ASCII_MAP
 from agent.memory_structures.spatial_memory import SpatialMemory
@@ -57,4 +58,114 @@ def test_get_global_position():
     element_global_pos = spatial_memory.get_global_position(el_local_pos, self_local_pos)
     assert  element_global_pos == expected_output, f'Expected {expected_output}, got {element_global_pos}.Failed with agent_orientation = {spatial_memory.orientation}: {orientation_map[spatial_memory.orientation]}'
     
-    print("All test cases pass")
\ No newline at end of file
+    print("All test cases pass")
+
+def test_repair_steps_sequence():
+    from utils.queue_utils import queue_from_list
+    from utils.route_plan import get_next_state
+
+    memory = SpatialMemory(ASCII_MAP, ['W', '$'])
+    # Another agent is right in front of the agent, on the local map the agent is at (9, 5)
+    observed_map = ['-' * 11 for _ in range(10)]
+    observed_map[8] = '-----1-----'
+    observed_map[9] = '-----#-----'
+    memory.update_occupancy((12, 10), 0, '\n'.join(observed_map))
+    assert memory.occupied_positions == {(11, 10): 1}
+
+    steps = queue_from_list(['move up', 'move up', 'move up'])
+    assert memory.repair_steps_sequence(steps)
+    repaired = list(steps.queue)
+    position, orientation = memory.position, memory.orientation
+    for step in repaired:
+        position, orientation = get_next_state(position, orientation, step)
+        assert position != (11, 10), f'Repaired route {repaired} crosses the blocked position'
+    assert (position, orientation) == ((9, 10), 0)
+    assert len(repaired) == 5
+    assert memory.blocked_moves_avoided == 1
+
+    # The route is not blocked anymore
+    assert not memory.repair_steps_sequence(steps)
+
+    # The destination itself is occupied by an agent that never moves, the agent waits a few steps and then drops the move
+    steps = queue_from_list(['move up'])
+    for _ in range(memory.max_blocked_waits):
+        assert memory.repair_steps_sequence(steps)
+        assert list(steps.queue) == ['stay put', 'move up']
+        steps.get() # The wait is executed
+    assert memory.repair_steps_sequence(steps)
+    assert steps.empty()
+    assert memory.blocked_moves_avoided == 2
+
+    # After the waits the route to the destination is planned again around the blocked position, the last steps are kept
+    replanned = memory.replan_steps_sequence(['move up', 'move up', 'stay put'])
+    assert replanned[-1] == 'stay put'
+    position, orientation = memory.position, memory.orientation
+    for step in replanned:
+        position, orientation = get_next_state(position, orientation, step)
+        assert position != (11, 10), f'Replanned route {replanned} crosses the blocked position'
+    assert (position, orientation) == ((10, 10), 0)
+
+    # Occupied positions expire with the next observed scene
+    memory.update_occupancy((12, 10), 0, '\n'.join(['-' * 11 for _ in range(10)]))
+    assert memory.occupied_positions == {}
+
+
+def test_update_explored_map():
+    memory = SpatialMemory(ASCII_MAP, ['W', '$'])
+    local_self_pos = memory.get_local_self_position()
+    seen = set()
+    for position, orientation in [((12, 10), 0), ((12, 10), 1), ((3, 20), 2), ((15, 2), 3)]:
+        memory.position, memory.orientation = position, orientation
+        # Builds the observed window from the real map, cells outside of the map are padded with '-'
+        observed_map = []
+        for i in range(11):
+            row = ''
+            for j in range(11):
+                global_i, global_j = memory.get_global_position((i, j), local_self_pos)
+                if 0 <= global_i < memory.mapSize[0] and 0 <= global_j < memory.mapSize[1]:
+                    row += memory.scenario_map[global_i][global_j]
+                    seen.add((global_i, global_j))
+                else:
+                    row += '-'
+            observed_map.append(row)
+        memory.update_current_scene(position, orientation, '\n'.join(observed_map))
+
+        for i, row in enumerate(memory.explored_map):
+            for j, element in enumerate(row):
+                expected = memory.scenario_map[i][j] if (i, j) in seen else '?'
+                assert element == expected, f'Wrong element at {(i, j)} with orientation {orientation_map[orientation]}'
+        assert memory.n_explored == len(seen)
+        assert memory.get_percentage_explored() == round(len(seen) / (memory.mapSize[0] * memory.mapSize[1]) * 100, 2)
+
+
+def test_frontier_explore_destination():
+    memory = SpatialMemory(ASCII_MAP, ['W', '$'])
+    memory.position, memory.orientation = (12, 10), 0
+    # Nothing has been seen yet, there is no frontier
+    assert memory.get_frontier_explore_destination() is None
+
+    # The agent has only seen the rows from 10 to 13
+    memory.seen_mask[10:14, :] = True
+    destination = memory.get_frontier_explore_destination()
+    assert destination is not None
+    assert memory.seen_mask[destination] and memory.valid_mask[destination]
+    assert destination[0] in (10, 13), f'Destination {destination} is not on the frontier'
+    assert memory.routing_index.get_distance(memory.position, destination) > 0
+
+    # The whole map has been explored
+    memory.seen_mask[:, :] = True
+    assert memory.get_frontier_explore_destination() is None
+
+def test_checkpoint():
+    memory = SpatialMemory(ASCII_MAP)
+    memory.position, memory.orientation = (10, 5), 2
+    memory.occupied_positions = {(10, 6): 1}
+    memory.seen_mask[10, 5] = True
+
+    checkpoint = pickle.loads(pickle.dumps(memory.get_checkpoint()))
+    restored_memory = SpatialMemory(ASCII_MAP)
+    restored_memory.load_checkpoint(checkpoint)
+    assert restored_memory.position == (10, 5) and restored_memory.orientation == 2
+    assert restored_memory.occupied_positions == {(10, 6): 1} and restored_memory.seen_mask[10, 5]
+    # The routing index is shared, it is not part of the checkpoint
+    assert restored_memory.routing_index is memory.routing_index
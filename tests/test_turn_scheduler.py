@@ -0,0 +1,39 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.turn_scheduler import TurnScheduler, SEQUENTIAL, CONCURRENT
+
+agents = [SimpleNamespace(name=f'agent_{i}', latency=0.05 * (3 - i)) for i in range(3)]
+
+def slow_turn(agent):
+    time.sleep(agent.latency)
+    return threading.current_thread().name
+
+def test_run_turns_order():
+    # The first agent finishes last, but the results keep the order of the agents
+    scheduler = TurnScheduler(CONCURRENT, max_workers=len(agents))
+    results = scheduler.run_turns(agents, slow_turn)
+    scheduler.shutdown()
+    assert list(results) == [agent.name for agent in agents]
+    assert all(thread_name.startswith('agent_turn') for thread_name in results.values())
+
+    # The sequential mode runs the turns on the caller thread
+    results = TurnScheduler(SEQUENTIAL).run_turns(agents, slow_turn)
+    assert list(results) == [agent.name for agent in agents]
+    assert set(results.values()) == {threading.current_thread().name}
+
+def test_run_turns_errors():
+    def failing_turn(agent):
+        if agent.name == 'agent_1':
+            raise RuntimeError('LLM error')
+        return agent.name
+
+    scheduler = TurnScheduler(CONCURRENT)
+    with pytest.raises(RuntimeError):
+        scheduler.run_turns(agents, failing_turn)
+    scheduler.shutdown()
+    with pytest.raises(ValueError):
+        TurnScheduler('parallel')
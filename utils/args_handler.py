@@ -1,12 +1,28 @@
 import argparse
 from typing import List
 
-def get_args():
+def str_to_bool(value: str) -> bool:
     """
-    Get the arguments for the simulation
+    Parse a boolean argument, bool('False') would be True
+
+    Args:
+        value: Value of the argument, for example True, False, true, false, 1 or 0
 
     Returns:
-        A list with the arguments for the simulation
+        The boolean value of the argument
+    """
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no", ""):
+        return False
+    raise argparse.ArgumentTypeError(f"Boolean value expected, got {value}")
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Get the parser of the arguments for the simulation
+
+    Returns:
+        The parser of the arguments of main.py
     """
 
     parser = argparse.ArgumentParser(
@@ -52,11 +68,34 @@ def get_args():
 
     parser.add_argument(
         "--record",
-        type=bool,
+        type=str_to_bool,
         default=True,
         help="Whether to record the game. True/False"
     )
 
+    parser.add_argument(
+        "--render",
+        type=str,
+        default="pygame",
+        choices=["pygame", "none"],
+        help="How to render the game. 'pygame' shows the game on a window at 8 fps, 'none' runs the game headless without throttling the steps"
+    )
+
+    parser.add_argument(
+        "--turn_mode",
+        type=str,
+        default="sequential",
+        choices=["sequential", "concurrent", "pipelined"],
+        help="How the turns of the agents are scheduled. 'sequential' runs one agent turn after another, 'concurrent' lets all the agents think at the same time and executes their steps together, "\
+             + "'pipelined' starts the next turn of each agent as soon as it executed its steps, while the rest keep moving"
+    )
+
+    parser.add_argument(
+        "--cognition_barrier",
+        action="store_true",
+        help="Makes the agents finish their reflection before moving, for reproducible runs. By default it runs on the background while the agents execute their steps"
+    )
+
     parser.add_argument(
         "--llm_model",
         type=str,
@@ -73,7 +112,7 @@ def get_args():
     
     parser.add_argument(
         "--persist_memories",
-        type=bool,
+        type=str_to_bool,
         default=False,
         help="Whether to persist the memories of the agents. True/False. Long term memories databases and short term memories will be saved"
     )
@@ -91,7 +130,44 @@ def get_args():
         default=None,
         help="The id of the simulation when running multiple simulations"
     )
-    
-    args = parser.parse_args()
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed of the game environment and the random choices of the agents. By default each simulation uses a random seed"
+    )
+
+    parser.add_argument(
+        "--results_file",
+        type=str,
+        default=None,
+        help="Path to a json file where the rounds executed, LLM costs, tokens and duration of the simulation are written when it finishes"
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help="Name of the logs folder of an interrupted simulation, for example 2024-01-01--10-00-00. The simulation continues from the checkpoint of its last completed round, with the arguments it was started with"
+    )
+
+    parser.add_argument(
+        "--episodes",
+        type=int,
+        default=1,
+        help="Number of episodes that run_episodes.py runs together in the same process"
+    )
+
+    return parser
+
+def get_args():
+    """
+    Get the arguments for the simulation
+
+    Returns:
+        A list with the arguments for the simulation
+    """
+    args = get_parser().parse_args()
     return args
 
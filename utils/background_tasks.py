@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+class BackgroundTasks:
+    """Runs the tasks of an agent whose results are only used on its next turns, like the reflection, on a background thread.
+    Tasks run one at a time in the order they were submitted, so their changes to the memories are always made in the same order.
+    With the barrier option each task runs before submit returns, as if it was called directly.
+    """
+
+    def __init__(self, name: str, barrier: bool = False) -> None:
+        """Initializes the background tasks.
+
+        Args:
+            name (str): Name of the owner of the tasks, used to name the thread.
+            barrier (bool, optional): Whether to run each task before submit returns. Defaults to False.
+        """
+        self.barrier = barrier
+        self.executor = None if barrier else ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{name}_background')
+        self.pending = []
+
+    def submit(self, task: Callable[..., Any], *args, **kwargs) -> None:
+        """Starts a task. With the barrier option the task runs before returning and its exceptions are raised right away.
+
+        Args:
+            task (Callable[..., Any]): Function to run.
+            *args: Positional arguments of the task.
+            **kwargs: Keyword arguments of the task.
+        """
+        if self.barrier:
+            task(*args, **kwargs)
+            return
+        self.pending.append(self.executor.submit(task, *args, **kwargs))
+
+    def wait(self) -> None:
+        """Waits for the pending tasks. If a task raised an exception, it is raised once all the tasks finished."""
+        pending, self.pending = self.pending, []
+        wait(pending)
+        for future in pending:
+            future.result()
+
+    def shutdown(self) -> None:
+        """Waits for the pending tasks and releases the thread."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.pending = []
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import pickle
+import random
+
+import numpy as np
+
+from agent.agent import Agent
+from game_environment.playing_utils.level_playing_utils import Game
+from llm import LLMModels
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+ARGS_FILE = 'args.json'
+
+def get_text_logs_sizes(log_timestamp: str) -> dict[str, int]:
+    """Gets the size of the text logs of an episode, like the scene track or the steps history, which are appended on every step or round.
+
+    Args:
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        dict[str, int]: Size in bytes of each text log, by file name.
+    """
+    log_folder = os.path.join('logs', log_timestamp)
+    return {file_name: os.path.getsize(os.path.join(log_folder, file_name)) for file_name in os.listdir(log_folder) if file_name.endswith('.txt')}
+
+def truncate_text_logs(text_logs_sizes: dict[str, int], log_timestamp: str) -> None:
+    """Cuts the text logs of an episode back to their sizes on a checkpoint, dropping the lines written after it.
+
+    Args:
+        text_logs_sizes (dict[str, int]): Sizes returned by get_text_logs_sizes when the checkpoint was created.
+        log_timestamp (str): Name of the logs folder of the episode.
+    """
+    for file_name, size in get_text_logs_sizes(log_timestamp).items():
+        if size > text_logs_sizes.get(file_name, 0):
+            os.truncate(os.path.join('logs', log_timestamp, file_name), text_logs_sizes.get(file_name, 0))
+
+def create_checkpoint(env: Game, agents: list[Agent], rounds_count: int, steps_count: int, log_timestamp: str) -> dict:
+    """Gets the state of the simulation at the end of a round, when no agent has steps left to execute.
+
+    Args:
+        env (Game): Game environment of the episode.
+        agents (list[Agent]): Agents of the episode.
+        rounds_count (int): Number of rounds executed.
+        steps_count (int): Number of steps executed.
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        dict: State of the game, the agents, the LLM costs, the random generators and the sizes of the text logs.
+    """
+    return {
+        'rounds_count': rounds_count,
+        'steps_count': steps_count,
+        'text_logs_sizes': get_text_logs_sizes(log_timestamp),
+        'game': env.get_checkpoint(),
+        'agents': {agent.name: agent.get_checkpoint() for agent in agents},
+        'llm_costs': LLMModels().get_checkpoint(),
+        'random_state': random.getstate(),
+        'numpy_random_state': np.random.get_state(),
+    }
+
+def restore_checkpoint(checkpoint: dict, env: Game, agents: list[Agent], log_timestamp: str) -> tuple[int, int]:
+    """Brings a new episode to the state of a checkpoint. The episode continues on the logs folder of the checkpoint, the
+    replay of the game appends its steps again to the text logs, so they are cut back to their sizes on the checkpoint.
+
+    Args:
+        checkpoint (dict): State saved by create_checkpoint.
+        env (Game): Game environment of the episode, created with the seed of the checkpoint.
+        agents (list[Agent]): Agents of the episode, with the same names as the agents of the checkpoint.
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        tuple[int, int]: Number of rounds and number of steps executed when the checkpoint was saved.
+    """
+    env.load_checkpoint(checkpoint['game'])
+    truncate_text_logs(checkpoint['text_logs_sizes'], log_timestamp)
+    for agent in agents:
+        agent.load_checkpoint(checkpoint['agents'][agent.name])
+    LLMModels().load_checkpoint(checkpoint['llm_costs'])
+    random.setstate(checkpoint['random_state'])
+    np.random.set_state(checkpoint['numpy_random_state'])
+    return checkpoint['rounds_count'], checkpoint['steps_count']
+
+def save_checkpoint(checkpoint: dict, log_timestamp: str) -> None:
+    """Saves a checkpoint on the logs folder of the episode. The file is replaced at once, so an interruption while saving keeps the last checkpoint.
+
+    Args:
+        checkpoint (dict): State saved by create_checkpoint.
+        log_timestamp (str): Name of the logs folder of the episode.
+    """
+    checkpoint_path = os.path.join('logs', log_timestamp, CHECKPOINT_FILE)
+    with open(f'{checkpoint_path}.tmp', 'wb') as file:
+        pickle.dump(checkpoint, file)
+    os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
+
+def load_checkpoint(log_timestamp: str) -> dict:
+    """Loads the last checkpoint saved on the logs folder of an episode.
+
+    Args:
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        dict: State saved by create_checkpoint.
+    """
+    with open(os.path.join('logs', log_timestamp, CHECKPOINT_FILE), 'rb') as file:
+        return pickle.load(file)
+
+def save_args(args: argparse.Namespace, log_timestamp: str) -> None:
+    """Saves the command line arguments of the episode, an episode is resumed with the same arguments.
+
+    Args:
+        args (argparse.Namespace): Command line arguments, as returned by get_args.
+        log_timestamp (str): Name of the logs folder of the episode.
+    """
+    with open(os.path.join('logs', log_timestamp, ARGS_FILE), 'w') as file:
+        json.dump(vars(args), file, indent=2)
+
+def load_args(log_timestamp: str) -> argparse.Namespace:
+    """Loads the command line arguments of an episode.
+
+    Args:
+        log_timestamp (str): Name of the logs folder of the episode.
+    Returns:
+        argparse.Namespace: Command line arguments saved by save_args.
+    """
+    with open(os.path.join('logs', log_timestamp, ARGS_FILE)) as file:
+        return argparse.Namespace(**json.load(file))
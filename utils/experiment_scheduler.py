@@ -0,0 +1,275 @@
+import csv
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from utils.args_handler import get_parser
+
+PENDING = 'pending' # The job did not run yet, or it was interrupted and runs again on the next run of the experiment
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed' # The job failed all its tries, it is tried again on the next run of the experiment
+SUMMARY_COLUMNS = ['job_id', 'status', 'attempts', 'rounds', 'steps', 'cost', 'tokens', 'duration']
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Job:
+    """Simulation of an experiment, one combination of the values of its grid. The costs, tokens and duration add up the
+    tries of the job, the rounds and steps are the ones of the last try"""
+    job_id: str
+    args: dict = field(default_factory=dict)
+    status: str = PENDING
+    attempts: int = 0
+    rounds: int = None
+    steps: int = None
+    cost: float = 0.0
+    tokens: int = 0
+    duration: float = 0.0
+
+def expand_grid(grid: dict[str, list]) -> list[dict]:
+    """Gets every combination of the values of the grid.
+
+    Args:
+        grid (dict[str, list]): Values of each argument of main.py, for example {'agents_bio_config': ['all_coop', 'all_selfish'], 'seed': [1, 2]}.
+    Returns:
+        list[dict]: Arguments of each combination, the last argument of the grid changes first.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+def get_command_args(args: dict) -> list[str]:
+    """Gets the command line arguments of main.py for the arguments of a job.
+
+    Args:
+        args (dict): Arguments of main.py and their values. The flags, like cognition_barrier, are passed when their value is true.
+    Returns:
+        list[str]: Command line arguments.
+    Raises:
+        ValueError: If an argument is not an argument of main.py.
+    """
+    actions = {action.dest: action for action in get_parser()._actions}
+    command_args = []
+    for name, value in args.items():
+        if name not in actions or name == 'help':
+            raise ValueError(f'Unknown argument of main.py: {name}')
+        if actions[name].nargs == 0:
+            if value:
+                command_args.append(f'--{name}')
+        else:
+            command_args.append(f'--{name}={value}')
+    return command_args
+
+def get_job_id(args: dict) -> str:
+    """Gets the id of the job of a combination of the grid, the same combination always gets the same id.
+
+    Args:
+        args (dict): Arguments of the combination.
+    Returns:
+        str: Id of the job, used as the simulation id.
+    """
+    return '__'.join(f'{name}_{value}' if name == 'seed' else str(value) or 'default' for name, value in args.items())
+
+class ExperimentScheduler:
+    """Runs the simulations of an experiment, every combination of the values of its grid, on a bounded pool of workers.
+    The state of the jobs is saved after each change, so an interrupted experiment continues with its pending jobs when it is run again.
+    The rounds, cost, tokens and duration of each job are printed as they finish and appended to the summary.csv file of the experiment.
+    """
+
+    def __init__(self, name: str, grid: dict[str, list], fixed_args: dict = None, workers: int = 1, llm_max_concurrent_requests: int = 16,
+                 max_retries: int = 1, budget: float = None, experiments_folder: str = 'logs/experiments',
+                 run_job: Callable[[Job], dict] = None, start_stagger: float = 5.0) -> None:
+        """Initializes the scheduler and loads the state of the jobs of a previous run of the experiment.
+
+        Args:
+            name (str): Name of the experiment, its state is kept on a folder with this name.
+            grid (dict[str, list]): Values of each argument of main.py, a job runs for every combination of them.
+            fixed_args (dict, optional): Arguments of main.py shared by all the jobs. Defaults to None.
+            workers (int, optional): Maximum number of simulations running at the same time. Defaults to 1.
+            llm_max_concurrent_requests (int, optional): Maximum number of LLM requests running at the same time on each simulation. Defaults to 16.
+            max_retries (int, optional): Number of times a failed job is tried again. Defaults to 1.
+            budget (float, optional): Maximum LLM cost of the experiment, no new jobs start once it is spent. Defaults to None, no limit.
+            experiments_folder (str, optional): Folder where the experiments are kept. Defaults to 'logs/experiments'.
+            run_job (Callable[[Job], dict], optional): Function that runs a job and returns its results, as written by main.py on the results file. Defaults to run_simulation.
+            start_stagger (float, optional): Minimum seconds between the starts of two simulations, so they do not install the substrates at the same time. Defaults to 5.0.
+        """
+        self.name = name
+        self.fixed_args = fixed_args or {}
+        self.workers = workers
+        self.llm_max_concurrent_requests = llm_max_concurrent_requests
+        self.max_retries = max_retries
+        self.budget = budget
+        self.run_job = run_job or self.run_simulation
+        self.start_stagger = start_stagger
+        self.start_lock = threading.Lock()
+        self.last_start_time = 0.0
+        self.folder = os.path.join(experiments_folder, name)
+        self.state_path = os.path.join(self.folder, 'jobs.json')
+        self.summary_path = os.path.join(self.folder, 'summary.csv')
+        # The arguments are checked before running any job, a wrong argument would make every job fail
+        for args in expand_grid(grid):
+            get_command_args(self.fixed_args | args)
+        os.makedirs(os.path.join(self.folder, 'results'), exist_ok=True)
+        self.jobs = self.load_jobs(grid)
+
+    def load_jobs(self, grid: dict[str, list]) -> list[Job]:
+        """Creates a job for every combination of the grid. The jobs of a previous run keep their state, the interrupted
+        and failed ones run again.
+
+        Args:
+            grid (dict[str, list]): Values of each argument of main.py.
+        Returns:
+            list[Job]: Jobs of the experiment.
+        """
+        saved_jobs = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as file:
+                saved_jobs = json.load(file)
+
+        jobs = []
+        for args in expand_grid(grid):
+            job_id = get_job_id(args)
+            job = Job(**saved_jobs[job_id]) if job_id in saved_jobs else Job(job_id, args)
+            if job.status != DONE:
+                job.status = PENDING
+            jobs.append(job)
+        return jobs
+
+    def save_jobs(self) -> None:
+        """Saves the state of the jobs, the file is replaced at once so an interruption never leaves it half written"""
+        temporal_path = f'{self.state_path}.tmp'
+        with open(temporal_path, 'w') as file:
+            json.dump({job.job_id: asdict(job) for job in self.jobs}, file, indent=2)
+        os.replace(temporal_path, self.state_path)
+
+    def spent_cost(self) -> float:
+        """Gets the LLM cost of all the tries of the jobs of the experiment"""
+        return sum(job.cost for job in self.jobs)
+
+    def run_simulation(self, job: Job) -> dict:
+        """Runs the simulation of a job on its own process, with main.py. The simulation logs to its own folder, named after
+        the job id, and it starts at least start_stagger seconds after the previous simulation.
+
+        Args:
+            job (Job): Job to run.
+        Returns:
+            dict: Results of the simulation, as written by main.py on the results file.
+        """
+        results_path = os.path.join(self.folder, 'results', f'{job.job_id}.json')
+        if os.path.exists(results_path):
+            os.remove(results_path)
+        args = {'render': 'none'} | self.fixed_args | job.args | {'simulation_id': job.job_id, 'results_file': results_path}
+        command = [sys.executable, 'main.py'] + get_command_args(args)
+        environment = os.environ | {'LLM_MAX_CONCURRENT_REQUESTS': str(self.llm_max_concurrent_requests)}
+        with self.start_lock:
+            time.sleep(max(0.0, self.last_start_time + self.start_stagger - time.time()))
+            self.last_start_time = time.time()
+        with open(os.path.join(self.folder, 'results', f'{job.job_id}.out'), 'w') as output:
+            process = subprocess.run(command, env=environment, stdout=output, stderr=subprocess.STDOUT)
+
+        if not os.path.exists(results_path):
+            raise RuntimeError(f'Simulation {job.job_id} exited with code {process.returncode} without results')
+        with open(results_path) as file:
+            return json.load(file)
+
+    def run_timed_job(self, job: Job) -> tuple[dict, float]:
+        """Runs a job and measures its duration.
+
+        Args:
+            job (Job): Job to run.
+        Returns:
+            tuple[dict, float]: Results of the simulation, None if it failed without results, and duration of the try in seconds.
+        """
+        start_time = time.time()
+        try:
+            results = self.run_job(job)
+        except Exception as e:
+            logger.exception('Job %s failed: %s', job.job_id, e)
+            results = None
+        return results, time.time() - start_time
+
+    def finish_job(self, job: Job, results: dict, duration: float, failures: int) -> bool:
+        """Updates a job with the results of a try.
+
+        Args:
+            job (Job): Job that finished its try.
+            results (dict): Results of the simulation, None if the simulation did not write them.
+            duration (float): Duration of the try, in seconds.
+            failures (int): Failed tries of the job on this run of the experiment, including this one if it failed.
+        Returns:
+            bool: Whether the job has to be tried again.
+        """
+        job.duration += duration
+        if results is not None:
+            job.cost += results.get('cost', 0.0)
+            job.tokens += results.get('tokens', 0)
+            job.rounds, job.steps = results.get('rounds'), results.get('steps')
+        if results is not None and results.get('completed'):
+            job.status = DONE
+            return False
+        job.status = PENDING if failures <= self.max_retries else FAILED
+        return job.status == PENDING
+
+    def write_summary_row(self, job: Job) -> None:
+        """Prints the results of a finished job and appends them to the summary file"""
+        row = {column: getattr(job, column) for column in SUMMARY_COLUMNS}
+        write_header = not os.path.exists(self.summary_path)
+        with open(self.summary_path, 'a', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+        print(f"{job.job_id:60s} {job.status:8s} {job.attempts:3d} tries  {job.rounds if job.rounds is not None else '-':>4} rounds  "
+              f"{job.cost:8.3f} cost  {job.tokens:9,d} tokens  {job.duration / 60:7.2f} min", flush=True)
+
+    def run(self) -> list[Job]:
+        """Runs the pending jobs of the experiment. No new jobs start once the budget is spent, they stay pending.
+
+        Returns:
+            list[Job]: Jobs of the experiment.
+        """
+        pending = deque(job for job in self.jobs if job.status == PENDING)
+        failures = {job.job_id: 0 for job in pending}
+        logger.info('Experiment %s: %s jobs, %s pending', self.name, len(self.jobs), len(pending))
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='experiment_worker') as executor:
+            try:
+                while pending or running:
+                    while pending and len(running) < self.workers and (self.budget is None or self.spent_cost() < self.budget):
+                        job = pending.popleft()
+                        job.status = RUNNING
+                        job.attempts += 1
+                        running[executor.submit(self.run_timed_job, job)] = job
+                    self.save_jobs()
+                    if not running:
+                        logger.warning('The budget of the experiment %s was spent, %s jobs stay pending', self.name, len(pending))
+                        break
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job = running.pop(future)
+                        results, duration = future.result()
+                        failures[job.job_id] += results is None or not results.get('completed')
+                        if self.finish_job(job, results, duration, failures[job.job_id]):
+                            pending.append(job)
+                        self.write_summary_row(job)
+                    self.save_jobs()
+            except KeyboardInterrupt:
+                # The interrupted jobs run again on the next run of the experiment
+                for job in running.values():
+                    job.status = PENDING
+                self.save_jobs()
+                raise
+
+        logger.info('Experiment %s finished: %s done, %s failed, %s pending. LLM cost: %.2f', self.name,
+                    *(sum(job.status == status for job in self.jobs) for status in (DONE, FAILED, PENDING)), self.spent_cost())
+        return self.jobs
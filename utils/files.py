@@ -53,15 +53,15 @@ def extract_players(players_context:list[str]) -> list[str]:
     return [json.load(open(player_context))['name'] for player_context in players_context]
 
 
-def persist_short_term_memories(memories:dict, rounds_count:int, steps_count:int, log_timestamp:str):
+def persist_short_term_memories(memories:dict[str, str], rounds_count:int, steps_count:int, log_timestamp:str):
     """
     Saves the short term memories of the agents to a file.
     First creates the file if it doesn't exist, then appends the memories to the file.
     By appending a line with {"rounds_count": rounds_count, "steps_count": steps_count, "memories": memories} to the file.
-    Memories dict is a dict with the agent name as key and the agent short term memories as value.
+    Memories dict is a dict with the agent name as key and the agent short term memories, already rendered by ShortTermMemory.render_memories, as value.
     
     Args:
-        memories (dict): Dictionary with the short term memories of the agents.
+        memories (dict[str, str]): Dictionary with the rendered short term memories of the agents.
         rounds_count (int): Number of rounds.
         steps_count (int): Number of steps.
     """
@@ -70,22 +70,16 @@ def persist_short_term_memories(memories:dict, rounds_count:int, steps_count:int
     file_path = f"{log_folder}/short_term_memories.txt"
 
     os.makedirs(log_folder, exist_ok=True)
-    
-    for agent_name in memories.keys():
-        memories[agent_name]['current_steps_sequence'] = ""
-        memories[agent_name]['actions_sequence'] = ""
-        
-    # Open the file in append+read mode
-    with open(file_path, "a+") as file:
-        # Move the file pointer to the beginning of the file to read its content
-        file.seek(0)
-        previous_memories = file.read()
-        dict_to_write = {"rounds_count": rounds_count, "steps_count": steps_count, "memories": memories}
-
-        if previous_memories:
+
+    rendered_memories = ', '.join(f"{agent_name!r}: {agent_memories}" for agent_name, agent_memories in memories.items())
+    line_to_write = f"{{'rounds_count': {rounds_count!r}, 'steps_count': {steps_count!r}, 'memories': {{{rendered_memories}}}}}"
+
+    with open(file_path, "a") as file:
+        # The file is opened at its end, so a non zero position means there are previous memories
+        if file.tell() > 0:
             file.write("\n")
         # Write (or append) the new dictionary to the file
-        file.write(str(dict_to_write))
+        file.write(line_to_write)
             
     
 
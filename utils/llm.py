@@ -1,5 +1,7 @@
 import re
 import json
+import threading
+from collections import OrderedDict
 from chromadb import Documents, EmbeddingFunction, Embeddings
 
 from llm import LLMModels
@@ -53,8 +55,30 @@ def extract_tags(response: str) -> dict:
     return {k: v.strip() for k, v in re.findall(patt, response, re.DOTALL)}
 
 class CustomEmbeddingFunction(EmbeddingFunction):
+    """Embeds the documents with the embedding model. The embeddings are cached for the whole process, so the texts
+    repeated by the agents, or by the episodes that run in the same process, are only embedded once.
+    """
+    max_cached_embeddings = 20000
+    cache: OrderedDict[str, list[float]] = OrderedDict()
+    cache_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = LLMModels().get_embedding_model()
+
     def __call__(self, texts: Documents) -> Embeddings:
-        return self.model.get_embeddings(texts)
\ No newline at end of file
+        cls = CustomEmbeddingFunction
+        with cls.cache_lock:
+            embeddings = {text: cls.cache[text] for text in texts if text in cls.cache}
+            for text in embeddings:
+                cls.cache.move_to_end(text)
+        missing_texts = list(dict.fromkeys(text for text in texts if text not in embeddings))
+        if missing_texts:
+            embeddings.update(zip(missing_texts, self.model.get_embeddings(missing_texts)))
+            with cls.cache_lock:
+                for text in missing_texts:
+                    cls.cache[text] = embeddings[text]
+                # The least recently used embeddings are dropped first
+                while len(cls.cache) > cls.max_cached_embeddings:
+                    cls.cache.popitem(last=False)
+        return [embeddings[text] for text in texts]
\ No newline at end of file
@@ -1,3 +1,5 @@
+import threading
+
 class CostManager():
     """Class for managing the cost of the LLMs apis"""
     def __init__(self, prompt_token_cost: float, response_token_cost: float):
@@ -14,6 +16,7 @@ class CostManager():
         self.prompt_tokens = 0
         self.response_tokens = 0
         self.total_tokens = 0
+        self.lock = threading.Lock() # The agents can call the same model from different threads
     
     def update_costs(self, prompt_tokens: int = 0, response_tokens: int = 0):
         """Update the cost of the prompt and response
@@ -21,13 +24,14 @@ class CostManager():
             prompt_tokens (int, optional): Number of tokens in the prompt. Defaults to 0.
             response_tokens (int, optional): Number of tokens in the response. Defaults to 0.
         """
-        self.prompt_cost += prompt_tokens * self.prompt_token_cost
-        self.response_cost += response_tokens * self.response_token_cost
-        self.total_cost = self.prompt_cost + self.response_cost
+        with self.lock:
+            self.prompt_cost += prompt_tokens * self.prompt_token_cost
+            self.response_cost += response_tokens * self.response_token_cost
+            self.total_cost = self.prompt_cost + self.response_cost
 
-        self.prompt_tokens += prompt_tokens
-        self.response_tokens += response_tokens
-        self.total_tokens = self.prompt_tokens + self.response_tokens
+            self.prompt_tokens += prompt_tokens
+            self.response_tokens += response_tokens
+            self.total_tokens = self.prompt_tokens + self.response_tokens
 
     def get_costs(self) -> dict[str, float]:
         """Get the cost of the llm api
@@ -49,4 +53,24 @@ class CostManager():
             "prompt_tokens": self.prompt_tokens,
             "response_tokens": self.response_tokens,
             "total_tokens": self.total_tokens
-        }
\ No newline at end of file
+        }
+
+    def get_checkpoint(self) -> dict[str, float]:
+        """Get the costs and tokens to save on a checkpoint of the simulation
+        Returns:
+            dict: Dictionary containing the costs and the number of tokens of the prompt and response
+        """
+        with self.lock:
+            return {"prompt_cost": self.prompt_cost, "response_cost": self.response_cost,
+                    "prompt_tokens": self.prompt_tokens, "response_tokens": self.response_tokens}
+
+    def load_checkpoint(self, checkpoint: dict[str, float]):
+        """Replace the costs and tokens with the ones of a checkpoint
+        Args:
+            checkpoint (dict): Costs and tokens saved by get_checkpoint
+        """
+        with self.lock:
+            self.prompt_cost, self.response_cost = checkpoint["prompt_cost"], checkpoint["response_cost"]
+            self.total_cost = self.prompt_cost + self.response_cost
+            self.prompt_tokens, self.response_tokens = checkpoint["prompt_tokens"], checkpoint["response_tokens"]
+            self.total_tokens = self.prompt_tokens + self.response_tokens
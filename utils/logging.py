@@ -101,4 +101,24 @@ class CustomFormatter(logging.Formatter):
         if getattr(record, "step", None) is None:
             record.step = 0
         
-        return super().format(record)
\ No newline at end of file
+        return super().format(record)
+
+class LazyRepr:
+    """
+    Wraps a value to be logged, the value is only converted to string if the record is emitted
+    and long values are truncated to avoid formatting whole observations on every log call
+    """
+    def __init__(self, value: Any, max_length: int = 300) -> None:
+        """
+        Args:
+            value (Any): Value to log
+            max_length (int, optional): Maximum number of characters to show. Defaults to 300.
+        """
+        self.value = value
+        self.max_length = max_length
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) > self.max_length:
+            return f"{text[:self.max_length]}... ({len(text)} chars)"
+        return text
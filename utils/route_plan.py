@@ -1,8 +1,45 @@
+from collections import deque
+from functools import lru_cache
+import heapq
 
+DX = [-1, 0, 1, 0]
+DY = [0, 1, 0, -1]
+DIRECTIONS = ['move up', 'move right', 'move down', 'move left']
 
+def get_rotated_directions(orientation: int) -> list[str]:
+    """Gets the moves names as seen by an agent with the given orientation.
+    The env moves are relative to the agent orientation, so the names are rotated accordingly.
 
-from collections import deque
-def get_shortest_valid_route(matrix: list[list[str]], start: tuple[int, int], end: tuple[int, int], 
+    Args:
+        orientation (int): Orientation of the agent. 0: North, 1: East, 2: South, 3: West.
+
+    Returns:
+        list[str]: Moves names for the global directions North, East, South and West.
+    """
+    orientation = 1 if orientation == 3 else 3 if orientation == 1 else orientation # Changes 1 to 3 and 3 to 1 (right and left)
+    return DIRECTIONS[orientation:] + DIRECTIONS[:orientation]
+
+def get_next_state(position: tuple[int, int], orientation: int, step: str) -> tuple[tuple[int, int], int]:
+    """Gets the position and orientation of an agent after executing a step, obstacles are not checked.
+
+    Args:
+        position (tuple[int, int]): Current position of the agent.
+        orientation (int): Current orientation of the agent. 0: North, 1: East, 2: South, 3: West.
+        step (str): Step to execute, e.g. 'move up' or 'turn left'.
+
+    Returns:
+        tuple[tuple[int, int], int]: Position and orientation after the step.
+    """
+    if step == 'turn right':
+        return position, (orientation + 1) % 4
+    if step == 'turn left':
+        return position, (orientation - 1) % 4
+    if step in DIRECTIONS:
+        d = (DIRECTIONS.index(step) + orientation) % 4
+        return (position[0] + DX[d], position[1] + DY[d]), orientation
+    return position, orientation
+
+def get_shortest_valid_route(matrix: list[list[str]], start: tuple[int, int], end: tuple[int, int],
                              invalid_symbols: list[str] = ['W','$'], orientation:int = 0):
     """Gets the shortest valid route between two points in a matrix.
 
@@ -17,32 +54,30 @@ def get_shortest_valid_route(matrix: list[list[str]], start: tuple[int, int], en
         list[str]: Shortest valid route.
     """
 
-    dx = [-1, 0, 1, 0]
-    dy = [0, 1, 0, -1]
-    directions = ['move up', 'move right', 'move down', 'move left']
+    dx = DX
+    dy = DY
     #Rotate directions according to the orientation of the agent
-    orientation = 1 if orientation == 3 else 3 if orientation == 1 else orientation # Changes 1 to 3 and 3 to 1 (right and left)
-    directions = directions[orientation:] + directions[:orientation]
-    
+    directions = get_rotated_directions(orientation)
+
     def bfs(start, end):
         visited = [[False for _ in range(len(matrix[0]))] for _ in range(len(matrix))]
         prev = [[None for _ in range(len(matrix[0]))] for _ in range(len(matrix))]
-        
+
         queue = deque([start])
         visited[start[0]][start[1]] = True
-        
+
         while queue:
             x, y = queue.popleft()
-            
+
             for d in range(4):
                 nx, ny = x + dx[d], y + dy[d]
-                
+
                 if 0 <= nx < len(matrix) and 0 <= ny < len(matrix[0]) and not visited[nx][ny]:
                     if matrix[nx][ny] not in invalid_symbols:
                         queue.append((nx, ny))
                         visited[nx][ny] = True
                         prev[nx][ny] = (x, y, directions[d])
-        
+
         path = []
         at = end
         while at != start:
@@ -52,7 +87,235 @@ def get_shortest_valid_route(matrix: list[list[str]], start: tuple[int, int], en
             path.append(d)
             at = (x, y)
         path.reverse()
-        
+
         return path
 
     return bfs(start, end)
+
+
+class RoutingIndex:
+    """Shortest paths index for a static map. The obstacles of the map do not change during an episode,
+    so the BFS distance field to each target is computed once and kept on a LRU cache.
+    A route is then extracted by descending the distance field, in O(path length).
+    Indexes are shared, use RoutingIndex.for_map to get the index of a map.
+    """
+
+    _indexes = {}
+
+    @classmethod
+    def for_map(cls, matrix: list[str], invalid_symbols: list[str] = ['W','$'], cache_size: int = 512) -> 'RoutingIndex':
+        """Gets the routing index of a map, the index is created only the first time the map is requested.
+
+        Args:
+            matrix (list[str]): Map, a list of rows.
+            invalid_symbols (list[str], optional): Invalid symbols. Defaults to ['W','$'].
+            cache_size (int, optional): Number of distance fields to keep in memory. Defaults to 512.
+
+        Returns:
+            RoutingIndex: Routing index of the map.
+        """
+        key = (tuple(''.join(row) for row in matrix), tuple(sorted(invalid_symbols)))
+        if key not in cls._indexes:
+            cls._indexes[key] = cls(matrix, invalid_symbols, cache_size)
+        return cls._indexes[key]
+
+    def __init__(self, matrix: list[str], invalid_symbols: list[str] = ['W','$'], cache_size: int = 512) -> None:
+        """Initializes the routing index.
+
+        Args:
+            matrix (list[str]): Map, a list of rows.
+            invalid_symbols (list[str], optional): Invalid symbols. Defaults to ['W','$'].
+            cache_size (int, optional): Number of distance fields to keep in memory. Defaults to 512.
+        """
+        self.n_rows = len(matrix)
+        self.n_cols = len(matrix[0])
+        self.valid = [matrix[i][j] not in invalid_symbols for i in range(self.n_rows) for j in range(self.n_cols)]
+
+        # Neighbors of each cell as (direction, cell) pairs, cells are flattened as i * n_cols + j
+        self.neighbors = []
+        for i in range(self.n_rows):
+            for j in range(self.n_cols):
+                cell_neighbors = []
+                for d in range(4):
+                    ni, nj = i + DX[d], j + DY[d]
+                    if 0 <= ni < self.n_rows and 0 <= nj < self.n_cols and self.valid[ni * self.n_cols + nj]:
+                        cell_neighbors.append((d, ni * self.n_cols + nj))
+                self.neighbors.append(tuple(cell_neighbors))
+
+        self.distance_field = lru_cache(maxsize=cache_size)(self._compute_distance_field)
+
+    def _to_cell(self, position: tuple[int, int]) -> int | None:
+        """Flattens a position, returns None if the position is outside of the map."""
+        i, j = int(position[0]), int(position[1])
+        if 0 <= i < self.n_rows and 0 <= j < self.n_cols:
+            return i * self.n_cols + j
+        return None
+
+    def _compute_distance_field(self, target: int) -> list[int]:
+        """Computes the number of moves from every cell to the target. Unreachable cells have distance -1.
+
+        Args:
+            target (int): Flattened target cell.
+
+        Returns:
+            list[int]: Distance of each flattened cell to the target.
+        """
+        distances = [-1] * (self.n_rows * self.n_cols)
+        if not self.valid[target]:
+            return distances
+        distances[target] = 0
+        queue = deque([target])
+        neighbors = self.neighbors
+        while queue:
+            cell = queue.popleft()
+            next_distance = distances[cell] + 1
+            for _, neighbor in neighbors[cell]:
+                if distances[neighbor] == -1:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+        return distances
+
+    def get_distance_field(self, target: tuple[int, int]) -> list[int] | None:
+        """Gets the number of moves from every cell to the target, moves are reversible so it is also the distance from the target.
+
+        Args:
+            target (tuple[int, int]): Target point.
+
+        Returns:
+            list[int] | None: Distance of each flattened cell (i * n_cols + j), -1 for unreachable cells. None if the target is outside of the map.
+        """
+        target_cell = self._to_cell(target)
+        if target_cell is None:
+            return None
+        return self.distance_field(target_cell)
+
+    def get_distance(self, start: tuple[int, int], end: tuple[int, int]) -> int | None:
+        """Gets the number of moves of the shortest route between two points.
+
+        Args:
+            start (tuple[int, int]): Start point.
+            end (tuple[int, int]): End point.
+
+        Returns:
+            int | None: Number of moves, None if there is no route.
+        """
+        start_cell, end_cell = self._to_cell(start), self._to_cell(end)
+        if start_cell is None or end_cell is None:
+            return None
+        distance = self.distance_field(end_cell)[start_cell]
+        return distance if distance >= 0 else None
+
+    def get_route(self, start: tuple[int, int], end: tuple[int, int], orientation: int = 0) -> list[str]:
+        """Gets the shortest valid route between two points. Same contract as get_shortest_valid_route.
+
+        Args:
+            start (tuple[int, int]): Start point.
+            end (tuple[int, int]): End point.
+            orientation (int, optional): Orientation of the agent. 0: North, 1: East, 2: South, 3: West. Defaults to 0.
+
+        Returns:
+            list[str]: Shortest valid route, empty if there is no route.
+        """
+        start_cell, end_cell = self._to_cell(start), self._to_cell(end)
+        if start_cell is None or end_cell is None or start_cell == end_cell:
+            return []
+        distances = self.distance_field(end_cell)
+        moves = self.neighbors[start_cell]
+        if self.valid[start_cell]:
+            remaining = distances[start_cell]
+        else:
+            # The start cell may be an obstacle (e.g. a wrong position), the route leaves it through its valid neighbors
+            reachable = [distances[neighbor] for _, neighbor in moves if distances[neighbor] >= 0]
+            remaining = min(reachable) + 1 if reachable else -1
+        if remaining < 0:
+            return []
+
+        directions = get_rotated_directions(orientation)
+        path = []
+        while remaining > 0:
+            for d, neighbor in moves:
+                if distances[neighbor] == remaining - 1:
+                    path.append(directions[d])
+                    moves = self.neighbors[neighbor]
+                    remaining -= 1
+                    break
+        return path
+
+    def get_steps_route(self, start: tuple[int, int], end: tuple[int, int], orientation: int = 0, face_end: bool = False,
+                        end_orientation: int = None, blocked_positions: set[tuple[int, int]] = None) -> list[str]:
+        """Gets the route with the minimum number of env steps, using A* over (cell, orientation) states.
+        Moves are relative to the orientation and do not change it, turns change the orientation without moving,
+        each of them costs one env step.
+
+        Args:
+            start (tuple[int, int]): Start point.
+            end (tuple[int, int]): End point.
+            orientation (int, optional): Orientation of the agent. 0: North, 1: East, 2: South, 3: West. Defaults to 0.
+            face_end (bool, optional): If True, the route ends next to the end point and facing it, as needed to attack or clean it. Defaults to False.
+            end_orientation (int, optional): Orientation the route must end with, ignored if face_end is True. Defaults to None, any orientation.
+            blocked_positions (set[tuple[int, int]], optional): Positions that can not be crossed, e.g. occupied by other agents. Defaults to None.
+
+        Returns:
+            list[str]: Steps of the route, empty if there is no route.
+        """
+        start_cell, end_cell = self._to_cell(start), self._to_cell(end)
+        if start_cell is None or end_cell is None:
+            return []
+
+        n_cols = self.n_cols
+        if self.valid[end_cell]:
+            # The distance field is an exact heuristic for the moves, turns are not taken into account so it stays admissible
+            distances = self.distance_field(end_cell)
+            heuristic = lambda cell: distances[cell] - face_end if distances[cell] >= 0 else None
+        elif face_end:
+            end_i, end_j = divmod(end_cell, n_cols)
+            heuristic = lambda cell: max(abs(cell // n_cols - end_i) + abs(cell % n_cols - end_j) - 1, 0)
+        else:
+            return []
+
+        # Dynamic obstacles only make routes longer, so the static heuristic stays admissible
+        blocked_cells = {self._to_cell(position) for position in blocked_positions} if blocked_positions else set()
+
+        # When facing the end, the goal states are the valid neighbors of the end looking towards it
+        goal_orientations = {neighbor: (d + 2) % 4 for d, neighbor in self.neighbors[end_cell]}
+        def is_goal(cell, cell_orientation):
+            if face_end:
+                return goal_orientations.get(cell) == cell_orientation
+            return cell == end_cell and (end_orientation is None or cell_orientation == end_orientation)
+
+        start_state = (start_cell, int(orientation))
+        h = heuristic(start_cell)
+        if h is None:
+            return []
+        open_heap = [(h, 0, 0, start_state)]
+        came_from = {start_state: None}
+        cost = {start_state: 0}
+        counter = 0
+        while open_heap:
+            _, g, _, state = heapq.heappop(open_heap)
+            if g > cost[state]:
+                continue
+            cell, cell_orientation = state
+            if is_goal(cell, cell_orientation):
+                steps = []
+                while came_from[state] is not None:
+                    state, step = came_from[state]
+                    steps.append(step)
+                steps.reverse()
+                return steps
+
+            successors = [((neighbor, cell_orientation), DIRECTIONS[(d - cell_orientation) % 4]) for d, neighbor in self.neighbors[cell]
+                          if neighbor not in blocked_cells]
+            successors.append(((cell, (cell_orientation + 1) % 4), 'turn right'))
+            successors.append(((cell, (cell_orientation - 1) % 4), 'turn left'))
+            for next_state, step in successors:
+                if g + 1 >= cost.get(next_state, float('inf')):
+                    continue
+                h = heuristic(next_state[0])
+                if h is None:
+                    continue
+                cost[next_state] = g + 1
+                came_from[next_state] = (state, step)
+                counter += 1
+                heapq.heappush(open_heap, (g + 1 + h, g + 1, counter, next_state))
+        return []
@@ -0,0 +1,84 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+SEQUENTIAL = 'sequential' # Each agent thinks and executes its steps before the next agent starts thinking
+CONCURRENT = 'concurrent' # All the agents think at the same time and their steps are executed together
+PIPELINED = 'pipelined' # Each agent starts its next turn as soon as it executed its steps, while the rest keep moving
+TURN_MODES = (SEQUENTIAL, CONCURRENT, PIPELINED)
+
+@dataclass
+class SpeculativeTurn:
+    """Turn of an agent started while the environment keeps stepping. Its steps are only used if the scene observed
+    by the agent when the turn started is the same when the turn finishes"""
+    scene_hash: int
+    future: Future
+    redone: bool = False # Whether the turn is the second try, after the scene changed during the first one
+
+class TurnScheduler:
+    """Runs the turns of the agents, the cognitive sequence that decides their next steps.
+    On the concurrent and pipelined modes the turns run on a thread pool, so the LLM calls of the agents overlap.
+    Results are always returned in the order of the agents, whatever the order in which the turns finish.
+    """
+
+    def __init__(self, mode: str = SEQUENTIAL, max_workers: int = None) -> None:
+        """Initializes the turn scheduler.
+
+        Args:
+            mode (str, optional): Turn mode, one of TURN_MODES. Defaults to SEQUENTIAL.
+            max_workers (int, optional): Maximum number of turns running at the same time on the concurrent and pipelined modes. Defaults to None, the thread pool default.
+        """
+        if mode not in TURN_MODES:
+            raise ValueError(f'Turn mode {mode} is not valid, valid modes are {TURN_MODES}')
+        self.mode = mode
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agent_turn') if mode != SEQUENTIAL else None
+
+    def submit_turn(self, agent, turn: Callable[[Any], Any]) -> Future:
+        """Starts the turn of an agent. On the sequential mode the turn runs before returning.
+
+        Args:
+            agent (Agent): Agent that takes the turn.
+            turn (Callable[[Agent], Any]): Function that runs the turn of an agent and returns its result.
+
+        Returns:
+            Future: Result of the turn.
+        """
+        if self.executor is not None:
+            return self.executor.submit(turn, agent)
+        future = Future()
+        try:
+            future.set_result(turn(agent))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run_turns(self, agents: list, turn: Callable[[Any], Any]) -> dict[str, Any]:
+        """Runs the turn of each agent. If a turn raises an exception, it is raised once all the turns finished.
+
+        Args:
+            agents (list[Agent]): Agents whose turns are run.
+            turn (Callable[[Agent], Any]): Function that runs the turn of an agent and returns its result.
+
+        Returns:
+            dict[str, Any]: Result of the turn of each agent by agent name, in the order of the agents.
+        """
+        return self.get_results({agent.name: self.submit_turn(agent, turn) for agent in agents})
+
+    @staticmethod
+    def get_results(futures: dict[str, Future]) -> dict[str, Any]:
+        """Waits for the turns and returns their results. If a turn raises an exception, it is raised once all the turns finished.
+
+        Args:
+            futures (dict[str, Future]): Started turns by agent name.
+
+        Returns:
+            dict[str, Any]: Result of the turn of each agent by agent name, in the same order.
+        """
+        wait(list(futures.values()))
+        return {name: future.result() for name, future in futures.items()}
+
+    def shutdown(self) -> None:
+        """Waits for the running turns and releases the threads."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None